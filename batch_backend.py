@@ -0,0 +1,235 @@
+import os, time, json, argparse
+from langchain_core.messages import AIMessage, BaseMessage
+from metrics import get_metrics_handler, get_metrics_tags, get_usage
+
+###
+# Batch execution backend for large, non-interactive runs.
+#
+# All the requests of a processing step are written to a JSONL file
+# in the provider batch format, uploaded, submitted as a batch job and
+# polled until completion. Responses are then mapped back to their
+# requests using the 'custom_id' field.
+#
+# Uses the OpenAI Batch API (groq cloud exposes a compatible one). The
+# OPENAI_BASE_URL (or GROQ_BASE_URL) environment variables can be set to
+# run against a local stand-in server, e.g. mock_llm_server.py.
+###
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_MAX_REQUESTS = 50000 # provider limit of requests per batch
+BATCH_FINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# langchain message types -> chat completions roles
+MESSAGE_ROLES = {
+    "human": "user",
+    "ai": "assistant",
+    "system": "system"
+}
+
+class BatchBackend():
+    """Runs chat completion requests as provider batch jobs.
+
+    Arguments:
+        model (str): the model name
+        params (dict): additional request parameters (e.g. temperature, top_p)
+        file_prefix (str): path prefix of the JSONL batch files, e.g. './out/run' -> './out/run_batch_1.jsonl'
+        use_groq (bool): set to True to submit batches to groq cloud
+        poll_interval (float): seconds between batch status checks
+    """
+    def __init__(self, model: str, params: dict, file_prefix: str, use_groq: bool = False, poll_interval: float = 30) -> None:
+        from openai import OpenAI
+
+        self.model = model
+        self.params = params
+        self.file_prefix = file_prefix
+        self.poll_interval = poll_interval
+
+        if use_groq:
+            self._client = OpenAI(base_url=os.getenv("GROQ_BASE_URL", GROQ_BASE_URL), api_key=os.getenv("GROQ_API_KEY"))
+        else:
+            self._client = OpenAI()
+
+        self.batches = 0
+        self.requests = 0
+        self.failed_requests = 0
+
+    def run(self, requests: dict[str, list[BaseMessage]], description: str = "batch", tags: dict[str, dict] | None = None) -> dict[str, AIMessage]:
+        """Runs a set of requests as batch jobs (split in multiple
+        jobs if needed) and waits for their completion.
+
+        Arguments:
+            requests (dict[str, list[BaseMessage]]): the prompt messages of each request, keyed by a unique request id
+            description (str): a description of the step (used in logs and batch metadata)
+            tags (dict[str, dict] | None): (optional) metrics tags of each request (e.g. row), keyed by request id
+
+        Returns:
+            dict[str, AIMessage]: the response to each request, keyed by request id. Failed
+                requests get an empty response, with the error in its 'batch_error' metadata.
+        """
+        if len(requests) == 0:
+            return {}
+
+        started = time.perf_counter()
+        custom_ids = list(requests.keys())
+        chunks = [custom_ids[i:i + BATCH_MAX_REQUESTS] for i in range(0, len(custom_ids), BATCH_MAX_REQUESTS)]
+
+        # submit all the jobs first, then wait for them
+        batch_ids = [self._submit({key: requests[key] for key in chunk}, description) for chunk in chunks]
+
+        responses = {}
+        for batch_id in batch_ids:
+            responses.update(self._wait(batch_id, description))
+
+        for custom_id in custom_ids:
+            if custom_id not in responses:
+                responses[custom_id] = get_failed_response("no response found in the batch output")
+
+        self.requests += len(custom_ids)
+        self.failed_requests += sum(1 for x in responses.values() if "batch_error" in x.response_metadata)
+
+        # batch requests have no individual latency, the whole run duration is recorded
+        handler = get_metrics_handler()
+        if handler is not None:
+            latency = time.perf_counter() - started
+            for custom_id in custom_ids:
+                response = responses[custom_id]
+                handler.record(
+                    usage=get_usage(response),
+                    latency=latency,
+                    llm=response.response_metadata.get("model_name"),
+                    error=response.response_metadata.get("batch_error"),
+                    tags={**get_metrics_tags(), "batch": description, **(tags or {}).get(custom_id, {})}
+                )
+
+        return responses
+
+    def _submit(self, requests: dict[str, list[BaseMessage]], description: str) -> str:
+        """Writes a JSONL batch file, uploads it and creates the batch job"""
+        self.batches += 1
+        batch_file = f"{self.file_prefix}_batch_{self.batches}.jsonl"
+
+        with open(batch_file, "w", encoding="utf-8") as f_out:
+            for custom_id, messages in requests.items():
+                f_out.write(json.dumps(self.get_batch_line(custom_id, messages), ensure_ascii=False) + "\n")
+
+        with open(batch_file, "rb") as f_in:
+            input_file = self._client.files.create(file=f_in, purpose="batch")
+
+        batch = self._client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"description": description}
+        )
+
+        print(f"INFO\t Submitted batch '{batch.id}' ({description}, {len(requests)} requests, file: '{batch_file}')")
+        return batch.id
+
+    def _wait(self, batch_id: str, description: str) -> dict[str, AIMessage]:
+        """Polls a batch job until it ends, then downloads its results"""
+        batch = self._client.batches.retrieve(batch_id)
+        while batch.status not in BATCH_FINAL_STATUSES:
+            counts = batch.request_counts
+            progress = f"{counts.completed + counts.failed}/{counts.total}" if counts is not None else "-"
+            print(f"INFO\t Batch '{batch_id}' ({description}): {batch.status} [{progress}]")
+            time.sleep(self.poll_interval)
+            batch = self._client.batches.retrieve(batch_id)
+
+        print(f"INFO\t Batch '{batch_id}' ({description}): {batch.status}")
+
+        if batch.status == "failed" and batch.output_file_id is None:
+            errors = [error.message for error in (batch.errors.data if batch.errors is not None and batch.errors.data is not None else [])]
+            raise RuntimeError(f"Batch '{batch_id}' failed: {errors}")
+
+        # expired/cancelled batches may still have partial results
+        responses = {}
+        for file_id in [batch.output_file_id, batch.error_file_id]:
+            if file_id is None:
+                continue
+
+            content = self._client.files.content(file_id).text
+            for line in content.splitlines():
+                if len(line.strip()) == 0:
+                    continue
+                result = json.loads(line)
+                responses[result["custom_id"]] = parse_batch_result(result)
+
+        return responses
+
+    def get_batch_line(self, custom_id: str, messages: list[BaseMessage]) -> dict:
+        """Formats a request as a line of a batch file"""
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": self.model,
+                "messages": [
+                    {"role": MESSAGE_ROLES.get(message.type, message.type), "content": message.content}
+                    for message in messages
+                ],
+                **self.params
+            }
+        }
+
+    def get_stats(self) -> dict:
+        """Returns the backend counters"""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "failed_requests": self.failed_requests
+        }
+
+def parse_batch_result(result: dict) -> AIMessage:
+    """Converts a line of a batch output (or error) file to an AIMessage,
+    shaped like the ones returned by langchain chat models"""
+    response = result.get("response") or {}
+    body = response.get("body") or {}
+
+    if result.get("error") is not None or response.get("status_code") != 200:
+        error = result.get("error") or body.get("error") or f"status code {response.get('status_code')}"
+        return get_failed_response(json.dumps(error, ensure_ascii=False) if not isinstance(error, str) else error)
+
+    usage = body.get("usage") or {}
+    return AIMessage(
+        content=body["choices"][0]["message"].get("content") or "",
+        response_metadata={
+            "token_usage": usage,
+            "model_name": body.get("model"),
+            "finish_reason": body["choices"][0].get("finish_reason")
+        },
+        usage_metadata={
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0)
+        }
+    )
+
+def get_failed_response(error: str) -> AIMessage:
+    """An empty response, standing for a failed batch request"""
+    return AIMessage(
+        content="",
+        response_metadata={"token_usage": {"total_tokens": 0}, "batch_error": error},
+        usage_metadata={"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    )
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the batch backend command line arguments to a tool's parser"""
+    parser.add_argument("--batch", help="(optional) run the LLM requests as provider batch jobs (non-interactive, lower cost)", action="store_true")
+    parser.add_argument("--batch-poll", help="(optional) seconds between batch status checks", type=float, default=30)
+
+def validate_batch_arguments(args: argparse.Namespace) -> None:
+    """Validates the batch backend command line arguments"""
+    if args.batch_poll <= 0:
+        print("Error: --batch-poll must be a positive number!")
+        exit(2)
+
+def print_batch_stats(backend: BatchBackend | None) -> None:
+    """Logs the backend counters (if the batch backend is in use)"""
+    if backend is None:
+        return
+
+    stats = backend.get_stats()
+    print(f"INFO\t Batch backend: {stats['batches']} batches, {stats['requests']} requests, {stats['failed_requests']} failed requests")
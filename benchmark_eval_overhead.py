@@ -0,0 +1,61 @@
+import json, time, asyncio
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.output_parsers import JsonOutputParser
+from eval import compile_tasks, analyze_text
+
+###
+# An utility script to measure the per-text overhead of
+# eval.py analysis (prompt/chain setup, serialization,
+# validation), excluding network time.
+#
+# The LLM is replaced with a zero-latency stub that answers
+# every task with an empty (schema-valid) list, and the
+# postagger with a whitespace tokenizer.
+#
+# Compares:
+#   * per-text -> tasks are compiled again for every text
+#   * compiled -> tasks are compiled once and shared
+###
+
+# --- params
+tasks_file = "./analysis_tasks/italian_analysis_tasks.json"
+superkeys = ["grammar"] # syntax tasks expect an object, the stub answers with a list
+samples = 200
+sample_text = "Ieri sono andato al mercato con mia sorella e abbiamo comprato tre mele rosse. " * 5
+
+# --- stubs
+class WhitespaceTagger():
+    """Tags every whitespace separated token as a noun"""
+    def tag_text(self, input: str) -> list[dict[str, str]]:
+        return [{"text": x, "pos": "NOUN"} for x in input.split()]
+
+stub_llm = RunnableLambda(lambda x: AIMessage(content="```json\n[]\n```"))
+
+# --- load data
+with open(tasks_file, "r", encoding="utf-8") as f_in:
+    tasks = json.load(f_in)
+
+tasks = {key: value for key, value in tasks.items() if key in superkeys}
+
+# --- benchmark
+async def run(compile_per_text: bool) -> float:
+    tagger = WhitespaceTagger()
+    tagger_lock = asyncio.Lock()
+    semaphore = asyncio.Semaphore(1)
+    json_parser = JsonOutputParser()
+
+    analysis_tasks = compile_tasks(tasks, stub_llm, json_parser)
+
+    start = time.perf_counter()
+    for _ in range(samples):
+        if compile_per_text:
+            analysis_tasks = compile_tasks(tasks, stub_llm, json_parser)
+
+        await analyze_text(sample_text, analysis_tasks, tagger, tagger_lock, semaphore)
+
+    return (time.perf_counter() - start) / samples
+
+for label, compile_per_text in [("per-text", True), ("compiled", False)]:
+    per_text = asyncio.run(run(compile_per_text))
+    print(f"{label}:\t{per_text * 1000:.3f} ms/text ({samples} samples, {sum(len(x) for x in tasks.values())} tasks)")
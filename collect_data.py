@@ -1,6 +1,7 @@
 import os, subprocess
-import pandas as pd
 import logging
+from data_io import read_table, write_table
+from metrics import load_metrics, summarize_metrics
 
 # logging settings
 logging.basicConfig(
@@ -12,6 +13,23 @@ logging.basicConfig(
 # root dir
 OUTPUT_DIR = "./vikidia_100"
 
+# intermediate/output files format (one of: .tsv, .parquet, .feather)
+OUTPUT_FORMAT = ".tsv"
+
+# LLM response cache shared by all tools (set to None to disable).
+# Set LLM_CACHE_READONLY to replay a run without writing to the cache.
+LLM_CACHE = os.path.join(OUTPUT_DIR, "llm_cache.sqlite")
+LLM_CACHE_READONLY = False
+USE_BATCH = False # run the LLM steps as provider batch jobs (non-interactive, lower cost)
+
+# paraphrase iteration memo shared by all strategies (set to None to disable):
+# text states already paraphrased (e.g. boilerplate sentences) skip the LLM call
+PARAPHRASE_MEMO = os.path.join(OUTPUT_DIR, "paraphrase_memo.sqlite")
+
+# LLM call metrics (tokens, latency, retries, cache hits) appended by all
+# tools, summarised at the end of the run (set to None to disable)
+LLM_METRICS = os.path.join(OUTPUT_DIR, "llm_metrics.jsonl")
+
 languages = ["en", "it"]
 models = ["gpt4o", "gpt4o-mini", "llama"]
 strategies = ["a", "b", "c", "d"]
@@ -93,9 +111,9 @@ def get_last_completed(outdir, language, model):
     created"""
     completed_strategies = []
     for strategy in strategies:
-        final_report = os.path.join(outdir, language, model, f"{strategy}.tsv")
-        grammar_output = os.path.join(outdir, language, model, f"{strategy}_grammar.tsv")
-        lexical_output = os.path.join(outdir, language, model, f"{strategy}_lexical.tsv")
+        final_report = os.path.join(outdir, language, model, f"{strategy}{OUTPUT_FORMAT}")
+        grammar_output = os.path.join(outdir, language, model, f"{strategy}_grammar{OUTPUT_FORMAT}")
+        lexical_output = os.path.join(outdir, language, model, f"{strategy}_lexical{OUTPUT_FORMAT}")
         
         if (os.path.exists(final_report) and 
             os.path.exists(grammar_output) and 
@@ -103,6 +121,31 @@ def get_last_completed(outdir, language, model):
             completed_strategies.append(strategy)
     return completed_strategies
 
+# --- LLM cache flags (passed to all LLM-driven tools)
+cache_flags = []
+if LLM_CACHE is not None:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    cache_flags = ["--cache", LLM_CACHE]
+    if LLM_CACHE_READONLY:
+        cache_flags.append("--cache-readonly")
+
+# --- LLM flags (cache and execution backend)
+llm_flags = cache_flags + (["--batch"] if USE_BATCH else [])
+
+# --- paraphrase iteration memo flags (passed to the paraphrase tool)
+memo_flags = []
+if PARAPHRASE_MEMO is not None:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    memo_flags = ["--memo-file", PARAPHRASE_MEMO]
+
+def get_metrics_flags(language, model, strategy):
+    """LLM metrics flags, tagging every record with the current run"""
+    if LLM_METRICS is None:
+        return []
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    return ["--metrics", LLM_METRICS, "--metrics-tags", f"language={language}", f"model={model}", f"strategy={strategy}"]
+
 # --- processing loop
 for language in languages:
     # make outdirs
@@ -154,12 +197,12 @@ for language in languages:
             logging.info(f"Starting: [{language}] x [{model}] x [{strategy}]")
             print(f"Starting: [{language}] x [{model}] x [{strategy}]")
 
-            final_report = os.path.join(outdir, f"{strategy}.tsv")
+            final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
             if not os.path.exists(final_report):
                 match strategy:
                     # a - single step paraphrase with cot
                     case "a":
-                        par_output = os.path.join(outdir, f"{language}_{model}_paradvocab.tsv")
+                        par_output = os.path.join(outdir, f"{language}_{model}_paradvocab{OUTPUT_FORMAT}")
                         if not os.path.exists(par_output):
                             paraphrase_args = ["python", paraphrase_tool,
                                             input_file,
@@ -167,6 +210,9 @@ for language in languages:
                                             "-l", "text",
                                             "-s", tools_language,
                                             "-r", tools_retries,
+                                            *llm_flags,
+                                            *memo_flags,
+                                            *get_metrics_flags(language, model, strategy),
                                             "-t", "fulltext",
                                             "-o", par_output,
                                             "-d",
@@ -181,14 +227,14 @@ for language in languages:
                                 print(f"Paraphrase failed or output file not created: {par_output}")
                                 continue
                         
-                        final_report = os.path.join(outdir, f"{strategy}.tsv")
+                        final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
                         if not os.path.exists(final_report):
                             try:
                                 if os.path.exists(par_output):
-                                    final_df = pd.read_csv(par_output, sep="\t", encoding="utf-8", header=0)
+                                    final_df = read_table(par_output)
                                     final_df = final_df[["paraphrase"]]
                                     final_df = final_df.rename(columns={"paraphrase": "text"})
-                                    final_df.to_csv(final_report, sep="\t", index=False, encoding="utf-8")
+                                    write_table(final_df, final_report)
                                     logging.info(f"Created final report: {final_report}")
                                     print(f"Created final report: {final_report}")
                                 else:
@@ -200,7 +246,7 @@ for language in languages:
 
                     # b - single step paraphrase without cot
                     case "b":
-                        par_output = os.path.join(outdir, f"{language}_{model}_paradvocab_nocot.tsv")
+                        par_output = os.path.join(outdir, f"{language}_{model}_paradvocab_nocot{OUTPUT_FORMAT}")
                         if not os.path.exists(par_output):
                             paraphrase_args = ["python", paraphrase_tool,
                                             input_file,
@@ -208,6 +254,9 @@ for language in languages:
                                             "-l", "text",
                                             "-s", tools_language,
                                             "-r", tools_retries,
+                                            *llm_flags,
+                                            *memo_flags,
+                                            *get_metrics_flags(language, model, strategy),
                                             "-t", "nocot",
                                             "-o", par_output,
                                             "-d",
@@ -222,14 +271,14 @@ for language in languages:
                                 print(f"Paraphrase failed or output file not created: {par_output}")
                                 continue
                         
-                        final_report = os.path.join(outdir, f"{strategy}.tsv")
+                        final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
                         if not os.path.exists(final_report):
                             try:
                                 if os.path.exists(par_output):
-                                    final_df = pd.read_csv(par_output, sep="\t", encoding="utf-8", header=0)
+                                    final_df = read_table(par_output)
                                     final_df = final_df[["paraphrase"]]
                                     final_df = final_df.rename(columns={"paraphrase": "text"})
-                                    final_df.to_csv(final_report, sep="\t", index=False, encoding="utf-8")
+                                    write_table(final_df, final_report)
                                     logging.info(f"Created final report: {final_report}")
                                     print(f"Created final report: {final_report}")
                                 else:
@@ -241,7 +290,7 @@ for language in languages:
 
                     # c - two steps with cot
                     case "c":
-                        par_output = os.path.join(outdir, f"{language}_{model}_par.tsv")
+                        par_output = os.path.join(outdir, f"{language}_{model}_par{OUTPUT_FORMAT}")
                         if not os.path.exists(par_output):
                             paraphrase_args = ["python", paraphrase_tool,
                                             input_file,
@@ -249,6 +298,9 @@ for language in languages:
                                             "-l", "text",
                                             "-s", tools_language,
                                             "-r", tools_retries,
+                                            *llm_flags,
+                                            *memo_flags,
+                                            *get_metrics_flags(language, model, strategy),
                                             "-t", "fulltext",
                                             "-o", par_output,
                                             "-d",
@@ -263,7 +315,7 @@ for language in languages:
                                 print(f"Paraphrase failed or output file not created: {par_output}")
                                 continue
 
-                        simpl_output = os.path.join(outdir, f"{language}_{model}_vocab.tsv")
+                        simpl_output = os.path.join(outdir, f"{language}_{model}_vocab{OUTPUT_FORMAT}")
                         if not os.path.exists(simpl_output) and os.path.exists(par_output):
                             simpl_args = ["python", simplification_tool,
                                         par_output,
@@ -272,6 +324,8 @@ for language in languages:
                                         "-c", "A1",
                                         "-p", tools_language,
                                         "-r", tools_retries,
+                                        *llm_flags,
+                                        *get_metrics_flags(language, model, strategy),
                                         "-o", simpl_output,
                                         "-d",
                                         ]
@@ -285,14 +339,14 @@ for language in languages:
                                 print(f"Simplification failed or output file not created: {simpl_output}")
                                 continue
 
-                        final_report = os.path.join(outdir, f"{strategy}.tsv")
+                        final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
                         if not os.path.exists(final_report):
                             try:
                                 if os.path.exists(simpl_output):
-                                    final_df = pd.read_csv(simpl_output, sep="\t", encoding="utf-8", header=0)
+                                    final_df = read_table(simpl_output)
                                     final_df = final_df[["simplified"]]
                                     final_df = final_df.rename(columns={"simplified": "text"})
-                                    final_df.to_csv(final_report, sep="\t", index=False, encoding="utf-8")
+                                    write_table(final_df, final_report)
                                     logging.info(f"Created final report: {final_report}")
                                     print(f"Created final report: {final_report}")
                                 else:
@@ -304,7 +358,7 @@ for language in languages:
 
                     # d - two steps without cot
                     case "d":
-                        par_output = os.path.join(outdir, f"{language}_{model}_par_nocot.tsv")
+                        par_output = os.path.join(outdir, f"{language}_{model}_par_nocot{OUTPUT_FORMAT}")
                         if not os.path.exists(par_output):
                             paraphrase_args = ["python", paraphrase_tool,
                                             input_file,
@@ -312,6 +366,9 @@ for language in languages:
                                             "-l", "text",
                                             "-s", tools_language,
                                             "-r", tools_retries,
+                                            *llm_flags,
+                                            *memo_flags,
+                                            *get_metrics_flags(language, model, strategy),
                                             "-t", "nocot",
                                             "-o", par_output,
                                             "-d",
@@ -326,7 +383,7 @@ for language in languages:
                                 print(f"Paraphrase failed or output file not created: {par_output}")
                                 continue
 
-                        simpl_output = os.path.join(outdir, f"{language}_{model}_vocab_nocot.tsv")
+                        simpl_output = os.path.join(outdir, f"{language}_{model}_vocab_nocot{OUTPUT_FORMAT}")
                         if not os.path.exists(simpl_output) and os.path.exists(par_output):
                             simpl_args = ["python", simplification_tool,
                                         par_output,
@@ -335,6 +392,8 @@ for language in languages:
                                         "-c", "A1",
                                         "-p", tools_language,
                                         "-r", tools_retries,
+                                        *llm_flags,
+                                        *get_metrics_flags(language, model, strategy),
                                         "-o", simpl_output,
                                         "-d",
                                         ]
@@ -348,14 +407,14 @@ for language in languages:
                                 print(f"Simplification failed or output file not created: {simpl_output}")
                                 continue
 
-                        final_report = os.path.join(outdir, f"{strategy}.tsv")
+                        final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
                         if not os.path.exists(final_report):
                             try:
                                 if os.path.exists(simpl_output):
-                                    final_df = pd.read_csv(simpl_output, sep="\t", encoding="utf-8", header=0)
+                                    final_df = read_table(simpl_output)
                                     final_df = final_df[["simplified"]]
                                     final_df = final_df.rename(columns={"simplified": "text"})
-                                    final_df.to_csv(final_report, sep="\t", index=False, encoding="utf-8")
+                                    write_table(final_df, final_report)
                                     logging.info(f"Created final report: {final_report}")
                                     print(f"Created final report: {final_report}")
                                 else:
@@ -366,7 +425,7 @@ for language in languages:
                                 print(f"Error creating final report: {e}")
 
             # redefine variable to avoid scoping issues
-            final_report = os.path.join(outdir, f"{strategy}.tsv")
+            final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
             
             # step 2 - paraphrase analysis
             grammar_tool = config["grammar_tool"]
@@ -378,7 +437,8 @@ for language in languages:
 
             if os.path.exists(final_report):
                 # 2a - grammar analysis
-                grammar_output = os.path.join(outdir, f"{strategy}_grammar.tsv")
+                grammar_output = os.path.join(outdir, f"{strategy}_grammar{OUTPUT_FORMAT}")
+                grammar_journal = os.path.join(outdir, f"{strategy}_grammar_journal.jsonl")
                 if not os.path.exists(grammar_output): 
                     grammar_args = ["python", grammar_tool,
                         final_report,
@@ -386,10 +446,17 @@ for language in languages:
                         "-p", tools_language,
                         "-l", "text",
                         "-r", tools_retries,
+                        *llm_flags,
+                        *get_metrics_flags(language, model, strategy),
                         "-o", grammar_output,
+                        "-j", grammar_journal,
                         "-d"
                     ]
 
+                    # an interrupted grammar analysis is resumed from its journal
+                    if os.path.exists(grammar_journal):
+                        grammar_args.append("--resume")
+
                     success = run_subprocess(grammar_args, f"Running grammar analysis for [{language}] x [{model}] x [{strategy}]")
                     
                     if not success or not os.path.exists(grammar_output):
@@ -397,7 +464,7 @@ for language in languages:
                         print(f"Grammar analysis failed or output file not created: {grammar_output}")
 
                 # 2b - lexical analysis
-                lexical_output = os.path.join(outdir, f"{strategy}_lexical.tsv")
+                lexical_output = os.path.join(outdir, f"{strategy}_lexical{OUTPUT_FORMAT}")
                 if not os.path.exists(lexical_output): 
                     lexical_args = ["python", lexical_tool,
                         final_report,
@@ -420,11 +487,28 @@ for language in languages:
     for model in models:
         for strategy in strategies:
             outdir = os.path.join(OUTPUT_DIR, language, model)
-            final_report = os.path.join(outdir, f"{strategy}.tsv")
-            grammar_output = os.path.join(outdir, f"{strategy}_grammar.tsv")
-            lexical_output = os.path.join(outdir, f"{strategy}_lexical.tsv")
+            final_report = os.path.join(outdir, f"{strategy}{OUTPUT_FORMAT}")
+            grammar_output = os.path.join(outdir, f"{strategy}_grammar{OUTPUT_FORMAT}")
+            lexical_output = os.path.join(outdir, f"{strategy}_lexical{OUTPUT_FORMAT}")
             
             print(f"[{language}] x [{model}] x [{strategy}]:")
             print(f"\tfinal report: {'OK' if os.path.exists(final_report) else 'KO'}")
             print(f"\tgrammar analysis: {'OK' if os.path.exists(grammar_output) else 'KO'}")
-            print(f"\tlexical lexical: {'OK' if os.path.exists(lexical_output) else 'KO'}")
\ No newline at end of file
+            print(f"\tlexical lexical: {'OK' if os.path.exists(lexical_output) else 'KO'}")
+# --- LLM metrics summary
+if LLM_METRICS is not None and os.path.exists(LLM_METRICS):
+    metrics_df = load_metrics(LLM_METRICS)
+    if len(metrics_df) > 0:
+        run_summary = summarize_metrics(metrics_df, ["language", "model", "strategy"])
+        step_summary = summarize_metrics(metrics_df, ["language", "model", "strategy", "tool", "step"])
+        row_summary = summarize_metrics(metrics_df, ["language", "model", "strategy", "tool", "row"])
+
+        write_table(step_summary, os.path.join(OUTPUT_DIR, f"llm_metrics_steps{OUTPUT_FORMAT}"))
+        write_table(row_summary, os.path.join(OUTPUT_DIR, f"llm_metrics_rows{OUTPUT_FORMAT}"))
+
+        print("\nLLM metrics:")
+        for _, run in run_summary.iterrows():
+            print(f"[{run['language']}] x [{run['model']}] x [{run['strategy']}]:")
+            print(f"\tcalls: {run['calls']} (errors: {run['errors']}, retries: {run['retries']}, cache hits: {run['cache_hits']})")
+            print(f"\ttokens: {run['prompt_tokens']} prompt + {run['completion_tokens']} completion = {run['total_tokens']}")
+            print(f"\tlatency: {run['latency_mean']}s mean, {run['latency_p95']}s p95")
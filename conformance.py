@@ -0,0 +1,228 @@
+import json, argparse, threading
+from collections.abc import Callable
+from mappings import upos_to_simple
+from utils import get_irregular_verb_lexicon
+
+###
+# In-process (LLM free) conformance checks.
+#
+# A text is checked locally, on its POS tags and lemmas:
+#   * lexical coverage: content words (nouns, verbs, adjectives, adverbs)
+#     must be in a word list, up to a given level (see lexical_analyzer.py)
+#   * grammar pre-checks: cheap rule-based checks of violations that are
+#     visible on POS tags and lemmas alone (e.g. irregular verbs)
+#
+# Grammar features that need an LLM analysis (moods, tenses, clauses...)
+# are not verified here: a text passing the checks is not guaranteed to
+# pass eval.py.
+###
+
+# word list POS tags (simple tags, see mappings.py) checked for coverage
+CONTENT_POS = ["n", "v", "a", "r"]
+
+def load_lemma_tagger(language: str):
+    """Loads the language specific postagger (with lemmas) used for lexical checks.
+
+    Returns:
+        POSTagger | None: the tagger, None if the language is not supported
+    """
+    from pos_tagger import Language, TAGMethod, POSTagger
+
+    match language:
+        case "italian":
+            return POSTagger(language=Language.IT, method=TAGMethod.STANZA, include_lemma=True)
+        case "english":
+            return POSTagger(language=Language.EN, method=TAGMethod.STANZA, include_lemma=True)
+        case "russian":
+            return POSTagger(language=Language.RU, method=TAGMethod.SPACY, include_lemma=True)
+        case _:
+            return None
+
+def get_lemma(token: dict[str, str]) -> str:
+    """Returns the lemma of a tagged token (its text, if the tagger gave no lemma)"""
+    return token.get("lemma") or token["text"]
+
+class LexicalCoverageIndex():
+    """A lookup index over a tiered word list (and optional stopwords).
+
+    Word list levels are cumulative: level i includes the words of all
+    the preceding levels. Lookups are case-insensitive and are done
+    against precomputed frozensets, one per (level, POS).
+
+    Arguments:
+        word_lists (dict): the word list, {level: {pos: [lemma, ...]}}
+        stopwords (list[str] | None): (optional) words ignored by the checks
+    """
+    def __init__(self, word_lists: dict, stopwords: list[str] | None = None) -> None:
+        self.levels = list(word_lists.keys())
+        self._stopwords = frozenset(x.lower() for x in (stopwords or []))
+        self._vocabularies = {}
+
+        vocabulary = {}
+        for level in self.levels:
+            for pos, words in word_lists[level].items():
+                vocabulary[pos] = vocabulary.get(pos, frozenset()).union(x.lower() for x in words)
+            self._vocabularies[level] = dict(vocabulary)
+
+    def get_vocabulary(self, level: str) -> dict[str, frozenset[str]]:
+        """Returns the (lowercased) words allowed at a level, by POS"""
+        return self._vocabularies[level]
+
+    def is_stopword(self, word: str) -> bool:
+        """Checks if a word is a stopword (case-insensitive)"""
+        return word.lower() in self._stopwords
+
+    def conforms(self, lemma: str, pos: str, level: str) -> bool:
+        """Checks if a lemma (with its simple POS tag) is allowed at a level"""
+        return lemma.lower() in self._vocabularies[level].get(pos, ())
+
+    def get_unconform_words(self, tagged_text: list[dict[str, str]], level: str) -> list[str]:
+        """Lists the content words of a tagged text (simple POS tags, with lemmas)
+        that are not stopwords and are not allowed at a level"""
+        vocabulary = self._vocabularies[level]
+        return [
+            token["text"] for token in tagged_text
+            if token["pos"] in vocabulary and not self.is_stopword(token["text"]) and get_lemma(token).lower() not in vocabulary[token["pos"]]
+        ]
+
+# --- grammar pre-checks, by language
+# each check is given a tagged text (UD POS tags, with lemmas) and returns its violations
+def italian_irregular_verbs(tagged_text: list[dict[str, str]]) -> list[str]:
+    """Irregular verbs (lemmas) not allowed by the Italian A1 inventory"""
+    disallowed = get_irregular_verb_lexicon("italian").disallowed_irregulars
+    return [
+        f"[VERBS]: irregular verb '{get_lemma(token)}' (ref -> '{token['text']}')"
+        for token in tagged_text
+        if token["pos"] in ("VERB", "AUX") and get_lemma(token).lower() in disallowed
+    ]
+
+GRAMMAR_PRECHECKS = {
+    "italian": [italian_irregular_verbs],
+    "english": [],
+    "russian": []
+}
+
+class ConformanceChecker():
+    """Checks texts locally against the lexical constraints (word list coverage)
+    and the grammar pre-checks of a language. The tagger is shared, calls
+    are serialized so that checks can run in worker threads.
+
+    Arguments:
+        tagger (POSTagger): a postagger returning lemmas
+        index (LexicalCoverageIndex): the word list index
+        level (str): the highest word list level allowed
+        grammar_prechecks (list[Callable]): the grammar pre-checks to run
+        min_coverage (float): minimum percentage of content words in the word list
+    """
+    def __init__(
+        self,
+        tagger,
+        index: LexicalCoverageIndex,
+        level: str,
+        grammar_prechecks: list[Callable[[list[dict[str, str]]], list[str]]],
+        min_coverage: float = 100.0) -> None:
+        self._tagger = tagger
+        self._index = index
+        self._level = level
+        self._grammar_prechecks = grammar_prechecks
+        self._min_coverage = min_coverage
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.passed = 0
+
+    def get_violations(self, text: str) -> list[str]:
+        """Returns the local violations found in a text (lexical and grammar)"""
+        with self._lock:
+            tagged_text = self._tagger.tag_text(text)
+
+        violations = []
+        for precheck in self._grammar_prechecks:
+            violations.extend(precheck(tagged_text))
+
+        simple_text = [{**token, "pos": upos_to_simple.get(token["pos"], token["pos"])} for token in tagged_text]
+        content_words = [
+            token for token in simple_text
+            if token["pos"] in CONTENT_POS and not self._index.is_stopword(token["text"])
+        ]
+        unconform = self._index.get_unconform_words(content_words, self._level)
+        if len(content_words) > 0 and (len(content_words) - len(unconform)) / len(content_words) * 100 < self._min_coverage:
+            violations.extend(f"[LEXICON]: '{word}' is not in the word list" for word in unconform)
+
+        return violations
+
+    def check(self, text: str) -> bool:
+        """Checks if a text passes all the local checks"""
+        passed = len(self.get_violations(text)) == 0
+
+        with self._lock:
+            self.checks += 1
+            self.passed += passed
+
+        return passed
+
+def add_conformance_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the local conformance check command line arguments to a tool's parser"""
+    parser.add_argument("--early-stop", help="(optional) stop iterating as soon as an output passes the local conformance check (language of its postagger)", choices=['italian', 'english', 'russian'], type=str)
+    parser.add_argument("--wordlist", help="a JSON formatted wordlist used by the local conformance check (required with --early-stop)")
+    parser.add_argument("--wordlist-level", help="(optional) the highest wordlist level allowed by the local conformance check (default: the first level)")
+    parser.add_argument("--stopwords", help="(optional) a JSON formatted stopwords array, ignored by the local conformance check")
+    parser.add_argument("--min-coverage", help="(optional) minimum percentage of content words in the wordlist (default: 100)", type=float, default=100.0)
+
+def validate_conformance_arguments(args: argparse.Namespace) -> None:
+    """Validates the local conformance check command line arguments"""
+    if args.early_stop is None:
+        if args.wordlist is not None or args.wordlist_level is not None or args.stopwords is not None:
+            print("Error: --wordlist, --wordlist-level and --stopwords require --early-stop!")
+            exit(2)
+        return
+
+    if args.wordlist is None or not args.wordlist.lower().endswith(".json"):
+        print("Error: --early-stop requires a JSON formatted --wordlist!")
+        exit(2)
+
+    if args.stopwords is not None and not args.stopwords.lower().endswith(".json"):
+        print("Error: the supplied stopwords file is not a supported format!")
+        exit(2)
+
+    if not 0 <= args.min_coverage <= 100:
+        print("Error: --min-coverage must be a percentage (0-100)!")
+        exit(2)
+
+def setup_conformance_checker(args: argparse.Namespace) -> ConformanceChecker | None:
+    """Creates the local conformance checker from command line arguments"""
+    if args.early_stop is None:
+        return None
+
+    try:
+        with open(args.wordlist, "r", encoding="utf-8") as w_in:
+            word_list = json.load(w_in)
+
+        stopwords = None
+        if args.stopwords is not None:
+            with open(args.stopwords, "r", encoding="utf-8") as s_in:
+                stopwords = json.load(s_in)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: cannot load the local conformance check lists: {e}")
+        exit(2)
+
+    index = LexicalCoverageIndex(word_list, stopwords)
+    level = args.wordlist_level if args.wordlist_level is not None else index.levels[0]
+    if level not in index.levels:
+        print(f"Error: no level named '{level}' exists in '{args.wordlist}' (available levels: {index.levels})!")
+        exit(2)
+
+    return ConformanceChecker(
+        load_lemma_tagger(args.early_stop),
+        index,
+        level,
+        GRAMMAR_PRECHECKS[args.early_stop],
+        args.min_coverage
+    )
+
+def print_conformance_stats(checker: ConformanceChecker | None) -> None:
+    """Logs the local conformance check counters"""
+    if checker is None:
+        return
+
+    print(f"INFO\t Local conformance check: {checker.passed}/{checker.checks} outputs passed, {checker.passed} LLM rounds saved")
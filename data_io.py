@@ -0,0 +1,259 @@
+import os, json
+import pandas as pd
+
+###
+# Shared tabular I/O layer used by all analysis tools.
+#
+# The file format is selected using the file extension:
+#   .tsv              -> tab separated values (nested values are JSON encoded)
+#   .parquet          -> Apache Parquet (nested values are stored as list/struct columns)
+#   .feather, .arrow  -> Arrow IPC (nested values are stored as list/struct columns)
+#   .xlsx             -> Excel workbook (read only)
+###
+
+TSV_FORMAT = ".tsv"
+PARQUET_FORMAT = ".parquet"
+ARROW_FORMATS = [".feather", ".arrow"]
+XLSX_FORMAT = ".xlsx"
+
+# formats that can be both written and read back by the pipeline tools
+TABULAR_FORMATS = [TSV_FORMAT, PARQUET_FORMAT] + ARROW_FORMATS
+
+# formats that can be read (xlsx is produced by merge_data.py and lexical_analyzer.py)
+READABLE_FORMATS = TABULAR_FORMATS + [XLSX_FORMAT]
+
+def get_format(path: str) -> str:
+    """Returns the (lowercase) extension of a file path"""
+    return os.path.splitext(path)[-1].lower()
+
+def is_supported_format(path: str, formats: list[str] = TABULAR_FORMATS) -> bool:
+    """Checks if a file path has one of the given format extensions"""
+    return get_format(path) in formats
+
+def is_nested(value) -> bool:
+    """Returns True if a value is a list/dict (needs encoding in flat formats)"""
+    return isinstance(value, (list, tuple, dict))
+
+def find_table(path: str, formats: list[str] = READABLE_FORMATS) -> str | None:
+    """Given a file path (with or without extension), returns the first
+    existing file that shares its base name and has a supported extension.
+
+    Arguments:
+        path (str): a file path, e.g. './data/a.tsv' or './data/a'
+        formats (list[str]): the extensions to look for, in order of preference
+
+    Returns:
+        str | None: the path of an existing file, or None if no file was found
+    """
+    if os.path.isfile(path) and is_supported_format(path, formats):
+        return path
+
+    base = os.path.splitext(path)[0] if is_supported_format(path, READABLE_FORMATS) else path
+    for extension in formats:
+        candidate = f"{base}{extension}"
+        if os.path.isfile(candidate):
+            return candidate
+
+    return None
+
+def read_table(path: str, json_columns: list[str] = None) -> pd.DataFrame:
+    """Reads a table written by any of the pipeline tools.
+
+    Arguments:
+        path (str): the input file path, the format is detected from its extension
+        json_columns (list[str]): (optional) columns that contain nested data. When
+            stored as JSON strings (TSV, XLSX) these are decoded into python objects.
+
+    Returns:
+        pd.DataFrame: the table. Nested columns contain python lists/dicts.
+    """
+    match get_format(path):
+        case ".tsv":
+            df = pd.read_csv(path, sep="\t", encoding="utf-8", header=0)
+        case ".xlsx":
+            df = pd.read_excel(path, header=0)
+        case ".parquet":
+            import pyarrow.parquet as pq
+            df = _arrow_table_to_dataframe(pq.read_table(path))
+        case ".feather" | ".arrow":
+            import pyarrow.feather as feather
+            df = _arrow_table_to_dataframe(feather.read_table(path))
+        case _:
+            raise ValueError(f"Unsupported input format: '{path}'")
+
+    for column in (json_columns or []):
+        if column in df:
+            df[column] = df[column].map(_decode_json_value)
+
+    return df
+
+def write_table(df: pd.DataFrame, path: str, json_indent: int | None = None) -> None:
+    """Writes a table using the format selected by the file extension.
+
+    Columns containing lists/dicts are JSON encoded for TSV outputs, and
+    stored as native list/struct columns for Parquet and Arrow outputs.
+
+    Arguments:
+        df (pd.DataFrame): the table to write
+        path (str): the output file path
+        json_indent (int | None): (optional) indentation used for JSON encoded values (TSV only)
+    """
+    match get_format(path):
+        case ".tsv":
+            encoded = df.copy()
+            for column in _nested_columns(df):
+                encoded[column] = encoded[column].map(lambda x: encode_json_value(x, json_indent))
+            encoded.to_csv(path, sep="\t", index=False, encoding="utf-8")
+        case ".parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(_dataframe_to_arrow_table(df), path)
+        case ".feather" | ".arrow":
+            import pyarrow.feather as feather
+            feather.write_feather(_dataframe_to_arrow_table(df), path)
+        case _:
+            raise ValueError(f"Unsupported output format: '{path}'")
+
+class TableWriter():
+    """Writes a table incrementally, so that long runs can stream their
+    output instead of keeping it in memory. Rows are appended in chunks
+    of any size and written to disk every 'chunk_size' rows.
+
+    TSV outputs are identical to write_table's. Parquet and Arrow outputs
+    are written as row groups/record batches sharing the schema of the
+    first chunk: text columns are stored as strings and nested values as
+    JSON strings (use read_table's 'json_columns' to decode them).
+
+    Arguments:
+        path (str): the output file path, the format is selected by its extension
+        chunk_size (int): number of rows buffered before they are written
+        json_indent (int | None): (optional) indentation used for JSON encoded values
+    """
+    def __init__(self, path: str, chunk_size: int = 256, json_indent: int | None = None) -> None:
+        if not is_supported_format(path):
+            raise ValueError(f"Unsupported output format: '{path}'")
+
+        self.path = path
+        self.rows = 0
+        self._chunk_size = chunk_size
+        self._json_indent = json_indent
+        self._buffer = []
+        self._buffered_rows = 0
+        self._started = False
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Appends rows (with the same columns as the previous ones)"""
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+        if self._buffered_rows >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered rows to disk"""
+        if len(self._buffer) == 0:
+            return
+
+        df = pd.concat(self._buffer, ignore_index=True) if len(self._buffer) > 1 else self._buffer[0].reset_index(drop=True)
+        self._buffer = []
+        self._buffered_rows = 0
+
+        match get_format(self.path):
+            case ".tsv":
+                encoded = df.copy()
+                for column in _nested_columns(df):
+                    encoded[column] = encoded[column].map(lambda x: encode_json_value(x, self._json_indent))
+                encoded.to_csv(self.path, sep="\t", index=False, encoding="utf-8", mode="a" if self._started else "w", header=not self._started)
+            case _:
+                self._write_arrow(df)
+
+        self._started = True
+        self.rows += len(df)
+
+    def _write_arrow(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        arrays = []
+        for column in df.columns:
+            values = df[column]
+            if values.dtype == object:
+                values = values.map(lambda x: encode_json_value(x, self._json_indent) if is_nested(x) else (None if pd.isna(x) else str(x)))
+                arrays.append(pa.array(values.tolist(), type=pa.string()))
+            else:
+                arrays.append(pa.Array.from_pandas(values))
+        table = pa.Table.from_arrays(arrays, names=[str(x) for x in df.columns])
+
+        if self._writer is None:
+            self._schema = table.schema
+            if get_format(self.path) == PARQUET_FORMAT:
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self) -> None:
+        """Writes the remaining rows and completes the output file"""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def encode_json_value(value, indent: int | None = None):
+    """JSON encodes nested values, leaves scalars untouched"""
+    if is_nested(value):
+        return json.dumps(value, ensure_ascii=False, indent=indent)
+    return value
+
+def _decode_json_value(value):
+    """Decodes JSON strings, leaves already decoded values untouched"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+def _nested_columns(df: pd.DataFrame) -> list[str]:
+    """Lists the object columns that contain lists/dicts"""
+    return [
+        column for column in df.columns
+        if df[column].dtype == object and df[column].map(is_nested).any()
+    ]
+
+def _dataframe_to_arrow_table(df: pd.DataFrame):
+    """Converts a dataframe to an arrow table, inferring list/struct
+    types for nested columns. Nested columns with inconsistent
+    structures (which arrow cannot represent) fall back to JSON strings."""
+    import pyarrow as pa
+
+    df = df.reset_index(drop=True)
+    arrays = []
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and values.map(is_nested).any():
+            try:
+                array = pa.array(values.tolist())
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                array = pa.array(values.map(encode_json_value).tolist(), type=pa.string())
+        else:
+            array = pa.Array.from_pandas(values)
+        arrays.append(array)
+
+    return pa.Table.from_arrays(arrays, names=[str(x) for x in df.columns])
+
+def _arrow_table_to_dataframe(table) -> pd.DataFrame:
+    """Converts an arrow table to a dataframe, nested columns are converted
+    to python lists/dicts (instead of numpy arrays)."""
+    import pyarrow as pa
+
+    df = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_nested(field.type):
+            df[field.name] = pd.Series(table.column(field.name).to_pylist(), index=df.index, dtype=object)
+
+    return df
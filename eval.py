@@ -1,14 +1,23 @@
-import os, argparse, json
+import os, re, argparse, json, asyncio, hashlib, time
+from functools import partial
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from jsonschema import Draft202012Validator, ValidationError
 import pandas as pd
-from jsonschema import validate
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable
 from pos_tagger import POSTagger, Language, TAGMethod
-from parsers import parse_italian_analysis, parse_english_analysis
-from langchain_community.callbacks.manager import get_openai_callback
+from parsers import parse_italian_analysis, parse_english_analysis, parse_russian_analysis, italian_rules, english_rules, russian_rules
+from rules import RuleSet
+from llm_cache import add_cache_arguments, validate_cache_arguments, setup_llm_cache, print_cache_stats
+from rate_limiter import add_rate_limit_arguments, validate_rate_limit_arguments, get_rate_limiter, get_rate_limit_kwargs, with_rate_limit_retries, print_rate_limit_stats
+from utils import encode_tagged_text, TAGGED_TEXT_ENCODINGS
+from batch_backend import BatchBackend, add_batch_arguments, validate_batch_arguments, print_batch_stats
+from metrics import add_metrics_arguments, setup_metrics, print_metrics_stats, metrics_tags, track_usage
+from data_io import read_table, write_table, get_format, is_supported_format, TABULAR_FORMATS
 
 # load keys from local settings file
 if(os.getenv("PY_ENV") == "DEVELOPMENT"):
@@ -20,19 +29,51 @@ parser = argparse.ArgumentParser(
     description='Performs a series of analysis and evaluation tasks on input texts using an OAI LLM'
 )
 
-parser.add_argument("input", help="a TSV file containing the texts to evaluate")
-parser.add_argument("-t", "--tasks", help="a JSON file containing analysis tasks to perform", required=True)
+parser.add_argument("input", help="a TSV/Parquet/Arrow file containing the texts to evaluate (not needed with --from-analysis)", nargs="?")
+parser.add_argument("-t", "--tasks", help="a JSON file containing analysis tasks to perform (not needed with --from-analysis)")
 parser.add_argument("-p", "--postagger", help="the language to validate constraints against, used to initialize the postagger", required=True, choices=['italian', 'english', 'russian'], type=str)
 parser.add_argument("-l", "--label", help="(optional) the label of the column that contains input data", default="text")
 parser.add_argument('-a', '--analysis', help="(optional) perform analysis only", action='store_true')
 parser.add_argument('-s', "--syntax", help="(optional) perform syntax analysis", action='store_true')
 parser.add_argument('-d', '--debug', action='store_true', help="(optional) log additional information")
-parser.add_argument('-o', '--output', help="(optional) output file")
+parser.add_argument('-o', '--output', help="(optional) output file (TSV/Parquet/Arrow)")
 parser.add_argument('-r', '--retries', help="(optional) number of allowed retries if model output is invalid", type=int, default=0)
+parser.add_argument('-n', '--concurrency', help="(optional) maximum number of concurrent LLM requests", type=int, default=8)
+parser.add_argument('--input-format', help="(optional) tagged text encoding used in prompts, overrides the tasks' 'input_format'", choices=TAGGED_TEXT_ENCODINGS, default=None)
+parser.add_argument('--fused', help="(optional) merge the analysis tasks of a text into a single LLM request", action='store_true')
+parser.add_argument('-j', '--journal', help="(optional) JSONL journal where analyzed rows are appended as they complete (default: <output>_journal.jsonl)")
+parser.add_argument('--resume', help="(optional) resume an interrupted run from its journal (already analyzed rows are not sent to the LLM again)", action='store_true')
+parser.add_argument('--from-analysis', help="(optional) re-evaluate the 'analysis_data' stored in an analysis/eval output file or journal, without any LLM call")
+parser.add_argument('-w', '--workers', help="(optional) number of worker processes used by the evaluation step", type=int, default=os.cpu_count())
+parser.add_argument('--vectorized', help="(optional) evaluate all reports at once, as vectorised table operations (faster on large runs, --workers is ignored)", action='store_true')
+parser.add_argument('--no-errors-log', help="(optional) with --vectorized, skip the 'errors_log' column (error counts only)", action='store_true')
+add_cache_arguments(parser)
+add_rate_limit_arguments(parser)
+add_batch_arguments(parser)
+add_metrics_arguments(parser)
 
 def validate_args(args):
     """Validate command line arguments"""
-    if (not (os.path.isfile(args.input) and (os.path.splitext(args.input)[-1].lower() == ".tsv"))):
+    if args.workers < 1:
+        print("Error: --workers must be a positive integer!")
+        exit(2)
+
+    if args.no_errors_log and not args.vectorized:
+        print("Error: --no-errors-log can only be used with --vectorized!")
+        exit(2)
+
+    if args.vectorized and load_rule_set(args.postagger) is None:
+        print(f"Error: no evaluation rules are available for '{args.postagger}', --vectorized cannot be used!")
+        exit(2)
+
+    if args.from_analysis != None:
+        return validate_from_analysis_args(args), None
+
+    if args.input == None or args.tasks == None:
+        print("Error: the input file and the tasks file (-t) are required, unless --from-analysis is used!")
+        exit(2)
+
+    if (not (os.path.isfile(args.input) and is_supported_format(args.input))):
         print("Error: the input file does not exist or is not a supported format!")
         exit(2)
 
@@ -40,11 +81,25 @@ def validate_args(args):
         print("Error: the tasks file does not exist or is not a supported format!")
         exit(2)
 
-    output_file = args.output if args.output != None else (f"{os.path.splitext(args.input)[0]}_analysis.tsv" if args.analysis else f"{os.path.splitext(args.input)[0]}_eval.tsv")
+    input_format = get_format(args.input)
+    output_file = args.output if args.output != None else (f"{os.path.splitext(args.input)[0]}_analysis{input_format}" if args.analysis else f"{os.path.splitext(args.input)[0]}_eval{input_format}")
     if (os.path.exists(output_file) or not os.path.exists(os.path.dirname(os.path.abspath(output_file)))):
         print(f"Error: an output file with path '{output_file}' already exists!")
         exit(2)
 
+    if (not is_supported_format(output_file)):
+        print(f"Error: an unsupported output file format was specified. Please use one of {TABULAR_FORMATS}!")
+        exit(2)
+
+    journal_file = args.journal if args.journal != None else f"{os.path.splitext(output_file)[0]}_journal.jsonl"
+    if args.resume and not os.path.isfile(journal_file):
+        print(f"Error: cannot resume, the journal file '{journal_file}' does not exist!")
+        exit(2)
+
+    if not args.resume and os.path.exists(journal_file):
+        print(f"Error: a journal file with path '{journal_file}' already exists! Use --resume to continue the interrupted run.")
+        exit(2)
+
     if (not args.postagger in set([ "italian", "english", "russian" ])):
         print(f"Error: '{args.postagger}' is not a supported language to validate against!")
         exit(2)
@@ -53,6 +108,40 @@ def validate_args(args):
         print("Error: number of retries must be a positive integer!")
         exit(2)
 
+    if args.concurrency < 1:
+        print("Error: --concurrency must be a positive integer!")
+        exit(2)
+
+    validate_cache_arguments(args)
+    validate_rate_limit_arguments(args)
+    validate_batch_arguments(args)
+
+    if args.batch and args.fused:
+        print("Error: --fused cannot be used in --batch mode!")
+        exit(2)
+
+    return output_file, journal_file
+
+def validate_from_analysis_args(args):
+    """Validate command line arguments (offline re-evaluation mode)"""
+    if (not (os.path.isfile(args.from_analysis) and (is_supported_format(args.from_analysis) or get_format(args.from_analysis) == JOURNAL_FORMAT))):
+        print("Error: the analysis file does not exist or is not a supported format!")
+        exit(2)
+
+    if args.analysis:
+        print("Error: --analysis cannot be used with --from-analysis!")
+        exit(2)
+
+    input_format = get_format(args.from_analysis) if is_supported_format(args.from_analysis) else TABULAR_FORMATS[0]
+    output_file = args.output if args.output != None else f"{os.path.splitext(args.from_analysis)[0]}_eval{input_format}"
+    if (os.path.exists(output_file) or not os.path.exists(os.path.dirname(os.path.abspath(output_file)))):
+        print(f"Error: an output file with path '{output_file}' already exists!")
+        exit(2)
+
+    if (not is_supported_format(output_file)):
+        print(f"Error: an unsupported output file format was specified. Please use one of {TABULAR_FORMATS}!")
+        exit(2)
+
     return output_file
 
 def load_pos_tagger(language):
@@ -79,139 +168,754 @@ def load_evaluator(language, check_syntax):
     evaluator = None
     match language:
         case "italian":
-            evaluator = lambda x: parse_italian_analysis(x, check_syntax)
+            evaluator = partial(parse_italian_analysis, check_syntax=check_syntax)
         case "english":
-            evaluator = lambda x: parse_english_analysis(x, check_syntax)
+            evaluator = partial(parse_english_analysis, check_syntax=check_syntax)
         case "russian":
-            evaluator = None # to implement
+            evaluator = partial(parse_russian_analysis, check_syntax=check_syntax)
         case _:
             return None
 
     return evaluator
 
-def setup_llm():
+def load_rule_set(language) -> RuleSet | None:
+    """
+    loads the language specific evaluation rules (for vectorised evaluation).
+    """
+    match language:
+        case "italian":
+            return italian_rules
+        case "english":
+            return english_rules
+        case "russian":
+            return russian_rules
+        case _:
+            return None
+
+def setup_llm(rpm=None, tpm=None):
     model = "gpt-4o-2024-11-20"
     temperature = 0
     top_p = 1.00
 
-    return ChatOpenAI(
+    limiter = get_rate_limiter("openai", model, rpm, tpm)
+    llm = ChatOpenAI(
         model=model,
         temperature=temperature,
-        top_p=top_p
+        top_p=top_p,
+        **get_rate_limit_kwargs(limiter)
     )
 
-def analyze_text(
+    return with_rate_limit_retries(llm), limiter
+
+def setup_batch_backend(file_prefix, poll_interval):
+    """Configure the batch backend (same model and parameters used by setup_llm)"""
+    model = "gpt-4o-2024-11-20"
+    temperature = 0
+    top_p = 1.00
+
+    return BatchBackend(model, {"temperature": temperature, "top_p": top_p}, file_prefix, poll_interval=poll_interval)
+
+class AnalysisTask():
+    """A compiled analysis task.
+
+    Holds everything that does not depend on the text being
+    analyzed: the prompt template, the pre-serialized schema,
+    the compiled schema validator and the ready-to-use chain."""
+    def __init__(self, key: str, definition: dict, llm: Runnable, message_parser: Callable[..., dict], input_format: str | None = None) -> None:
+        self.key = key
+        self._llm = llm
+        self._message_parser = message_parser
+
+        # here we reformat optional shots
+        self.shots = list(map(lambda x: (x["role"], x["content"]), definition["shots"]))
+        self.prompt = definition["prompt"] if len(self.shots) == 0 else definition["shots_prompt"]
+
+        # the tagged text encoding the prompt expects (the override wins)
+        self.input_format = input_format or definition.get("input_format", "json")
+        if self.input_format not in TAGGED_TEXT_ENCODINGS:
+            raise ValueError(f"Task '{key}' declares an unsupported input format: '{self.input_format}'")
+
+        # tasks declaring trigger POS tags are skipped when the text has no such token
+        self.trigger_pos = frozenset(definition.get("trigger_pos", []))
+
+        self.schema = definition["schema"]
+        self.serialized_schema = json.dumps(self.schema, indent=4, ensure_ascii=False)
+
+        # the schema is checked once, here, instead of on every validation
+        Draft202012Validator.check_schema(self.schema)
+        self.validator = Draft202012Validator(self.schema, format_checker=Draft202012Validator.FORMAT_CHECKER)
+
+        # the result of a skipped task must be valid as well
+        self.empty_result = []
+        if len(self.trigger_pos) > 0:
+            self.validate(self.empty_result)
+
+        self.prompt_template = ChatPromptTemplate.from_messages(
+            [
+                MessagesPlaceholder("shots", optional=True),
+                ("user", self.prompt)
+            ]
+        )
+        self.chain = self.prompt_template | self._llm | self._message_parser
+
+    def get_inputs(self, serialized_input: str) -> dict:
+        """Binds a (serialized) tagged text to the task's chain inputs"""
+        if len(self.shots) == 0:
+            return {
+                "shots": self.shots,
+                "input": serialized_input,
+                "schema": self.serialized_schema
+            }
+        
+        return {
+            "shots": self.shots,
+            "input": serialized_input
+        }
+
+    def is_triggered(self, tagged_text: list[dict[str, str]]) -> bool:
+        """Checks if a tagged text contains at least one candidate
+        token for this task (tasks without triggers always run)"""
+        if len(self.trigger_pos) == 0:
+            return True
+
+        return any(token["pos"] in self.trigger_pos for token in tagged_text)
+
+    def validate(self, results) -> None:
+        """Validates a model response against the task schema.
+        Raises a ValueError listing ALL the schema violations found."""
+        errors = list(self.validator.iter_errors(results))
+
+        if len(errors) > 0:
+            raise ValueError(format_validation_errors(errors))
+
+    def get_retry_chain(self, previous_results, error: Exception) -> Runnable:
+        """Builds a chain that asks the model to correct its last (invalid) response"""
+        return self.get_retry_prompt(previous_results, error) | self._llm | self._message_parser
+
+    def get_retry_prompt(self, previous_results, error: Exception) -> ChatPromptTemplate:
+        """Builds a prompt that asks the model to correct its last (invalid) response"""
+        # Add feedback about the error to help model correct its output
+        error_message = str(error).replace("{", "{{").replace("}", "}}")
+        error_feedback = f"Your previous response was invalid. Please try again and ensure your output conforms to the schema.\n\nError: {error_message}\n\nIMPORTANT: Your response must be ONLY valid JSON without any additional text, explanations, or comments."
+        
+        # Escape curly braces for langchain template system
+        previous_results = json.dumps(previous_results, indent=4, ensure_ascii=False)
+        escaped_results = previous_results.replace("{", "{{").replace("}", "}}")
+        
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                MessagesPlaceholder("shots", optional=True),
+                ("user", self.prompt),
+                ("assistant", escaped_results),
+                ("user", error_feedback)
+            ]
+        )
+        return prompt
+
+def format_validation_errors(errors: list[ValidationError]) -> str:
+    """Formats a list of schema validation errors as a
+    single message (one violation per line)."""
+    lines = [f"The output contains {len(errors)} schema violation(s):"]
+    for error in errors:
+        lines.append(f"- at '{error.json_path}': {error.message}")
+
+    return "\n".join(lines)
+
+# --- fused analysis
+# regular expressions used to strip the input/schema blocks
+# from task prompts, leaving the task instructions only (an
+# "... on the following text:" lead-in is dropped with the block)
+FUSED_INPUT_BLOCK_PATTERN = r"(?:Given the following[^\n]*:\n|( on the following [^\n:]*):\n)?```\n\{input\}\n```\n?"
+FUSED_SCHEMA_BLOCK_PATTERN = r"(?:[^\n]*schema[^\n]*\n+)?```json\n\{schema\}\n```"
+FUSED_TRAILING_HEADINGS_PATTERN = r"(?:\n#+[^\n]*)+\s*$"
+
+FUSED_PROMPT_HEADER = "Given the following part-of-speech (POS) tagged text:\n```\n{input}\n```\nPerform ALL the analysis tasks described below on it."
+FUSED_PROMPT_FOOTER = "Respond with a single structured JSON object conforming to the schema attached below: each property holds the results of the analysis task with the same name. No additional comment or data is required.\n```json\n{schema}\n```"
+
+def get_task_instructions(task: AnalysisTask) -> str | None:
+    """Extracts the instructions of a task prompt, stripping its
+    input and schema blocks. Returns None if the task cannot be fused
+    (it uses shots, or references its input elsewhere in the prompt)."""
+    if len(task.shots) > 0:
+        return None
+
+    instructions = re.sub(FUSED_INPUT_BLOCK_PATTERN, lambda match: ".\n" if match.group(1) else "", task.prompt, count=1)
+    instructions = re.sub(FUSED_SCHEMA_BLOCK_PATTERN, "", instructions, count=1)
+    instructions = re.sub(FUSED_TRAILING_HEADINGS_PATTERN, "", instructions.strip())
+
+    instructions = instructions.strip()
+    if len(instructions) == 0 or "{input}" in instructions or "{schema}" in instructions:
+        return None
+
+    return instructions
+
+class FusedAnalysisTask():
+    """Multiple analysis tasks merged in a single request.
+
+    The model answers with a JSON object keyed by task name,
+    every section is then validated using its own task schema."""
+    def __init__(self, tasks: list[AnalysisTask]) -> None:
+        self.tasks = tasks
+        self.key = "+".join(task.key for task in tasks)
+        self.input_format = tasks[0].input_format
+        self._llm = tasks[0]._llm
+        self._message_parser = tasks[0]._message_parser
+
+        sections = [f"# Task: {task.key}\n{get_task_instructions(task)}" for task in tasks]
+        self.prompt = "\n\n".join([FUSED_PROMPT_HEADER] + sections + [FUSED_PROMPT_FOOTER])
+
+        # composite schema, sections are keyed by task name
+        self.schema = {
+            "$schema": "https://json-schema.org/draft/2020-12/schema",
+            "type": "object",
+            "properties": {
+                task.key: {key: value for key, value in task.schema.items() if key not in ["$schema", "$id"]}
+                for task in tasks
+            },
+            "required": [task.key for task in tasks],
+            "additionalProperties": False
+        }
+        self.serialized_schema = json.dumps(self.schema, indent=4, ensure_ascii=False)
+
+        self.prompt_template = ChatPromptTemplate.from_messages([("user", self.prompt)])
+        self.chain = self.prompt_template | self._llm | self._message_parser
+
+    def get_inputs(self, serialized_input: str) -> dict:
+        """Binds a (serialized) tagged text to the fused chain inputs"""
+        return {
+            "input": serialized_input,
+            "schema": self.serialized_schema
+        }
+
+class TaskFuser():
+    """Groups the analysis tasks of a text into fused tasks.
+
+    Only tasks without shots sharing the same input format
+    can be fused. Fused tasks are compiled once for every
+    distinct combination of tasks and then reused."""
+    def __init__(self) -> None:
+        self._fused_tasks = {}
+        self._fusable = {}
+
+    def is_fusable(self, task: AnalysisTask) -> bool:
+        """Checks (once per task) if a task can be fused"""
+        if task.key not in self._fusable:
+            self._fusable[task.key] = get_task_instructions(task) is not None
+
+        return self._fusable[task.key]
+
+    def fuse(self, tasks: list[AnalysisTask]) -> tuple[list[FusedAnalysisTask], list[AnalysisTask]]:
+        """Splits a list of tasks in fused tasks and tasks to run individually"""
+        groups = {}
+        individual_tasks = []
+        for task in tasks:
+            if not self.is_fusable(task):
+                individual_tasks.append(task)
+            else:
+                groups.setdefault(task.input_format, []).append(task)
+
+        fused_tasks = []
+        for group in groups.values():
+            if len(group) < 2:
+                individual_tasks.extend(group)
+                continue
+
+            key = tuple(task.key for task in group)
+            if key not in self._fused_tasks:
+                self._fused_tasks[key] = FusedAnalysisTask(group)
+            fused_tasks.append(self._fused_tasks[key])
+
+        return fused_tasks, individual_tasks
+
+def compile_tasks(tasks: dict, llm: Runnable, message_parser: Callable[..., dict], input_format: str | None = None) -> list[AnalysisTask]:
+    """Compiles a tasks collection (as loaded from the tasks JSON file)
+    into a list of analysis tasks, ready to be run on any text.
+    If an input format is given, it overrides the one declared by each task."""
+    return [
+        AnalysisTask(key, value, llm, message_parser, input_format)
+        for superkey in tasks.keys()
+        for key, value in tasks[superkey].items()
+    ]
+
+async def run_analysis_task(
+    task: AnalysisTask,
+    serialized_input: str,
+    semaphore: asyncio.Semaphore,
+    max_retries: int = 0):
+    """Run a single analysis task on a POS-tagged text
+    
+    Arguments:
+        task (AnalysisTask): the compiled analysis task
+        serialized_input (str): the POS-tagged input text (serialized using the task's input format)
+        semaphore (asyncio.Semaphore): limits the number of concurrent LLM requests
+        max_retries (int): maximum number of retries if the model output is invalid
+
+    Returns:
+        tuple: (task_results, task_warnings)
+    """
+    task_results = []
+    task_warnings = []
+
+    chain = task.chain
+    inputs = task.get_inputs(serialized_input)
+    
+    # Initialize retry counter and status
+    retries = 0
+    valid_output = False
+    results = []
+    
+    # Try to get valid output with retries
+    while not valid_output and retries <= max_retries:
+        try:
+            async with semaphore:
+                with metrics_tags(task=task.key, attempt=retries + 1):
+                    results = await chain.ainvoke(input=inputs)
+            
+            # Validate output using schema supplied
+            task.validate(results)
+            valid_output = True
+            task_results = results
+            
+        except Exception as e:
+            retries += 1
+            if retries <= max_retries:
+                chain = task.get_retry_chain(results, e)
+            else:
+                # Max retries exceeded
+                task_results = []
+                task_warnings.append(f"ERROR: Got an invalid output when processing '{task.key}' analysis task after {max_retries+1} attempts! Error: {str(e)}")
+    
+    # Log retry information if debug is enabled
+    if retries > 0 and valid_output:
+        task_warnings.append(f"WARNING: Task '{task.key}' succeeded after {retries+1} attempts.")
+
+    return task_results, task_warnings
+
+async def run_fused_analysis_task(
+    fused_task: FusedAnalysisTask,
+    serialized_input: str,
+    semaphore: asyncio.Semaphore,
+    max_retries: int = 0):
+    """Run a fused analysis task on a POS-tagged text. Sections that are
+    missing or invalid are re-issued individually (with retries).
+
+    Arguments:
+        fused_task (FusedAnalysisTask): the fused analysis task
+        serialized_input (str): the POS-tagged input text (serialized using the tasks' input format)
+        semaphore (asyncio.Semaphore): limits the number of concurrent LLM requests
+        max_retries (int): maximum number of retries for the re-issued tasks
+
+    Returns:
+        dict: (task_results, task_warnings) for each fused task, keyed by task name
+    """
+    outputs = {}
+    failed_tasks = []
+    fused_error = None
+
+    try:
+        async with semaphore:
+            with metrics_tags(task=fused_task.key, attempt=1):
+                results = await fused_task.chain.ainvoke(input=fused_task.get_inputs(serialized_input))
+
+        if not isinstance(results, dict):
+            raise ValueError("the output is not a JSON object!")
+    except Exception as e:
+        results = {}
+        fused_error = e
+
+    for task in fused_task.tasks:
+        try:
+            if task.key not in results:
+                raise ValueError(f"missing '{task.key}' section")
+
+            task.validate(results[task.key])
+            outputs[task.key] = (results[task.key], [])
+        except Exception as e:
+            # a failed fused request fails all of its sections
+            failed_tasks.append((task, fused_error if fused_error is not None else e))
+
+    # re-issue failing sections only
+    fallback_outputs = await asyncio.gather(*[
+        run_analysis_task(task, serialized_input, semaphore, max_retries)
+        for task, _ in failed_tasks
+    ])
+
+    for (task, error), (task_results, task_warnings) in zip(failed_tasks, fallback_outputs):
+        outputs[task.key] = (task_results, [f"WARNING: Task '{task.key}' failed in fused mode and was re-issued individually. Error: {str(error)}"] + task_warnings)
+
+    return outputs
+
+async def analyze_text(
     text: str,
-    tasks: dict,
-    llm: ChatOpenAI,
-    message_parser: Callable[..., dict],
+    tasks: list[AnalysisTask],
     tagger: POSTagger,
-    analyze_syntax: bool,
-    max_retries: int = 0):
-    """Analyze a single text chunk
+    tagger_lock: asyncio.Lock,
+    semaphore: asyncio.Semaphore,
+    max_retries: int = 0,
+    fuser: TaskFuser | None = None):
+    """Analyze a single text chunk. All the analysis tasks
+    are run concurrently, except tasks with no candidate tokens
+    in the text, which are skipped (their result is empty).
+    If a task fuser is given, tasks are merged in fused requests.
     
     Arguments:
         text (str): the input text to analyze
-        tasks (dict): a dict defining analysis subtasks
-        llm (ChatOpenAI): the langchain LLM instance
-        message_parser (Callable[..., dict]): AIMessage output parser, should return a dict
+        tasks (list[AnalysisTask]): the compiled analysis tasks
         tagger (POSTagger): the postagger to use
-        analyze_syntax (bool): set to False to skip syntax analysis tasks
+        tagger_lock (asyncio.Lock): serializes access to the postagger
+        semaphore (asyncio.Semaphore): limits the number of concurrent LLM requests
         max_retries (int): maximum number of retries if the model output is invalid
+        fuser (TaskFuser | None): (optional) merges tasks in fused requests
+
+    Returns:
+        tuple: (analysis_report, consumed_tokens, analysis_warnings, tagged_text, skipped_tasks)
     """
 
     analysis_report = {}
     consumed_tokens = 0
     analysis_warnings = []
 
-    # we drop tasks keys if syntax needs to be skipped
-    if not analyze_syntax:
-        if 'syntax' in tasks: del tasks['syntax']
-
-    # tag the input text
-    tagged_text = tagger.tag_text(text)
+    # tag the input text (in a worker thread, so other texts' requests can proceed)
+    async with tagger_lock:
+        with metrics_tags(step="pos_tagging"):
+            tagged_text = await asyncio.to_thread(tagger.tag_text, text)
 
-    with get_openai_callback() as cb:
-        for superkey in tasks.keys():
-            for key, value in tasks[superkey].items():
+    # pre-filter: tasks with no candidate tokens do not need an LLM call
+    triggered_tasks = [task for task in tasks if task.is_triggered(tagged_text)]
+    skipped_tasks = len(tasks) - len(triggered_tasks)
 
-                # extract data
-                task_shots = value["shots"]
-                # here we reformat optional shots
-                shots = list(map(lambda x: (x["role"], x["content"]), task_shots))
+    # the input is serialized once per encoding and shared by all tasks
+    serialized_inputs = {
+        encoding: encode_tagged_text(tagged_text, encoding)
+        for encoding in set(task.input_format for task in triggered_tasks)
+    }
 
-                task_schema = value["schema"]
-                task_prompt = value["prompt"] if len(shots) == 0 else value["shots_prompt"]
+    fused_tasks, individual_tasks = fuser.fuse(triggered_tasks) if fuser is not None else ([], triggered_tasks)
 
-                prompt = ChatPromptTemplate.from_messages(
-                    [
-                        MessagesPlaceholder("shots", optional=True),
-                        ("user", task_prompt)
-                    ]
-                )
-                chain = prompt | llm | message_parser
-                
-                # Initialize retry counter and status
-                retries = 0
-                valid_output = False
-                results = []
-                
-                # Try to get valid output with retries
-                while not valid_output and retries <= max_retries:
-                    try:
-                        if len(shots) == 0:
-                            results = chain.invoke(
-                                input={
-                                    "shots": shots,
-                                    "input": json.dumps(tagged_text, indent=4, ensure_ascii=False),
-                                    "schema": json.dumps(task_schema, indent=4, ensure_ascii=False)
-                                }
-                            )
-                        else:
-                            results = chain.invoke(
-                                input={
-                                    "shots": shots,
-                                    "input": json.dumps(tagged_text, indent=4, ensure_ascii=False),
-                                }
-                            )
-                        
-                        # Validate output using schema supplied
-                        validate(instance=results, schema=task_schema)
-                        valid_output = True
-                        analysis_report[key] = results
-                        
-                    except Exception as e:
-                        retries += 1
-                        if retries <= max_retries:
-                            # Add feedback about the error to help model correct its output
-                            error_message = str(e).replace("{", "{{").replace("}", "}}")
-                            error_feedback = f"Your previous response was invalid. Please try again and ensure your output conforms to the schema.\n\nError: {error_message}\n\nIMPORTANT: Your response must be ONLY valid JSON without any additional text, explanations, or comments."
-                            
-                            # Escape curly braces for langchain template system
-                            previous_results = json.dumps(results, indent=4, ensure_ascii=False)
-                            escaped_results = previous_results.replace("{", "{{").replace("}", "}}")
-                            
-                            prompt = ChatPromptTemplate.from_messages(
-                                [
-                                    MessagesPlaceholder("shots", optional=True),
-                                    ("user", task_prompt),
-                                    ("assistant", escaped_results),
-                                    ("user", error_feedback)
-                                ]
-                            )
-                            chain = prompt | llm | message_parser
-                        else:
-                            # Max retries exceeded
-                            analysis_report[key] = []
-                            analysis_warnings.append(f"ERROR: Got an invalid output when processing '{key}' analysis task after {max_retries+1} attempts! Error: {str(e)}")
-                
-                # Log retry information if debug is enabled
-                if retries > 0 and valid_output:
-                    analysis_warnings.append(f"WARNING: Task '{key}' succeeded after {retries+1} attempts.")
+    with track_usage() as usage, metrics_tags(step="analysis"):
+        individual_outputs, fused_outputs = await asyncio.gather(
+            asyncio.gather(*[
+                run_analysis_task(task, serialized_inputs[task.input_format], semaphore, max_retries)
+                for task in individual_tasks
+            ]),
+            asyncio.gather(*[
+                run_fused_analysis_task(fused_task, serialized_inputs[fused_task.input_format], semaphore, max_retries)
+                for fused_task in fused_tasks
+            ])
+        )
         
-        consumed_tokens = cb.total_tokens
+        consumed_tokens = usage.total_tokens
+
+    task_outputs = dict(zip([task.key for task in individual_tasks], individual_outputs))
+    for outputs in fused_outputs:
+        task_outputs.update(outputs)
+    for task in tasks:
+        task_results, task_warnings = task_outputs.get(task.key, (list(task.empty_result), []))
+        analysis_report[task.key] = task_results
+        analysis_warnings.extend(task_warnings)
+
+    return analysis_report, consumed_tokens, analysis_warnings, tagged_text, skipped_tasks
+
+async def analyze_texts(
+    texts: list[str],
+    tasks: list[AnalysisTask],
+    tagger: POSTagger,
+    max_retries: int = 0,
+    concurrency: int = 1,
+    fuser: TaskFuser | None = None,
+    on_result: Callable[[int, tuple], None] | None = None,
+    row_ids: list[int] | None = None):
+    """Analyze a list of texts. Texts (and their analysis tasks)
+    are processed concurrently, with at most 'concurrency' LLM
+    requests in flight. If given, 'on_result' is called with the
+    index and the results of each text as soon as it completes,
+    and 'row_ids' are the input rows of the texts (metrics tags).
+
+    Returns:
+        list[tuple]: (analysis_report, consumed_tokens, analysis_warnings, tagged_text, skipped_tasks) for each text, in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tagger_lock = asyncio.Lock()
+    completed = 0
+
+    async def analyze(index, input_text):
+        nonlocal completed
+        with metrics_tags(row=row_ids[index] if row_ids is not None else index):
+            results = await analyze_text(input_text, tasks, tagger, tagger_lock, semaphore, max_retries, fuser)
+        completed += 1
+        print(f"INFO\t Analyzed sample [{completed}/{len(texts)}]")
+        if on_result is not None:
+            on_result(index, results)
+        return results
+
+    return await asyncio.gather(*[analyze(index, input_text) for index, input_text in enumerate(texts)])
+
+JOURNAL_FORMAT = ".jsonl"
+JOURNAL_SYNC_ROWS = 64
+JOURNAL_SYNC_INTERVAL = 5.0
+
+class AnalysisJournal():
+    """An append-only JSONL journal of analyzed rows.
+
+    The journal starts with the configuration of its run (see
+    get_journal_config). Every row is written (and flushed) as soon
+    as its analysis completes, so an interrupted run can be resumed
+    without repeating the LLM calls already paid for. The file is
+    synced to disk every JOURNAL_SYNC_ROWS rows or JOURNAL_SYNC_INTERVAL
+    seconds, and when the journal is closed."""
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.config = None
+        self._file = None
+        self._unsynced = 0
+        self._synced_at = 0.0
+
+    def load(self) -> dict[int, dict]:
+        """Loads the journaled rows, keyed by row index (and the run
+        configuration). A truncated last line (left by a crash while
+        writing) is ignored."""
+        records = {}
+        if not os.path.isfile(self.path):
+            return records
+
+        with open(self.path, "r", encoding="utf-8") as f_in:
+            for line in f_in:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "index" not in record:
+                    self.config = record.get("config")
+                    continue
+                records[record["index"]] = record
+
+        return records
+
+    def open(self, config: dict | None = None) -> None:
+        """Opens the journal for appending, writing the run configuration
+        first (for a new journal)"""
+        self._file = open(self.path, "a", encoding="utf-8")
+        if config is not None:
+            self.config = config
+            self._file.write(json.dumps({"config": config}, ensure_ascii=False) + "\n")
+        self.sync()
+
+    def append(self, record: dict) -> None:
+        """Appends a row to the journal"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= JOURNAL_SYNC_ROWS or time.monotonic() - self._synced_at >= JOURNAL_SYNC_INTERVAL:
+            self.sync()
+
+    def sync(self) -> None:
+        """Syncs the rows appended so far to disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self) -> None:
+        """Syncs and closes the journal"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+def get_journal_config(args, tasks: dict) -> dict:
+    """Returns the run configuration recorded in the journal: a run
+    is resumed only with the same tasks and analysis flags"""
+    return {
+        "tasks": list(tasks.keys()),
+        "tasks_hash": hashlib.sha256(json.dumps(tasks, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest(),
+        "postagger": args.postagger,
+        "syntax": args.syntax,
+        "input_format": args.input_format,
+        "fused": args.fused
+    }
+
+def evaluate_reports(
+    evaluator: Callable[..., dict],
+    analysis_data: list[dict],
+    texts: list[str] | None = None,
+    pos_tags: list[list[dict]] | None = None,
+    workers: int = 1) -> list[dict]:
+    """Evaluates a list of analysis reports. Reports are evaluated
+    in parallel worker processes (the evaluator must be picklable).
+
+    Arguments:
+        evaluator (Callable): the language specific evaluation parser
+        analysis_data (list[dict]): the analysis reports
+        texts (list[str] | None): (optional) the analyzed texts
+        pos_tags (list[list[dict]] | None): (optional) the POS tags of the analyzed texts
+        workers (int): the number of worker processes (1 -> no worker processes)
+
+    Returns:
+        list[dict]: the evaluation reports, in input order
+    """
+    texts = texts if texts is not None else [None] * len(analysis_data)
+    pos_tags = pos_tags if pos_tags is not None else [None] * len(analysis_data)
+    evaluate = partial(evaluate_report, evaluator)
+
+    if workers == 1 or len(analysis_data) <= 1:
+        results = map(evaluate, analysis_data, texts, pos_tags)
+        return [log_evaluated(i, len(analysis_data), x) for i, x in enumerate(results)]
 
-    return analysis_report, consumed_tokens, analysis_warnings, tagged_text
+    chunksize = max(1, len(analysis_data) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(evaluate, analysis_data, texts, pos_tags, chunksize=chunksize)
+        return [log_evaluated(i, len(analysis_data), x) for i, x in enumerate(results)]
+
+def evaluate_report(evaluator: Callable[..., dict], analysis_report: dict, text: str | None, pos_tags: list[dict] | None) -> dict:
+    """Evaluates an analysis report, given its text and POS tags"""
+    return evaluator(analysis_report, text=text, pos_tags=pos_tags)
+
+def log_evaluated(index: int, total: int, eval_report: dict) -> dict:
+    """Logs the evaluation progress"""
+    print(f"INFO\t Evaluated sample [{index + 1}/{total}]")
+    return eval_report
+
+def load_analysis(path: str) -> pd.DataFrame:
+    """Loads stored analysis data, from an analysis/eval output
+    file or from a journal (rows are sorted by index)"""
+    if get_format(path) == JOURNAL_FORMAT:
+        records = AnalysisJournal(path).load()
+        rows = [records[index] for index in sorted(records.keys())]
+        columns = ["text", "pos_tags", "analysis_data", "tokens", "warnings"]
+        return pd.DataFrame([{column: row.get(column) for column in columns} for row in rows], columns=columns)
+
+    return read_table(path, json_columns=["pos_tags", "analysis_data", "warnings"])
+
+def reevaluate_analysis(args, output_file):
+    """Offline re-evaluation: runs the language evaluator over
+    stored analysis data and writes fresh error columns."""
+    evaluator = load_evaluator(args.postagger, args.syntax)
+    if evaluator is None:
+        print(f"Error: no evaluator is available for '{args.postagger}'!")
+        exit(2)
+
+    df = load_analysis(args.from_analysis)
+    if "analysis_data" not in df:
+        print(f"Error: no column named 'analysis_data' exists in '{args.from_analysis}'!")
+        exit(2)
+
+    # analyzed texts and POS tags (used by the syntax checks)
+    texts = list(df["text"]) if "text" in df else None
+    pos_tags = list(df["pos_tags"]) if "pos_tags" in df else None
+
+    # previous evaluation columns are replaced
+    if args.vectorized:
+        print(f"INFO\t Re-evaluating {len(df)} samples (vectorized)")
+        eval_df = load_rule_set(args.postagger).evaluate_frame(list(df["analysis_data"]), args.syntax, not args.no_errors_log, texts, pos_tags)
+        df = df.drop(columns=[column for column in ["errors_log", *eval_df.columns] if column in df])
+        add_frame_to_dataframe(eval_df, df)
+    else:
+        print(f"INFO\t Re-evaluating {len(df)} samples ({args.workers} workers)")
+        eval_data = evaluate_reports(evaluator, list(df["analysis_data"]), texts, pos_tags, args.workers)
+
+        if len(eval_data) > 0:
+            df = df.drop(columns=[column for column in eval_data[0].keys() if column in df])
+            add_dictlist_to_dataframe(eval_data, df)
+
+    write_table(df, output_file, json_indent=4)
+
+def analyze_texts_batch(
+    texts: list[str],
+    tasks: list[AnalysisTask],
+    tagger: POSTagger,
+    backend: BatchBackend,
+    max_retries: int = 0,
+    on_result: Callable[[int, tuple], None] | None = None,
+    row_ids: list[int] | None = None):
+    """Analyze a list of texts using the batch backend. The analysis
+    tasks of all the texts are submitted together, invalid outputs are
+    retried in further batch rounds (up to 'max_retries' times).
+    If given, 'row_ids' are the input rows of the texts (metrics tags).
+
+    Returns:
+        list[tuple]: (analysis_report, consumed_tokens, analysis_warnings, tagged_text, skipped_tasks) for each text, in input order
+    """
+    tagged_texts = []
+    for index, text in enumerate(texts):
+        print(f"INFO\t Tagging sample [{index + 1}/{len(texts)}]")
+        with metrics_tags(row=row_ids[index] if row_ids is not None else index, step="pos_tagging"):
+            tagged_texts.append(tagger.tag_text(text))
+
+    reports = [{} for _ in texts]
+    tokens = [0 for _ in texts]
+    warnings = [[] for _ in texts]
+    skipped_tasks = [0 for _ in texts]
+
+    # the pending requests, keyed by request id
+    requests = {}
+    for index, tagged_text in enumerate(tagged_texts):
+        triggered_tasks = [task for task in tasks if task.is_triggered(tagged_text)]
+        skipped_tasks[index] = len(tasks) - len(triggered_tasks)
+
+        serialized_inputs = {
+            encoding: encode_tagged_text(tagged_text, encoding)
+            for encoding in set(task.input_format for task in triggered_tasks)
+        }
+        for task in triggered_tasks:
+            requests[f"{index}:{task.key}"] = {
+                "index": index,
+                "task": task,
+                "prompt": task.prompt_template,
+                "inputs": task.get_inputs(serialized_inputs[task.input_format]),
+                "attempts": 0
+            }
+
+    round_counter = 0
+    while len(requests) > 0:
+        round_counter += 1
+        responses = backend.run(
+            {key: request["prompt"].format_messages(**request["inputs"]) for key, request in requests.items()},
+            description=f"analysis round {round_counter}",
+            tags={
+                key: {
+                    "row": row_ids[request["index"]] if row_ids is not None else request["index"],
+                    "step": "analysis",
+                    "task": request["task"].key,
+                    "attempt": request["attempts"] + 1
+                }
+                for key, request in requests.items()
+            }
+        )
+
+        retry_requests = {}
+        for key, request in requests.items():
+            index, task = request["index"], request["task"]
+            response = responses[key]
+            request["attempts"] += 1
+            tokens[index] += (response.usage_metadata or {}).get("total_tokens", 0)
+
+            results = []
+            try:
+                results = task._message_parser.invoke(response)
+                task.validate(results)
+                reports[index][task.key] = results
+
+                if request["attempts"] > 1:
+                    warnings[index].append(f"WARNING: Task '{task.key}' succeeded after {request['attempts']} attempts.")
+            except Exception as e:
+                if request["attempts"] <= max_retries:
+                    request["prompt"] = task.get_retry_prompt(results, e)
+                    retry_requests[key] = request
+                else:
+                    reports[index][task.key] = []
+                    warnings[index].append(f"ERROR: Got an invalid output when processing '{task.key}' analysis task after {max_retries+1} attempts! Error: {str(e)}")
+
+        requests = retry_requests
+
+    results = []
+    for index in range(len(texts)):
+        report = {task.key: reports[index].get(task.key, list(task.empty_result)) for task in tasks}
+        result = (report, tokens[index], warnings[index], tagged_texts[index], skipped_tasks[index])
+        if on_result is not None:
+            on_result(index, result)
+        results.append(result)
+
+    return results
 
 def add_dictlist_to_dataframe(dictlist, df):
     """
@@ -230,17 +934,31 @@ def add_dictlist_to_dataframe(dictlist, df):
     for key, value in output_structure.items():
         df.insert(len(df.columns), key, value)
 
+def add_frame_to_dataframe(frame, df):
+    """
+    Takes an existing Pandas DataFrame and an evaluation
+    DataFrame (one row per row of df, in the same order).
+
+    Adds each column of the evaluation DataFrame.
+    """
+    for key in frame.columns:
+        df.insert(len(df.columns), key, list(frame[key]))
+
 
 def main():
     # Parse and validate arguments
     args = parser.parse_args()
-    output_file = validate_args(args)
+    output_file, journal_file = validate_args(args)
+
+    if args.from_analysis != None:
+        reevaluate_analysis(args, output_file)
+        return
 
     # Load data
     with open(args.tasks, "r", encoding="utf-8") as tasks_in:
         tasks = json.load(tasks_in)
 
-    df = pd.read_csv(args.input, sep="\t", encoding="utf-8", header=0)
+    df = read_table(args.input)
     if args.label not in df:
         print(f"Error: no column named '{args.label}' exists in '{args.input}'!")
         exit(2)
@@ -249,64 +967,125 @@ def main():
     df = df[[args.label]]
     df.rename(columns={args.label :'text'}, inplace=True)
     
+    # we drop tasks keys if syntax needs to be skipped
+    if not args.syntax:
+        if 'syntax' in tasks: del tasks['syntax']
+
+    # Load the journal of an interrupted run
+    texts = list(df['text'])
+    journal = AnalysisJournal(journal_file)
+    records = journal.load() if args.resume else {}
+    journal_config = get_journal_config(args, tasks)
+
+    if journal.config != journal_config and (journal.config is not None or len(records) > 0):
+        changed = [key for key in journal_config if (journal.config or {}).get(key) != journal_config[key]]
+        print(f"Error: the journal '{journal_file}' was written with different tasks or flags ({', '.join(changed)})! Resume with the tasks file and flags of the interrupted run.")
+        exit(2)
+
+    for index, record in records.items():
+        if index >= len(texts) or record["text"] != texts[index]:
+            print(f"Error: the journal '{journal_file}' does not match the input file (row {index})!")
+            exit(2)
+
+    pending = [index for index in range(len(texts)) if index not in records]
+
     # Setup processing pipeline
-    tagger = load_pos_tagger(args.postagger)
     evaluator = load_evaluator(args.postagger, args.syntax)
-    llm = setup_llm()
+    cache = None
+    limiter = None
+    backend = None
+    metrics = None
 
-    # setup chain
-    json_parser = JsonOutputParser()
+    # --- Step 1 - Analyze
+    if args.resume:
+        print(f"INFO\t Resuming from '{journal_file}': {len(records)} samples already analyzed")
 
-    # analyze data
-    pos_tags = []
-    analysis_data = []
-    tokens = []
-    warnings = []
+    if len(pending) > 0:
+        tagger = load_pos_tagger(args.postagger)
+        llm, limiter = setup_llm(args.rpm, args.tpm)
+        cache = setup_llm_cache(args)
+        metrics = setup_metrics(args, "eval")
 
-    # --- Step 1 - Analyze
-    counter = 0
-    for input_text in df['text']:
-        counter += 1
-        print(f"INFO\t Analyzing sample [{counter}/{len(df['text'])}]")
-        report, token_usage, warning_messages, tags = analyze_text(
-            input_text, 
-            tasks, 
-            llm, 
-            json_parser, 
-            tagger, 
-            args.syntax,
-            args.retries
-        )
+        # setup chains (once, shared by all texts)
+        json_parser = JsonOutputParser()
+        analysis_tasks = compile_tasks(tasks, llm, json_parser, args.input_format)
+
+        def journal_result(position, results):
+            report, token_usage, warning_messages, tags, skipped = results
+            record = {
+                "index": pending[position],
+                "text": texts[pending[position]],
+                "pos_tags": tags,
+                "analysis_data": report,
+                "tokens": token_usage,
+                "warnings": warning_messages,
+                "skipped_tasks": skipped
+            }
+            journal.append(record)
+            records[record["index"]] = record
+
+        print(f"INFO\t Analyzing {len(pending)} samples")
+        journal.open(journal_config if journal.config is None else None)
+        try:
+            if args.batch:
+                backend = setup_batch_backend(os.path.splitext(output_file)[0], args.batch_poll)
+                analyze_texts_batch(
+                    [texts[index] for index in pending],
+                    analysis_tasks,
+                    tagger,
+                    backend,
+                    args.retries,
+                    journal_result,
+                    pending
+                )
+            else:
+                asyncio.run(analyze_texts(
+                    [texts[index] for index in pending],
+                    analysis_tasks,
+                    tagger,
+                    args.retries,
+                    args.concurrency,
+                    TaskFuser() if args.fused else None,
+                    journal_result,
+                    pending
+                ))
+        finally:
+            journal.close()
+
+        skipped_tasks = sum(records[index]["skipped_tasks"] for index in pending)
+        print(f"INFO\t Pre-filter saved {skipped_tasks}/{len(analysis_tasks) * len(pending)} LLM calls (analysis tasks with no candidate tokens)")
 
-        analysis_data.append(report)
-        tokens.append(token_usage)
-        pos_tags.append(tags)
-        warnings.append(warning_messages)
+    # analyzed data (materialized from the journal, in input order)
+    pos_tags = [records[index]["pos_tags"] for index in range(len(texts))]
+    analysis_data = [records[index]["analysis_data"] for index in range(len(texts))]
+    tokens = [records[index]["tokens"] for index in range(len(texts))]
+    warnings = [records[index]["warnings"] for index in range(len(texts))]
 
     # Add results to dataframe
-    df.insert(len(df.columns), "pos_tags", list(map(lambda x : json.dumps(x, ensure_ascii=False, indent=4), pos_tags)))
-    df.insert(len(df.columns), "analysis_data", list(map(lambda x : json.dumps(x, ensure_ascii=False, indent=4), analysis_data)))
+    df.insert(len(df.columns), "pos_tags", pos_tags)
+    df.insert(len(df.columns), "analysis_data", analysis_data)
     if args.debug:
         df.insert(len(df.columns), "tokens", tokens)
         df.insert(len(df.columns), "warnings", warnings)
 
     # --- Step 2 - Eval
     if not args.analysis:
-        eval_data = []
-
-        counter = 0
-        for analysis_report in analysis_data:
-            counter += 1
-            print(f"INFO\t Evaluating sample [{counter}/{len(analysis_data)}]")
+        if args.vectorized:
+            print(f"INFO\t Evaluating {len(analysis_data)} samples (vectorized)")
+            eval_df = load_rule_set(args.postagger).evaluate_frame(analysis_data, args.syntax, not args.no_errors_log, texts, pos_tags)
+            add_frame_to_dataframe(eval_df, df)
+        else:
+            eval_data = evaluate_reports(evaluator, analysis_data, texts, pos_tags, args.workers)
 
-            eval_report = evaluator(analysis_report)
-            eval_data.append(eval_report)
- 
-        # Add results to df
-        add_dictlist_to_dataframe(eval_data, df)
+            # Add results to df
+            add_dictlist_to_dataframe(eval_data, df)
 
     # Write results
-    df.to_csv(output_file, sep="\t", index=False, encoding="utf-8")
+    write_table(df, output_file, json_indent=4)
+    print_cache_stats(cache)
+    print_rate_limit_stats(limiter)
+    print_batch_stats(backend)
+    print_metrics_stats(metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio, sqlite3, hashlib, threading, time, argparse
+from collections.abc import Awaitable, Callable
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+###
+# Iteration-level memo of the iterative paraphrase (paraphrase.py).
+#
+# Each paraphrase iteration maps a text state to the model response
+# for it. Responses are memoised by (constraints, prompt template,
+# model, input text), in memory and optionally in a SQLite file: a text state
+# already seen, in any row, run or strategy, final or intermediate,
+# skips its LLM call. Concurrent requests for the same text state
+# share a single LLM call.
+#
+# Only valid responses (with <text> tags) are memoised, so that a
+# malformed response is retried as usual.
+###
+
+def get_template_string(prompt_template: ChatPromptTemplate) -> str:
+    """Renders a prompt template with its placeholders (the text of its messages, by role)"""
+    messages = prompt_template.format_messages(**{name: f"{{{name}}}" for name in prompt_template.input_variables})
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+class IterationMemo():
+    """An in-memory memo of paraphrase iterations, backed by a (optional) SQLite file.
+
+    Arguments:
+        database_path (str | None): the SQLite file, None for an in-memory only memo
+        constraints (str): the linguistic constraints list
+        prompt_template (ChatPromptTemplate): the paraphrase prompt (its type and layout)
+        model (str): the model name (and provider)
+    """
+    def __init__(self, database_path: str | None, constraints: str, prompt_template: ChatPromptTemplate, model: str) -> None:
+        self._database_path = database_path
+        self._namespace = "\n".join([
+            hashlib.sha256(constraints.encode("utf-8")).hexdigest(),
+            hashlib.sha256(get_template_string(prompt_template).encode("utf-8")).hexdigest(),
+            model
+        ])
+        self._memo = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._connection = None
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.writes = 0
+
+        if database_path is not None:
+            self._init_db()
+
+    def _init_db(self) -> None:
+        self._connection = sqlite3.connect(self._database_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""CREATE TABLE IF NOT EXISTS iterations (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )""")
+        self._connection.commit()
+
+    def get_key(self, text: str) -> str:
+        """Returns the memo key of a text state"""
+        return hashlib.sha256(f"{self._namespace}\n{text}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            response = self._memo.get(key)
+            if response is None and self._connection is not None:
+                row = self._connection.execute("SELECT response FROM iterations WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    response = self._memo[key] = row[0]
+        return response
+
+    def lookup(self, text: str) -> AIMessage | None:
+        """Looks up the memoised response for a text state. Memoised
+        responses report no token usage, as no request is made."""
+        response = self._get(self.get_key(text))
+
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return AIMessage(content=response, response_metadata={"memo_hit": True})
+
+    def update(self, text: str, response: AIMessage) -> None:
+        """Memoises the response for a text state"""
+        key = self.get_key(text)
+
+        with self._lock:
+            self._memo[key] = response.content
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO iterations (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response.content, time.time())
+                )
+                self._connection.commit()
+            self.writes += 1
+
+    async def ainvoke(
+        self,
+        text: str,
+        invoke: Callable[[], Awaitable[AIMessage]],
+        message_parser: Callable[..., str]) -> AIMessage:
+        """Returns the response for a text state: the memoised one if any,
+        else the one of the request already in flight for the same text
+        (if valid), else the response of 'invoke' (memoised if valid).
+
+        Arguments:
+            text (str): the text state
+            invoke (Callable[[], Awaitable[AIMessage]]): makes the LLM request
+            message_parser (Callable[..., str]): AIMessage output parser, None for invalid responses
+
+        Returns:
+            AIMessage: the model (or memoised) response
+        """
+        key = self.get_key(text)
+
+        while True:
+            response = self._get(key)
+            if response is not None:
+                with self._lock:
+                    self.hits += 1
+                return AIMessage(content=response, response_metadata={"memo_hit": True})
+
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+
+            # wait for the request in flight (if it fails, the text is requested again)
+            with self._lock:
+                self.shared += 1
+            await pending
+
+        with self._lock:
+            self.misses += 1
+
+        self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await invoke()
+            if message_parser(response) is not None:
+                self.update(text, response)
+            return response
+        finally:
+            self._pending.pop(key).set_result(None)
+
+    def get_stats(self) -> dict:
+        """Returns the memo counters"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups > 0 else None,
+            "shared": self.shared,
+            "writes": self.writes
+        }
+
+def add_memo_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the iteration memo command line arguments to a tool's parser"""
+    parser.add_argument("--memo", help="(optional) memoise paraphrase iterations: text states already seen skip the LLM call", action="store_true")
+    parser.add_argument("--memo-file", help="(optional) a SQLite file where the memo is kept across runs (implies --memo)")
+
+def setup_iteration_memo(args: argparse.Namespace, constraints: str, prompt_template: ChatPromptTemplate, model: str) -> IterationMemo | None:
+    """Creates the iteration memo from command line arguments"""
+    if not args.memo and args.memo_file is None:
+        return None
+
+    return IterationMemo(args.memo_file, constraints, prompt_template, model)
+
+def print_memo_stats(memo: IterationMemo | None) -> None:
+    """Logs the memo counters (if a memo is in use)"""
+    if memo is None:
+        return
+
+    stats = memo.get_stats()
+    print(f"INFO\t Iteration memo: {stats['hits']} hits, {stats['misses']} misses (hit rate: {stats['hit_rate']}), {stats['shared']} shared requests, {stats['writes']} writes")
@@ -1,8 +1,14 @@
 import json, argparse, os
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.utils import get_column_letter
 from mappings import upos_to_simple
-from utils import word_in_list, merge_dictionaries
-from pos_tagger import Language, TAGMethod, POSTagger
+from data_io import read_table, write_table, get_format, is_supported_format, TABULAR_FORMATS, XLSX_FORMAT
+from pos_tagger import POSTagger
+from conformance import LexicalCoverageIndex, CONTENT_POS, load_lemma_tagger
 
 # set up parser
 parser = argparse.ArgumentParser(
@@ -10,7 +16,7 @@ parser = argparse.ArgumentParser(
     description="Checks the lexical content of input texts againts a given wordlist."
 )
 
-parser.add_argument("input", help="a TSV file containing the texts to check")
+parser.add_argument("input", help="a TSV/Parquet/Arrow file containing the texts to check")
 parser.add_argument("-w", "--wordlist", help="a JSON formatted wordlist to check againsts", required=True)
 parser.add_argument("-p", "--postagger", 
                    help="language used to initialize the postagger", 
@@ -20,12 +26,15 @@ parser.add_argument("-s", "--stopwords", help="(optional) a JSON formatted stopw
 parser.add_argument("-l", "--label", help="(optional) the label of the column that contains input data", default="text")
 parser.add_argument("-c", "--compare", help="(optional) the label of the column that contains text to compare against", default=None)
 parser.add_argument("-d", "--dropdata", help="(optional) omit pos specific stats from output", action='store_true')
-parser.add_argument('-o', '--output', help="(optional) output file (TSV/XLSX)")
+parser.add_argument('-o', '--output', help="(optional) output file (TSV/XLSX/Parquet/Arrow)")
+
+# heatmap colours used for percentages in XLSX outputs (RdYlGn: 0, 50, 100)
+XLSX_HEATMAP_COLOURS = ["A50026", "FFFFBF", "006837"]
 
 # --- validate cli arguments
 def validate_args(args):
     """Validate command line arguments"""
-    if not (os.path.isfile(args.input) and (os.path.splitext(args.input)[-1].lower() == ".tsv")):
+    if not (os.path.isfile(args.input) and is_supported_format(args.input)):
         print("Error: the input file does not exist or is not a supported format!")
         exit(2)
 
@@ -37,14 +46,14 @@ def validate_args(args):
         print("Error: the supplied stopwords file does not exist or is not a supported format!")
         exit(2)
 
-    output_file = args.output if args.output else f"{os.path.splitext(args.input)[0]}_lexical.tsv"
+    output_file = args.output if args.output else f"{os.path.splitext(args.input)[0]}_lexical{get_format(args.input)}"
     if os.path.exists(output_file) or not os.path.exists(os.path.dirname(os.path.abspath(output_file))):
         print(f"Error: an output file with path '{output_file}' already exists!")
         exit(2)
 
     # check if specified output format is supported
-    if (os.path.splitext(output_file)[-1].lower() not in [".tsv", ".xlsx"]):
-        print(f"Error: an unsupported output file format was speficied. Please use either tsv or xlsx!")
+    if (not is_supported_format(output_file, TABULAR_FORMATS + [XLSX_FORMAT])):
+        print(f"Error: an unsupported output file format was speficied. Please use one of {TABULAR_FORMATS + [XLSX_FORMAT]}!")
         exit(2)
 
     return output_file
@@ -53,25 +62,13 @@ def load_pos_tagger(language: str) -> POSTagger:
     """
     Loads the language specific postagger.
     """
-    tagger = None
-    match language:
-        case "italian":
-            tagger = POSTagger(language=Language.IT, method=TAGMethod.STANZA, include_lemma=True)
-        case "english":
-            tagger = POSTagger(language=Language.EN, method=TAGMethod.STANZA, include_lemma=True)
-        case "russian":
-            tagger = POSTagger(language=Language.RU, method=TAGMethod.SPACY, include_lemma=True)
-        case _:
-            return None
-
-    return tagger
+    return load_lemma_tagger(language)
 
 def check_text(
     text: str,
     tagger: POSTagger,
-    word_lists: dict,
-    stopwords: list[str] = None) -> dict:
-    """Check a single text entry against the given wordlist."""
+    index: LexicalCoverageIndex) -> dict:
+    """Check a single text entry against the given wordlist (and stopwords) index."""
     results = {}
     results["text"] = text
 
@@ -81,12 +78,11 @@ def check_text(
     # convert tags to simple tags
     tagged_text = [{**x, "pos": upos_to_simple[x["pos"]]} for x in tagged_text]
 
-    # remove stopwords if supplied
-    if stopwords != None:
-        tagged_text = list(filter(lambda x: not word_in_list(x["text"], stopwords), tagged_text))
+    # remove stopwords (if supplied)
+    tagged_text = list(filter(lambda x: not index.is_stopword(x["text"]), tagged_text))
 
     # Get all content words (after stopword removal)
-    all_content_words = [x for x in tagged_text if x['pos'] in ['n','v','a','r']]
+    all_content_words = [x for x in tagged_text if x['pos'] in CONTENT_POS]
     
     # Track words across all POS types
     all_words_by_pos = {}
@@ -114,9 +110,8 @@ def check_text(
     results["total_unique_count"] = len(unique_words_total)
     
     # iterate over tiered-vocabulary levels
-    for i in range(0, len(word_lists)):
-        level = list(word_lists.keys())[i]
-        vocabulary = merge_dictionaries(word_lists, 0, i)
+    for level in index.levels:
+        vocabulary = index.get_vocabulary(level)
         
         # Track metrics across all POS for this level
         all_conform_this_level = []
@@ -136,7 +131,7 @@ def check_text(
             
             if words_count > 0:
                 # Check conformity based on lemma in the POS-specific vocabulary
-                conform_words = list(filter(lambda x: word_in_list(x["lemma"], vocabulary[pos]), words_subsection))
+                conform_words = list(filter(lambda x: index.conforms(x["lemma"], pos, level), words_subsection))
                 conform_list = [x["text"] for x in conform_words]
                 conform_count = len(conform_words)
                 unconform_list = [x for x in words_list if x not in conform_list]
@@ -230,16 +225,61 @@ def reorganize_dataframe(df: pd.DataFrame, levels: list[str], ascending: bool =
 
     return df[new_column_order]
 
-def assign_percentage_colours_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    # List all columns
-    all_columns = list(df.columns)
+def write_xlsx_report(df: pd.DataFrame, output_file: str) -> None:
+    """Writes a lexical analysis report to an XLSX file.
 
-    # Get exclusively percentage columns
-    percentage_columns = [col for col in all_columns if '_percent' in col]
-    
-    return df.style.background_gradient(subset=percentage_columns, cmap="RdYlGn", vmin=0.0, vmax=100.0)
+    Rows are streamed through a write-only (constant memory) openpyxl
+    workbook. Percentage columns are coloured using a heatmap, defined
+    as a single conditional formatting rule per column instead of
+    per-cell fills.
+
+    Arguments:
+        df (pd.DataFrame): The lexical analysis report
+        output_file (str): The XLSX output file path
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+
+    # header
+    header_font = Font(bold=True)
+    header = []
+    for col in df.columns:
+        cell = WriteOnlyCell(worksheet, value=col)
+        cell.font = header_font
+        header.append(cell)
+    worksheet.append(header)
+
+    # data rows, non-scalar values (word lists) are written as strings
+    for row in df.itertuples(index=False, name=None):
+        worksheet.append([xlsx_cell_value(x) for x in row])
+
+    # heatmap on percentage columns (same scale as the RdYlGn colormap, 0-100)
+    if len(df) > 0:
+        for i, col in enumerate(df.columns):
+            if '_percent' not in col:
+                continue
 
-def process_data(data: list[str], tagger, word_list, stopwords_list, drop_pos_specific):
+            column_letter = get_column_letter(i + 1)
+            worksheet.conditional_formatting.add(
+                f"{column_letter}2:{column_letter}{len(df) + 1}",
+                ColorScaleRule(
+                    start_type="num", start_value=0, start_color=XLSX_HEATMAP_COLOURS[0],
+                    mid_type="num", mid_value=50, mid_color=XLSX_HEATMAP_COLOURS[1],
+                    end_type="num", end_value=100, end_color=XLSX_HEATMAP_COLOURS[2]
+                )
+            )
+
+    workbook.save(output_file)
+
+def xlsx_cell_value(value):
+    """Converts a dataframe value to something openpyxl can write."""
+    if isinstance(value, (list, tuple, set, dict)):
+        return str(value)
+    if pd.isna(value):
+        return None
+    return value
+
+def process_data(data: list[str], tagger, index: LexicalCoverageIndex, drop_pos_specific):
     data_dicts = []
     
     counter = 0
@@ -247,14 +287,14 @@ def process_data(data: list[str], tagger, word_list, stopwords_list, drop_pos_sp
         counter += 1
         print(f"INFO\t Analyzing sample [{counter}/{len(data)}]")
 
-        results = check_text(text, tagger, word_list, stopwords_list)
+        results = check_text(text, tagger, index)
         data_dicts.append(results)
 
     # Add results to dataframe
     df = pd.DataFrame.from_dict(data_dicts, orient='columns')
 
     # Reorganize dataframe colums
-    df = reorganize_dataframe(df, word_list.keys(), drop_pos_specific=drop_pos_specific)
+    df = reorganize_dataframe(df, index.levels, drop_pos_specific=drop_pos_specific)
 
     return df
 
@@ -299,7 +339,7 @@ def main():
             stopwords_list = json.load(s_in)
 
     # Read sentences
-    df = pd.read_csv(args.input, sep="\t", encoding="utf-8", header=0)
+    df = read_table(args.input)
     if args.label not in df:
         print(f"Error: no column named '{args.label}' exists in '{args.input}'!")
         exit(2)
@@ -309,26 +349,26 @@ def main():
         print(f"Error: a label for optional text comparison named '{args.compare}' was specified, but a column with that name does not exists in '{args.input}'!")
         exit(2)
     
-    # Setup processing pipeline
+    # Setup processing pipeline (the word list is indexed once, for all texts)
     tagger = load_pos_tagger(args.postagger)
+    index = LexicalCoverageIndex(word_list, stopwords_list)
 
     # Process data
     print(f"INFO --- Processing input text")
-    eval_df = process_data(df[args.label], tagger, word_list, stopwords_list, args.dropdata)
+    eval_df = process_data(df[args.label], tagger, index, args.dropdata)
 
     # If a comparision is specified, process also the text to compare against
     if args.compare != None:
         print(f"INFO --- Processing comparison text")
-        compare_df = process_data(df[args.compare], tagger, word_list, stopwords_list, args.dropdata)
+        compare_df = process_data(df[args.compare], tagger, index, args.dropdata)
         eval_df = alternate_columns_preserve_names(eval_df, compare_df)
 
     # --- output data
     # Note: colour is applied only on xlsx outputs.
-    if (os.path.splitext(output_file)[-1].lower() == ".xlsx"):
-        eval_df = assign_percentage_colours_dataframe(eval_df)
-        eval_df.to_excel(output_file, engine="openpyxl", index=False)
+    if (is_supported_format(output_file, [XLSX_FORMAT])):
+        write_xlsx_report(eval_df, output_file)
     else:
-        eval_df.to_csv(output_file, sep="\t", index=False, encoding="utf-8")
+        write_table(eval_df, output_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
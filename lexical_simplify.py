@@ -1,10 +1,17 @@
-import os, json, time, argparse
-from dotenv import load_dotenv
+import os, argparse, asyncio
 import pandas as pd
+from dotenv import load_dotenv
+from llm_cache import add_cache_arguments, validate_cache_arguments, setup_llm_cache, print_cache_stats, cache_if_valid
+from rate_limiter import add_rate_limit_arguments, validate_rate_limit_arguments, get_rate_limiter, get_rate_limit_kwargs, with_rate_limit_retries, print_rate_limit_stats, GROQ_DEFAULT_RPM, GROQ_DEFAULT_TPM
+from batch_backend import BatchBackend, add_batch_arguments, validate_batch_arguments, print_batch_stats
+from metrics import add_metrics_arguments, setup_metrics, print_metrics_stats, metrics_tags
+from row_pipeline import add_concurrency_arguments, validate_concurrency_arguments, process_rows, get_window
+from data_io import read_table, TableWriter, get_format, is_supported_format, TABULAR_FORMATS
 from utils import regex_message_parser, TEXT_TAG_REGEX_PATTERN, token_usage_message_parser
 from langchain_core.runnables import Runnable
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 
@@ -18,10 +25,10 @@ parser = argparse.ArgumentParser(
     description="Simplifies the vocabulary of input texts to make them suitable for L2 language learners."
 )
 
-parser.add_argument("input", help="a TSV file containing the texts to simplify")
+parser.add_argument("input", help="a TSV/Parquet/Arrow file containing the texts to simplify")
 parser.add_argument("-l", "--label", help="(optional) the label of the column that contains input data", default="text")
 parser.add_argument("-t", "--target", help="(optional) the target column name for simplified output", default="simplified")
-parser.add_argument('-o', '--output', help="(optional) output file")
+parser.add_argument('-o', '--output', help="(optional) output file (TSV/Parquet/Arrow)")
 parser.add_argument('-d', '--debug', action='store_true', help="(optional) log additional information")
 parser.add_argument('-g', '--groq', action='store_true', help="(optional) run on groq cloud")
 parser.add_argument('-r', '--retries', 
@@ -37,22 +44,36 @@ parser.add_argument('-p', '--language',
                    help="target language for simplification", 
                    choices=['italian', 'english', 'russian'],
                    type=str)
+add_concurrency_arguments(parser)
+add_cache_arguments(parser)
+add_rate_limit_arguments(parser)
+add_batch_arguments(parser)
+add_metrics_arguments(parser)
 
 def validate_args(args):
     """Validate command line arguments"""
-    if not (os.path.isfile(args.input) and (os.path.splitext(args.input)[-1].lower() == ".tsv")):
+    if not (os.path.isfile(args.input) and is_supported_format(args.input)):
         print("Error: the input file does not exist or is not a supported format!")
         exit(2)
 
-    output_file = args.output if args.output else f"{os.path.splitext(args.input)[0]}_simplified.tsv"
+    output_file = args.output if args.output else f"{os.path.splitext(args.input)[0]}_simplified{get_format(args.input)}"
     if os.path.exists(output_file) or not os.path.exists(os.path.dirname(os.path.abspath(output_file))):
         print(f"Error: an output file with path '{output_file}' already exists!")
         exit(2)
+
+    if not is_supported_format(output_file):
+        print(f"Error: an unsupported output file format was specified. Please use one of {TABULAR_FORMATS}!")
+        exit(2)
         
     if args.retries < 0:
         print("Error: --retries must be a non-negative integer!")
         exit(2)
 
+    validate_concurrency_arguments(args)
+    validate_cache_arguments(args)
+    validate_rate_limit_arguments(args)
+    validate_batch_arguments(args)
+
     return output_file
 
 def get_prompt_template(language: str, cefr_level: str) -> ChatPromptTemplate:
@@ -96,104 +117,209 @@ Note: The final version MUST be wrapped in <text> tags, regardless of whether ch
 
     return ChatPromptTemplate.from_messages([("user", message)])
 
-def setup_llm(use_groq):
-    """Configure and return appropriate LLM"""
+def setup_llm(use_groq, rpm=None, tpm=None):
+    """Configure and return appropriate LLM (and its rate limiter)"""
     model = os.getenv("OPENAI_MODEL")
     temperature = 0
     top_p = 1.00
 
     if use_groq:
-        return ChatGroq(
-            model=os.getenv("GROQ_MODEL"),
+        model = os.getenv("GROQ_MODEL")
+        limiter = get_rate_limiter("groq", model, rpm or GROQ_DEFAULT_RPM, tpm or GROQ_DEFAULT_TPM)
+        llm = ChatGroq(
+            model=model,
             temperature=temperature,
-            model_kwargs={"top_p": top_p}
+            model_kwargs={"top_p": top_p},
+            **get_rate_limit_kwargs(limiter)
         )
     else:
-        return ChatOpenAI(
+        limiter = get_rate_limiter("openai", model, rpm, tpm)
+        llm = ChatOpenAI(
             model=model,
             temperature=temperature,
-            top_p=top_p
+            top_p=top_p,
+            **get_rate_limit_kwargs(limiter)
         )
 
-def simplify_text(
-    text: str,
-    chain: Runnable,
-    message_parser: Callable[...,str],
-    token_parser: Callable[...,int],
-    max_retries: int,
-    use_groq: bool):
-    """Simplify a single text with retry mechanism
-    
-    Arguments:
-        text (str): the input text to simplify
-        chain (Runnable): the LLM text processing chain
-        message_parser (Callable[..., dict]): AIMessage output parser, should return a string
-        token_parser (Callable[..., dict]): AIMessage token parser, returns the amount of consumed tokens
-        max_retries (int): maximum number of retries if the model output is invalid
-        use_groq (bool): set to True to run inference on groq cloud models
-        
-    Returns:
-        tuple: (simplified_text, messages, token_usage, warnings)
-    """
-    messages = []
-    token_usage = 0
-    warnings = []
-    simplified_text = None
-    retry_count = 0
-    successful = False
-    
-    # Add the user message
-    messages.append({
-        "role": "user",
-        "content": text
-    })
-    
-    # Try to get a valid response with retries
-    while retry_count <= max_retries and not successful:
-        # Invoke the model
-        results = chain.invoke({
-            "input_text": text
+    return with_rate_limit_retries(llm), limiter
+
+def setup_batch_backend(use_groq, file_prefix, poll_interval):
+    """Configure the batch backend (same model and parameters used by setup_llm)"""
+    model = os.getenv("GROQ_MODEL") if use_groq else os.getenv("OPENAI_MODEL")
+    temperature = 0
+    top_p = 1.00
+
+    return BatchBackend(model, {"temperature": temperature, "top_p": top_p}, file_prefix, use_groq, poll_interval)
+
+class SimplifySession():
+    """The simplification of a single text. Malformed outputs
+    (no <text> tags) are retried up to 'max_retries' times.
+
+    The session is driven one model response at a time, so that it can
+    run both with synchronous calls and with batch rounds."""
+    def __init__(self, text: str, max_retries: int) -> None:
+        self.text = text
+        self.messages = []
+        self.token_usage = 0
+        self.warnings = []
+        self.simplified_text = None
+        self.done = False
+
+        self._max_retries = max_retries
+        self._retry_count = 0
+
+        # Add the user message
+        self.messages.append({
+            "role": "user",
+            "content": text
         })
-        
+
+    def get_inputs(self) -> dict:
+        """Returns the chain inputs of the next request"""
+        return {
+            "input_text": self.text
+        }
+
+    def get_tags(self) -> dict:
+        """Returns the metrics tags of the next request"""
+        return {
+            "attempt": self._retry_count + 1
+        }
+
+    def apply(self, results: AIMessage, message_parser: Callable[...,str], token_parser: Callable[...,int]) -> None:
+        """Processes a model response"""
+        max_retries = self._max_retries
+
         # Record the response
-        messages.append({
+        self.messages.append({
             "role": "assistant",
             "content": results.content
         })
         
-        # --- this is to keep consumption within free tier limits for Groq
-        if use_groq:
-            time.sleep(30)
-        
         # Update token usage
-        token_usage += token_parser(results)
+        self.token_usage += token_parser(results)
         
         # Try to extract the text content with the parser
         message_content = message_parser(results)
         
         if message_content is not None:
             # We got a valid response with matching <text> tags
-            simplified_text = message_content
-            successful = True
+            self.simplified_text = message_content
+            self.done = True
         else:
             # Parser returned None (no <text> tags found) - need to retry
-            retry_count += 1
-            if retry_count <= max_retries:
+            self._retry_count += 1
+            if self._retry_count <= max_retries:
                 # Document the retry in messages
-                retry_message = f"Retry {retry_count}/{max_retries}: No <text> tags found in response, retrying..."
-                messages.append({
+                retry_message = f"Retry {self._retry_count}/{max_retries}: No <text> tags found in response, retrying..."
+                self.messages.append({
                     "role": "system",
                     "content": retry_message
                 })
-                warnings.append(f"WARNING: Retry {retry_count}/{max_retries} - No <text> tags found in response.")
+                self.warnings.append(f"WARNING: Retry {self._retry_count}/{max_retries} - No <text> tags found in response.")
             else:
                 # Max retries reached, using original text as fallback
                 warning = f"ERROR: Failed to find <text> tags after {max_retries+1} attempts. Using original text."
-                warnings.append(warning)
-                simplified_text = text
-                successful = True  # Mark as successful to exit the retry loop
+                self.warnings.append(warning)
+                self.simplified_text = self.text
+                self.done = True
+
+    def get_results(self) -> tuple:
+        """Returns (simplified_text, messages, token_usage, warnings)"""
+        return self.simplified_text, self.messages, self.token_usage, self.warnings
+
+async def simplify_text(
+    text: str,
+    chain: Runnable,
+    message_parser: Callable[...,str],
+    token_parser: Callable[...,int],
+    max_retries: int,
+    semaphore: asyncio.Semaphore):
+    """Simplify a single text with retry mechanism
     
-    return simplified_text, messages, token_usage, warnings
+    Arguments:
+        text (str): the input text to simplify
+        chain (Runnable): the LLM text processing chain
+        message_parser (Callable[..., dict]): AIMessage output parser, should return a string
+        token_parser (Callable[..., dict]): AIMessage token parser, returns the amount of consumed tokens
+        max_retries (int): maximum number of retries if the model output is invalid
+        semaphore (asyncio.Semaphore): limits the number of concurrent LLM requests
+        
+    Returns:
+        tuple: (simplified_text, messages, token_usage, warnings)
+    """
+    session = SimplifySession(text, max_retries)
+
+    # Try to get a valid response with retries
+    while not session.done:
+        # Invoke the model (malformed responses are not cached, so that their retries make new requests)
+        async with semaphore:
+            with metrics_tags(**session.get_tags()), cache_if_valid(message_parser):
+                results = await chain.ainvoke(session.get_inputs())
+        session.apply(results, message_parser, token_parser)
+
+    return session.get_results()
+
+async def simplify_texts(
+    texts: Iterable[str],
+    chain: Runnable,
+    message_parser: Callable[...,str],
+    token_parser: Callable[...,int],
+    max_retries: int,
+    on_result: Callable[[int, tuple], None],
+    concurrency: int = 1) -> int:
+    """Simplify a sequence of texts concurrently, with at most 'concurrency'
+    LLM requests in flight. Texts are consumed lazily and delivered in
+    input order (see row_pipeline.process_rows).
+
+    Arguments:
+        texts (Iterable[str]): the input texts
+        on_result (Callable[[int, tuple], None]): called with the index and the
+            (simplified_text, messages, token_usage, warnings) of each text
+        concurrency (int): maximum number of concurrent LLM requests
+
+    Returns:
+        int: the number of processed texts
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def simplify(row, input_text):
+        with metrics_tags(row=row, step="simplification"):
+            return await simplify_text(input_text, chain, message_parser, token_parser, max_retries, semaphore)
+
+    return await process_rows(texts, simplify, on_result, get_window(concurrency))
+
+def simplify_texts_batch(
+    texts: list[str],
+    prompt_template: ChatPromptTemplate,
+    backend: BatchBackend,
+    message_parser: Callable[...,str],
+    token_parser: Callable[...,int],
+    max_retries: int):
+    """Simplify a list of texts using the batch backend. The first
+    attempt (and every retry) of all the texts is a batch round.
+
+    Returns:
+        list[tuple]: (simplified_text, messages, token_usage, warnings) for each text
+    """
+    sessions = [SimplifySession(text, max_retries) for text in texts]
+
+    round_counter = 0
+    while any(not session.done for session in sessions):
+        round_counter += 1
+        active = [(index, session) for index, session in enumerate(sessions) if not session.done]
+        print(f"INFO\tSimplification round {round_counter}: {len(active)} active texts")
+
+        responses = backend.run(
+            {str(index): prompt_template.format_messages(**session.get_inputs()) for index, session in active},
+            description=f"simplification round {round_counter}",
+            tags={str(index): {"row": index, **session.get_tags()} for index, session in active}
+        )
+
+        for index, session in active:
+            session.apply(responses[str(index)], message_parser, token_parser)
+
+    return [session.get_results() for session in sessions]
 
 def main():
     # Parse and validate arguments
@@ -201,7 +327,7 @@ def main():
     output_file = validate_args(args)
 
     # Load data
-    df = pd.read_csv(args.input, sep="\t", encoding="utf-8", header=0)
+    df = read_table(args.input)
     if args.label not in df:
         print(f"Error: no column named '{args.label}' exists in '{args.input}'!")
         exit(2)
@@ -210,44 +336,56 @@ def main():
     df_simplified = df.copy()
 
     # Setup processing pipeline
+    metrics = setup_metrics(args, "lexical_simplify")
     prompt_template = get_prompt_template(args.language, args.cefr)
-    llm = setup_llm(args.groq)
+    llm, limiter = setup_llm(args.groq, args.rpm, args.tpm)
+    cache = setup_llm_cache(args)
+    backend = setup_batch_backend(args.groq, os.path.splitext(output_file)[0], args.batch_poll) if args.batch else None
     
     # Setup chain and parsers
     message_parser = regex_message_parser(regex=TEXT_TAG_REGEX_PATTERN)
     token_parser = token_usage_message_parser
     chain = prompt_template | llm
 
-    simplified_texts = []
-    all_messages = []
-    all_tokens = []
-    all_warnings = []
+    columns = [args.target] + ([f"{args.target}_tokens", f"{args.target}_messages", f"{args.target}_warnings"] if args.debug else [])
 
-    counter = 0
-    for input_text in df_simplified[args.label]:
-        counter += 1
-        print(f"INFO\tSimplifying sample [{counter}/{len(df_simplified[args.label])}]")
-        
-        # Process the text with simplification
-        simplified, messages, tokens, warnings = simplify_text(
-            input_text, chain, message_parser, token_parser, args.retries, args.groq
-        )
-        
-        simplified_texts.append(simplified)
-        all_messages.append(messages)
-        all_tokens.append(tokens)
-        all_warnings.append(warnings)
+    # Rows are written (in input order) as soon as they are completed
+    writer = TableWriter(output_file)
 
-    # Add results to dataframe
-    df_simplified[args.target] = simplified_texts
+    def write_row(index, results):
+        simplified, messages, tokens, warnings = results
+        outputs = dict(zip(columns, [simplified, tokens, messages, warnings]))
+        row = df_simplified.iloc[[index]].reset_index(drop=True)
+        for column in columns:
+            row[column] = pd.Series([outputs[column]])
+        writer.write(row)
+        if backend is None:
+            print(f"INFO\tSimplified sample [{index + 1}/{len(df_simplified)}]")
+
+    with writer:
+        # in batch mode all the texts are processed together
+        if backend is not None:
+            print(f"INFO\tSimplifying {len(df_simplified[args.label])} samples in batch mode")
+            with metrics_tags(step="simplification"):
+                batch_results = simplify_texts_batch(
+                    list(df_simplified[args.label]), prompt_template, backend, message_parser, token_parser, args.retries
+                )
+            for index, results in enumerate(batch_results):
+                write_row(index, results)
+        else:
+            print(f"INFO\tSimplifying {len(df_simplified[args.label])} samples ({args.concurrency} concurrent requests)")
+            asyncio.run(simplify_texts(
+                df_simplified[args.label], chain, message_parser, token_parser, args.retries, write_row, args.concurrency
+            ))
 
-    if args.debug:
-        df_simplified[f"{args.target}_tokens"] = all_tokens
-        df_simplified[f"{args.target}_messages"] = list(map(lambda x: json.dumps(x, ensure_ascii=False), all_messages))
-        df_simplified[f"{args.target}_warnings"] = list(map(lambda x: json.dumps(x, ensure_ascii=False), all_warnings))
+        if len(df_simplified) == 0:
+            writer.write(df_simplified.assign(**{column: [] for column in columns}))
 
-    # Write results
-    df_simplified.to_csv(output_file, sep="\t", index=False, encoding="utf-8")
+    print(f"INFO\tWritten {writer.rows} rows to '{output_file}'")
+    print_cache_stats(cache)
+    print_rate_limit_stats(limiter)
+    print_batch_stats(backend)
+    print_metrics_stats(metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os, time, sqlite3, hashlib, threading, argparse, contextvars
+from contextlib import contextmanager
+from collections.abc import Callable
+from typing import Any
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+
+###
+# Persistent LLM response cache, shared by all the LLM-driven tools.
+#
+# Responses are stored in a SQLite file, keyed by the LLM configuration
+# (provider, model, sampling parameters) and the fully rendered messages.
+# Once registered with 'set_llm_cache' every langchain chat model uses it.
+#
+# Responses rejected by the output parser of a tool (see 'cache_if_valid')
+# are not cached: a retry sends the same prompt again, it must not get
+# the rejected response back from the cache.
+###
+
+# output parser of the LLM calls made in the current context (None: cache all responses)
+_response_validator = contextvars.ContextVar("response_validator", default=None)
+
+@contextmanager
+def cache_if_valid(message_parser: Callable[..., Any]):
+    """Caches the responses of the LLM calls made in the block only if
+    the output parser accepts them (it returns None for rejected responses)"""
+    token = _response_validator.set(message_parser)
+    try:
+        yield
+    finally:
+        _response_validator.reset(token)
+
+def is_valid_response(return_val: RETURN_VAL_TYPE) -> bool:
+    """Checks a response against the output parser of the current context"""
+    message_parser = _response_validator.get()
+    if message_parser is None:
+        return True
+
+    return all(
+        message_parser(generation.message) is not None
+        for generation in return_val if isinstance(getattr(generation, "message", None), AIMessage)
+    )
+
+class LLMResponseCache(BaseCache):
+    """A SQLite backed langchain LLM cache.
+
+    Supports TTL and size (LRU) eviction, a read-only mode
+    for reproducible replays, and keeps hit/miss counters."""
+    def __init__(self, database_path: str, ttl: float | None = None, max_entries: int | None = None, read_only: bool = False) -> None:
+        self._database_path = database_path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._read_only = read_only
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._init_db()
+
+    def _init_db(self) -> None:
+        if self._read_only and not os.path.isfile(self._database_path):
+            raise FileNotFoundError(f"Cannot open '{self._database_path}' in read-only mode: the file does not exist!")
+
+        self._connection = sqlite3.connect(self._database_path, check_same_thread=False)
+
+        if not self._read_only:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._connection.commit()
+
+    @staticmethod
+    def get_key(prompt: str, llm_string: str) -> str:
+        """Returns the cache key of a (prompt, llm configuration) pair"""
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Look up a cached response. Cached responses report
+        zero consumed tokens, as no request was made."""
+        key = self.get_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is not None and self._ttl is not None and (now - row[1]) > self._ttl:
+                # expired entry
+                if not self._read_only:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._connection.commit()
+                    self.evictions += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            if not self._read_only:
+                self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._connection.commit()
+
+            self.hits += 1
+
+        return [mark_cache_hit(generation) for generation in loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store a response (no-op in read-only mode, or if the response is rejected by the output parser)"""
+        if self._read_only or not is_valid_response(return_val):
+            return
+
+        key = self.get_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, llm_string, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, dumps(return_val), now, now)
+            )
+            self.writes += 1
+
+            # size eviction, least recently used entries go first
+            if self._max_entries is not None:
+                cursor = self._connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self._max_entries,)
+                )
+                self.evictions += max(cursor.rowcount, 0)
+
+            self._connection.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove all the cached responses"""
+        if self._read_only:
+            return
+
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def get_stats(self) -> dict:
+        """Returns the cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups > 0 else None,
+            "writes": self.writes,
+            "evictions": self.evictions
+        }
+
+def mark_cache_hit(generation):
+    """Zeroes the token usage reported by a cached generation,
+    and flags it as a cache hit in its response metadata."""
+    message = getattr(generation, "message", None)
+    if not isinstance(message, AIMessage):
+        return generation
+
+    response_metadata = {**message.response_metadata, "cache_hit": True}
+    if isinstance(response_metadata.get("token_usage"), dict):
+        response_metadata["token_usage"] = {
+            key: (0 if isinstance(value, int) else value)
+            for key, value in response_metadata["token_usage"].items()
+        }
+
+    usage_metadata = None
+    if message.usage_metadata:
+        usage_metadata = {**message.usage_metadata, "input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+    generation.message = message.model_copy(update={
+        "response_metadata": response_metadata,
+        "usage_metadata": usage_metadata
+    })
+
+    return generation
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the LLM cache command line arguments to a tool's parser"""
+    parser.add_argument("--cache", help="(optional) a SQLite file used to cache LLM responses")
+    parser.add_argument("--cache-ttl", help="(optional) cached responses expire after this many seconds", type=float, default=None)
+    parser.add_argument("--cache-size", help="(optional) maximum number of cached responses (least recently used are evicted)", type=int, default=None)
+    parser.add_argument("--cache-readonly", help="(optional) never write to the cache (reproducible replays)", action="store_true")
+
+def validate_cache_arguments(args: argparse.Namespace) -> None:
+    """Validates the LLM cache command line arguments"""
+    if args.cache_readonly and args.cache is None:
+        print("Error: --cache-readonly requires a --cache file!")
+        exit(2)
+
+    if (args.cache_ttl is not None and args.cache_ttl <= 0) or (args.cache_size is not None and args.cache_size < 1):
+        print("Error: --cache-ttl and --cache-size must be positive numbers!")
+        exit(2)
+
+def setup_llm_cache(args: argparse.Namespace) -> LLMResponseCache | None:
+    """Creates the LLM response cache from command line arguments
+    and registers it as the global langchain cache."""
+    if args.cache is None:
+        return None
+
+    cache = LLMResponseCache(
+        database_path=args.cache,
+        ttl=args.cache_ttl,
+        max_entries=args.cache_size,
+        read_only=args.cache_readonly
+    )
+    set_llm_cache(cache)
+
+    return cache
+
+def print_cache_stats(cache: LLMResponseCache | None) -> None:
+    """Logs the cache counters (if a cache is in use)"""
+    if cache is None:
+        return
+
+    stats = cache.get_stats()
+    print(f"INFO\t LLM cache: {stats['hits']} hits, {stats['misses']} misses (hit rate: {stats['hit_rate']}), {stats['writes']} writes, {stats['evictions']} evictions")
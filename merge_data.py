@@ -1,10 +1,13 @@
 import os
 import pandas as pd
 from thefuzz import fuzz
+from data_io import find_table, read_table, write_table, is_supported_format, XLSX_FORMAT
 
 # -- i/o
+# Note: input files are looked up by base name, so any format
+# written by collect_data.py (.tsv, .parquet, .feather) is detected.
 root_dir = "./vikidia_100"
-output_file = "analysis_report.xlsx"
+output_file = "analysis_report.xlsx" # .xlsx, .tsv, .parquet or .feather
 
 original_files = {
     "en": {
@@ -25,18 +28,25 @@ def list_subdirectories(path: str) -> list:
     contents = os.listdir(path=path)
     return [ x for x in contents if os.path.isdir(os.path.join(path, x)) ]
 
+def load_table(path: str) -> pd.DataFrame:
+    """Reads a table, detecting its format from existing files"""
+    table_file = find_table(path)
+    if table_file is None:
+        raise FileNotFoundError(f"No supported table found for '{path}'")
+    return read_table(table_file)
+
 main_df = pd.DataFrame()
 
 # --- loop over known folder structure
 idioms = list_subdirectories(root_dir)
 
 for idiom in idioms:
-    original_df = pd.read_csv(original_files[idiom]["original"], sep="\t", encoding="utf-8", header=0)
+    original_df = load_table(original_files[idiom]["original"])
 
-    original_df_g = pd.read_csv(original_files[idiom]["grammar"], sep="\t", encoding="utf-8", header=0)
+    original_df_g = load_table(original_files[idiom]["grammar"])
     error_cols = [x for x in list(original_df_g.columns.values) if x.startswith("errors_")]
 
-    original_df_l = pd.read_csv(original_files[idiom]["lexical"], sep="\t", encoding="utf-8", header=0)
+    original_df_l = load_table(original_files[idiom]["lexical"])
     percentages_cols = ["A1_allpos_percent", "A2_allpos_percent"]
 
     original_df = pd.concat([original_df[["text"]], original_df_l[percentages_cols], original_df_g[error_cols]], axis=1)
@@ -58,12 +68,12 @@ for idiom in idioms:
         strategies_parent_dir = os.path.join(root_dir, idiom, model)
         # iterate over stategies
         for letter in strategies:
-            strategy_df = pd.read_csv(os.path.join(strategies_parent_dir, f"{letter}.tsv"), sep="\t", encoding="utf-8", header=0)
+            strategy_df = load_table(os.path.join(strategies_parent_dir, letter))
 
-            strategy_df_g = pd.read_csv(os.path.join(strategies_parent_dir, f"{letter}_grammar.tsv"), sep="\t", encoding="utf-8", header=0)
+            strategy_df_g = load_table(os.path.join(strategies_parent_dir, f"{letter}_grammar"))
             error_cols = [x for x in list(strategy_df_g.columns.values) if x.startswith("errors_")]
 
-            strategy_df_l = pd.read_csv(os.path.join(strategies_parent_dir, f"{letter}_lexical.tsv"), sep="\t", encoding="utf-8", header=0)
+            strategy_df_l = load_table(os.path.join(strategies_parent_dir, f"{letter}_lexical"))
             percentages_cols = ["A1_allpos_percent", "A2_allpos_percent"]
 
             strategy_df = pd.concat([strategy_df[["text"]], strategy_df_l[percentages_cols], strategy_df_g[error_cols]], axis=1)
@@ -90,4 +100,7 @@ colum_order = ["original", "modified", "idiom", "model", "letter", "diff", "A1_a
 main_df = main_df[colum_order]
 
 # write out all
-main_df.to_excel(output_file, engine="openpyxl", index=False)
\ No newline at end of file
+if is_supported_format(output_file, [XLSX_FORMAT]):
+    main_df.to_excel(output_file, engine="openpyxl", index=False)
+else:
+    write_table(main_df, output_file)
\ No newline at end of file
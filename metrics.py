@@ -0,0 +1,329 @@
+import re, json, time, threading, argparse
+from uuid import UUID
+from contextlib import contextmanager
+from contextvars import ContextVar
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+###
+# LLM call instrumentation, shared by all the LLM-driven tools.
+#
+# Handlers are registered as langchain configure hooks, so every LLM
+# call made while they are active is instrumented (including calls made
+# by nested chains, retries and the LLM POS tagger), for any provider:
+#   * MetricsCallbackHandler -> one JSONL record per LLM call (tokens,
+#     latency, retries, cache hits), tagged with the run tags (tool,
+#     language, model, strategy) and the context tags (row, step, ...)
+#   * UsageTracker           -> token counter of a code block (e.g. a row)
+#
+# Metrics files are summarised per row, step and run by 'summarize_metrics'.
+###
+
+RETRY_TAG_REGEX_PATTERN = r"^retry:attempt:(\d+)$"
+
+_metrics_handler = ContextVar("a1_metrics_handler", default=None)
+_usage_tracker = ContextVar("a1_usage_tracker", default=None)
+_metrics_tags = ContextVar("a1_metrics_tags", default={})
+
+register_configure_hook(_metrics_handler, True)
+register_configure_hook(_usage_tracker, True)
+
+def get_usage(response: LLMResult | AIMessage) -> dict:
+    """Reads the token usage of a langchain LLM result (or message), from
+    the provider's 'token_usage' if available, otherwise from the messages'
+    'usage_metadata' (e.g. cached responses, groq).
+
+    Returns:
+        dict: prompt_tokens, completion_tokens, total_tokens, cached_tokens
+    """
+    if isinstance(response, AIMessage):
+        messages = [response]
+        token_usage = response.response_metadata.get("token_usage") or {}
+    else:
+        messages = [getattr(x, "message", None) for generations in response.generations for x in generations]
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+    if token_usage.get("total_tokens") is not None:
+        usage["prompt_tokens"] = token_usage.get("prompt_tokens") or 0
+        usage["completion_tokens"] = token_usage.get("completion_tokens") or 0
+        usage["total_tokens"] = token_usage["total_tokens"]
+        usage["cached_tokens"] = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        return usage
+
+    for message in messages:
+        usage_metadata = getattr(message, "usage_metadata", None)
+        if not usage_metadata:
+            continue
+        usage["prompt_tokens"] += usage_metadata.get("input_tokens", 0)
+        usage["completion_tokens"] += usage_metadata.get("output_tokens", 0)
+        usage["total_tokens"] += usage_metadata.get("total_tokens", 0)
+        usage["cached_tokens"] += (usage_metadata.get("input_token_details") or {}).get("cache_read") or 0
+
+    return usage
+
+def get_model_name(response: LLMResult | AIMessage) -> str | None:
+    """Reads the name of the model that generated a response"""
+    if isinstance(response, AIMessage):
+        return response.response_metadata.get("model_name")
+
+    model_name = (response.llm_output or {}).get("model_name")
+    if model_name is not None:
+        return model_name
+
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None and message.response_metadata.get("model_name") is not None:
+                return message.response_metadata["model_name"]
+
+    return None
+
+def is_cache_hit(response: LLMResult) -> bool:
+    """Checks if a response was served by the LLM cache (see llm_cache.py)"""
+    return any(
+        getattr(generation, "message", None) is not None and generation.message.response_metadata.get("cache_hit", False)
+        for generations in response.generations
+        for generation in generations
+    )
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Writes a JSONL record for every LLM call. Failed calls (retried
+    by the rate limiter wrapper, see rate_limiter.py) are recorded too.
+
+    Arguments:
+        path (str): the metrics file (records are appended)
+        tags (dict): run tags, added to every record (e.g. tool, language, model, strategy)
+    """
+    run_inline = True
+
+    def __init__(self, path: str, tags: dict) -> None:
+        self.path = path
+        self.tags = tags
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        self.stats = {"calls": 0, "errors": 0, "retries": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0, "latency": 0.0}
+
+    def _start(self, run_id: UUID, tags: list[str] | None) -> None:
+        provider_attempt = 1
+        for tag in tags or []:
+            match = re.match(RETRY_TAG_REGEX_PATTERN, tag)
+            if match:
+                provider_attempt = int(match.group(1))
+
+        with self._lock:
+            self._calls[run_id] = (time.perf_counter(), provider_attempt, dict(_metrics_tags.get()))
+
+    def on_llm_start(self, serialized: dict, prompts: list[str], *, run_id: UUID, tags: list[str] | None = None, **kwargs) -> None:
+        self._start(run_id, tags)
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, tags: list[str] | None = None, **kwargs) -> None:
+        self._start(run_id, tags)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            started, provider_attempt, context_tags = self._calls.pop(run_id, (None, 1, dict(_metrics_tags.get())))
+
+        self.record(
+            usage=get_usage(response),
+            latency=time.perf_counter() - started if started is not None else None,
+            llm=get_model_name(response),
+            cache_hit=is_cache_hit(response),
+            provider_attempt=provider_attempt,
+            tags=context_tags
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        with self._lock:
+            started, provider_attempt, context_tags = self._calls.pop(run_id, (None, 1, dict(_metrics_tags.get())))
+
+        self.record(
+            usage=get_usage(AIMessage(content="")),
+            latency=time.perf_counter() - started if started is not None else None,
+            provider_attempt=provider_attempt,
+            error=f"{type(error).__name__}: {error}",
+            tags=context_tags
+        )
+
+    def record(
+        self,
+        usage: dict,
+        latency: float | None,
+        llm: str | None = None,
+        cache_hit: bool = False,
+        provider_attempt: int = 1,
+        error: str | None = None,
+        tags: dict | None = None) -> None:
+        """Writes the record of an LLM call.
+
+        Arguments:
+            usage (dict): the token usage (see get_usage)
+            latency (float | None): the call duration (seconds), including rate limiter waits
+            llm (str | None): the model that generated the response
+            cache_hit (bool): set to True if the response was served by the LLM cache
+            provider_attempt (int): the attempt number of the call (> 1 for calls retried after an error)
+            error (str | None): the error of a failed call
+            tags (dict | None): the context tags (e.g. row, step, task, attempt)
+        """
+        record = {
+            "timestamp": time.time(),
+            **self.tags,
+            **(tags or {}),
+            "llm": llm,
+            **usage,
+            "latency": round(latency, 4) if latency is not None else None,
+            "cache_hit": cache_hit,
+            "provider_attempt": provider_attempt,
+            # retried calls: after a provider error, or after an invalid output
+            "retry": provider_attempt > 1 or (tags or {}).get("attempt", 1) > 1,
+            "error": error
+        }
+
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["errors"] += int(error is not None)
+            self.stats["retries"] += int(record["retry"])
+            self.stats["cache_hits"] += int(cache_hit)
+            for key in ["prompt_tokens", "completion_tokens", "total_tokens", "cached_tokens"]:
+                self.stats[key] += usage[key]
+            self.stats["latency"] += latency or 0.0
+
+            with open(self.path, "a", encoding="utf-8") as f_out:
+                f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+class UsageTracker(BaseCallbackHandler):
+    """Counts the tokens consumed by the LLM calls of a code block"""
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        usage = get_usage(response)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+            self.total_tokens += usage["total_tokens"]
+
+@contextmanager
+def track_usage():
+    """Counts the tokens consumed by the LLM calls made in the block
+    (by any provider), e.g.:
+
+        with track_usage() as usage:
+            ...
+        tokens = usage.total_tokens
+    """
+    tracker = UsageTracker()
+    token = _usage_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _usage_tracker.reset(token)
+
+@contextmanager
+def metrics_tags(**tags):
+    """Adds tags (e.g. row, step) to the metrics records of the LLM calls made in the block"""
+    token = _metrics_tags.set({**_metrics_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _metrics_tags.reset(token)
+
+def get_metrics_tags() -> dict:
+    """Returns the current context tags"""
+    return dict(_metrics_tags.get())
+
+def get_metrics_handler() -> MetricsCallbackHandler | None:
+    """Returns the active metrics handler (if any)"""
+    return _metrics_handler.get()
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the metrics command line arguments to a tool's parser"""
+    parser.add_argument("--metrics", help="(optional) a JSONL file where LLM call metrics are appended (tokens, latency, retries, cache hits)")
+    parser.add_argument("--metrics-tags", help="(optional) key=value tags added to every metrics record (e.g. language=it strategy=a)", nargs="*", default=[])
+
+def setup_metrics(args: argparse.Namespace, tool: str) -> MetricsCallbackHandler | None:
+    """Creates the metrics handler from command line arguments
+    and activates it for every LLM call of the process."""
+    if args.metrics is None:
+        return None
+
+    tags = {"tool": tool}
+    for tag in args.metrics_tags:
+        key, separator, value = tag.partition("=")
+        if separator == "" or key == "":
+            print(f"Error: invalid metrics tag '{tag}' (expected key=value)!")
+            exit(2)
+        tags[key] = value
+
+    handler = MetricsCallbackHandler(args.metrics, tags)
+    _metrics_handler.set(handler)
+
+    return handler
+
+def print_metrics_stats(handler: MetricsCallbackHandler | None) -> None:
+    """Logs the metrics counters (if metrics are enabled)"""
+    if handler is None:
+        return
+
+    stats = handler.stats
+    mean_latency = round(stats["latency"] / stats["calls"], 3) if stats["calls"] > 0 else None
+    print(f"INFO\t LLM metrics: {stats['calls']} calls ({stats['errors']} errors, {stats['retries']} retries, {stats['cache_hits']} cache hits), {stats['prompt_tokens']} prompt ({stats['cached_tokens']} cached by the provider) + {stats['completion_tokens']} completion tokens, {mean_latency}s mean latency (written to '{handler.path}')")
+
+# --- metrics files summary
+def load_metrics(path: str) -> pd.DataFrame:
+    """Loads a metrics file (a truncated last line is ignored)"""
+    records = []
+    with open(path, "r", encoding="utf-8") as f_in:
+        for line in f_in:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    return pd.DataFrame.from_records(records)
+
+def summarize_metrics(df: pd.DataFrame, group_by: list[str]) -> pd.DataFrame:
+    """Aggregates LLM call metrics.
+
+    Arguments:
+        df (pd.DataFrame): the metrics records (see load_metrics)
+        group_by (list[str]): the grouping tags (e.g. ['language', 'model', 'strategy', 'tool', 'step']),
+            tags missing from the records are ignored
+
+    Returns:
+        pd.DataFrame: calls, errors, retries, cache hits, token sums and latency statistics of each group
+    """
+    group_by = [key for key in group_by if key in df.columns]
+    df = df.assign(
+        failed=df["error"].notna(),
+        # latency statistics only consider actual (successful, non cached) requests
+        request_latency=df["latency"].where(df["error"].isna() & ~df["cache_hit"].astype(bool))
+    )
+
+    summary = df.groupby(group_by, dropna=False).agg(
+        calls=("latency", "size"),
+        errors=("failed", "sum"),
+        retries=("retry", "sum"),
+        cache_hits=("cache_hit", "sum"),
+        prompt_tokens=("prompt_tokens", "sum"),
+        completion_tokens=("completion_tokens", "sum"),
+        total_tokens=("total_tokens", "sum"),
+        cached_tokens=("cached_tokens", "sum"),
+        latency_mean=("request_latency", "mean"),
+        latency_p50=("request_latency", "median"),
+        latency_p95=("request_latency", lambda x: x.quantile(0.95)),
+        latency_total=("latency", "sum")
+    )
+
+    return summary.round(4).reset_index()
@@ -0,0 +1,502 @@
+import re, json, time, math, random, argparse, threading, email.parser, email.policy, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+###
+# A local, OpenAI-compatible stand-in LLM server, used to benchmark the
+# pipeline (concurrency, retries, caching, rate limits, batch jobs)
+# offline and deterministically, without API keys.
+#
+# Endpoints:
+#   POST /v1/chat/completions   -> chat completions (with token usage)
+#   POST /v1/files              -> batch input file upload
+#   GET  /v1/files/<id>/content -> file download (batch outputs)
+#   POST /v1/batches            -> batch job creation
+#   GET  /v1/batches/<id>       -> batch job status
+#   GET  /stats                 -> server counters
+# Paths prefixed with '/openai' (groq cloud layout) are accepted as well.
+#
+# Responses are either scripted (regex rules, see --script) or echoed:
+#   * prompts embedding a JSON schema get a minimal schema-valid JSON output
+#   * prompts asking for <text> tags get their input text back, in <text> tags
+#   * POS tagging prompts get their input whitespace tokenized and tagged
+#
+# With --prefix-cache, prompt caching is simulated as done by providers:
+# the longest prompt prefix already seen (in blocks of 128 tokens, from
+# 1024 tokens) is reported as cached ('prompt_tokens_details').
+#
+# Usage:
+#   python mock_llm_server.py --port 8000 --latency-dist lognormal --latency-mean 800
+#   OPENAI_BASE_URL=http://localhost:8000/v1 OPENAI_API_KEY=mock python eval.py ...
+###
+
+parser = argparse.ArgumentParser(
+    prog="mock_llm_server",
+    description="A local OpenAI-compatible stand-in LLM server, for offline pipeline benchmarking"
+)
+
+parser.add_argument("--host", help="(optional) the address to listen on", default="127.0.0.1")
+parser.add_argument("--port", help="(optional) the port to listen on", type=int, default=8000)
+parser.add_argument("--latency-dist", help="(optional) response latency distribution", choices=["none", "fixed", "uniform", "normal", "lognormal"], default="none")
+parser.add_argument("--latency-mean", help="(optional) mean response latency (ms)", type=float, default=500)
+parser.add_argument("--latency-std", help="(optional) response latency standard deviation (ms), the uniform distribution spans mean +/- std", type=float, default=100)
+parser.add_argument("--latency-per-token", help="(optional) additional latency per completion token (ms)", type=float, default=0)
+parser.add_argument("--rate-limit-rate", help="(optional) probability of answering a request with a 429 error", type=float, default=0)
+parser.add_argument("--error-rate", help="(optional) probability of answering a request with a 500 error", type=float, default=0)
+parser.add_argument("--retry-after", help="(optional) 'Retry-After' header sent with 429 errors (seconds)", type=float, default=1)
+parser.add_argument("--rpm-limit", help="(optional) requests/minute quota, requests above it get a 429 error", type=int, default=None)
+parser.add_argument("--tpm-limit", help="(optional) tokens/minute quota, requests above it get a 429 error", type=int, default=None)
+parser.add_argument("--batch-delay", help="(optional) seconds before a batch job completes", type=float, default=2)
+parser.add_argument("--script", help="(optional) a JSON file with scripted response rules")
+parser.add_argument("--prefix-cache", help="(optional) simulate provider prompt caching (prompt prefixes already seen are reported as cached tokens)", action="store_true")
+parser.add_argument("--seed", help="(optional) random seed (latency and error injection)", type=int, default=0)
+
+# --- response generation
+TEXT_INPUT_REGEX_PATTERN = r"# (?:Original [a-z]+:|Input)\n([\s\S]*?)(?:\n\n# |$)"
+JSON_SCHEMA_REGEX_PATTERN = r"```json\n([\s\S]*?)\n```"
+FENCED_INPUT_REGEX_PATTERN = r"```\n([\s\S]*?)\n```"
+
+CHARACTERS_PER_TOKEN = 4
+
+# simulated prompt caching (OpenAI): prefixes from 1024 tokens, in 128 tokens increments
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_BLOCK_TOKENS = 128
+
+def estimate_tokens(text: str) -> int:
+    """A rough token count estimate (~4 characters per token)"""
+    return max(1, math.ceil(len(text) / CHARACTERS_PER_TOKEN))
+
+def minimal_instance(schema: dict):
+    """Builds a minimal JSON value that is valid against a JSON schema"""
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    for keyword in ["oneOf", "anyOf", "allOf"]:
+        if keyword in schema:
+            return minimal_instance(schema[keyword][0])
+
+    schema_type = schema.get("type", "object" if "properties" in schema else "null")
+    if isinstance(schema_type, list):
+        schema_type = schema_type[0]
+
+    match schema_type:
+        case "object":
+            properties = schema.get("properties", {})
+            return {key: minimal_instance(properties.get(key, {})) for key in schema.get("required", [])}
+        case "array":
+            return [minimal_instance(schema.get("items", {})) for _ in range(schema.get("minItems", 0))]
+        case "string":
+            return "x" * schema.get("minLength", 0)
+        case "integer" | "number":
+            return schema.get("minimum", 0)
+        case "boolean":
+            return False
+        case _:
+            return None
+
+def echo_response(prompt: str, system_prompt: str = "") -> str:
+    """Builds a response satisfying the contract stated in the prompt
+    (or in the system prompt, when instructions are given as system messages)"""
+    # POS tagging (LLMTagger)
+    if "Tag every word" in prompt:
+        match = re.search(FENCED_INPUT_REGEX_PATTERN, prompt)
+        tokens = match.group(1).split() if match else []
+        return "```json\n" + json.dumps([{"text": x, "pos": "NOUN", "lemma": x} for x in tokens], ensure_ascii=False) + "\n```"
+
+    # JSON schema constrained outputs (eval analysis tasks)
+    match = re.search(JSON_SCHEMA_REGEX_PATTERN, prompt)
+    if match:
+        try:
+            instance = minimal_instance(json.loads(match.group(1)))
+        except json.JSONDecodeError:
+            instance = []
+        return "```json\n" + json.dumps(instance, ensure_ascii=False) + "\n```"
+
+    # <text> tagged outputs (paraphrase, simplification): the input is echoed
+    if "<text>" in prompt or "<text>" in system_prompt:
+        match = re.search(TEXT_INPUT_REGEX_PATTERN, prompt)
+        text = match.group(1) if match else prompt
+        return f"<text>{text}</text>"
+
+    return prompt
+
+class ResponseScript():
+    """Scripted response rules, loaded from a JSON file:
+
+    [
+        {"pattern": "<regex matched against the last user message>", "response": "<response>"},
+        {"pattern": "...", "responses": ["<first response>", "<second response>", ...]},
+        {"pattern": "...", "status": 500}
+    ]
+
+    The first matching rule wins ('responses' are cycled). If no
+    rule matches, the response is echoed."""
+    def __init__(self, rules: list[dict]) -> None:
+        self._rules = [{**rule, "regex": re.compile(rule["pattern"]), "calls": 0} for rule in rules]
+        self._lock = threading.Lock()
+
+    def match(self, prompt: str) -> dict | None:
+        with self._lock:
+            for rule in self._rules:
+                if rule["regex"].search(prompt):
+                    rule["calls"] += 1
+                    if "responses" in rule:
+                        return {**rule, "response": rule["responses"][(rule["calls"] - 1) % len(rule["responses"])]}
+                    return rule
+
+        return None
+
+# --- server state
+class MockState():
+    """Shared server state: configuration, counters, quotas, files and batches"""
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+
+        self.script = None
+        if args.script is not None:
+            with open(args.script, "r", encoding="utf-8") as f_in:
+                self.script = ResponseScript(json.load(f_in))
+
+        self.window = [] # (timestamp, tokens) of the requests in the last minute
+        self.files = {}
+        self.batches = {}
+        self.prefixes = set() # hashes of the prompt prefixes seen (--prefix-cache)
+        self.stats = {"requests": 0, "completions": 0, "rate_limited": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+
+    def sample_latency(self, completion_tokens: int) -> float:
+        """Samples a response latency (seconds)"""
+        args = self.args
+        with self.lock:
+            match args.latency_dist:
+                case "fixed":
+                    latency = args.latency_mean
+                case "uniform":
+                    latency = self.random.uniform(args.latency_mean - args.latency_std, args.latency_mean + args.latency_std)
+                case "normal":
+                    latency = self.random.gauss(args.latency_mean, args.latency_std)
+                case "lognormal":
+                    # parameters of the underlying normal distribution, from the target mean/std
+                    sigma = math.sqrt(math.log(1 + (args.latency_std / args.latency_mean) ** 2))
+                    mu = math.log(args.latency_mean) - sigma ** 2 / 2
+                    latency = self.random.lognormvariate(mu, sigma)
+                case _:
+                    latency = 0
+
+        return max(0.0, latency + completion_tokens * self.args.latency_per_token) / 1000
+
+    def check_quota(self, tokens: int) -> float | None:
+        """Checks the request against the injected errors and the quotas.
+        Returns None if the request is accepted, otherwise the seconds to wait."""
+        args = self.args
+        with self.lock:
+            self.stats["requests"] += 1
+
+            if self.random.random() < args.rate_limit_rate:
+                return args.retry_after
+
+            now = time.monotonic()
+            self.window = [x for x in self.window if now - x[0] < 60]
+
+            if args.rpm_limit is not None and len(self.window) >= args.rpm_limit:
+                return 60 - (now - self.window[0][0])
+
+            if args.tpm_limit is not None and sum(x[1] for x in self.window) + tokens > args.tpm_limit and len(self.window) > 0:
+                return 60 - (now - self.window[0][0])
+
+            self.window.append((now, tokens))
+
+        return None
+
+    def cache_prompt(self, prompt: str) -> int:
+        """Simulates provider prompt caching: returns the number of cached
+        tokens of a prompt (its longest prefix already seen, in blocks),
+        then caches all its prefixes."""
+        if not self.args.prefix_cache:
+            return 0
+
+        block = PREFIX_CACHE_BLOCK_TOKENS * CHARACTERS_PER_TOKEN
+        prefixes = [hash(prompt[:end]) for end in range(block, len(prompt) + 1, block)]
+
+        with self.lock:
+            cached_blocks = 0
+            for prefix in prefixes:
+                if prefix not in self.prefixes:
+                    break
+                cached_blocks += 1
+            self.prefixes.update(prefixes)
+
+        cached_tokens = cached_blocks * PREFIX_CACHE_BLOCK_TOKENS
+        return cached_tokens if cached_tokens >= PREFIX_CACHE_MIN_TOKENS else 0
+
+    def inject_error(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.args.error_rate
+
+    def count(self, key: str, value: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += value
+
+def complete(state: MockState, body: dict) -> tuple[int, dict]:
+    """Answers a chat completion request. Returns (status code, response body)"""
+    messages = body.get("messages", [])
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    last_user_message = next((str(x.get("content", "")) for x in reversed(messages) if x.get("role") == "user"), prompt)
+
+    rule = state.script.match(last_user_message) if state.script is not None else None
+    if rule is not None and rule.get("status", 200) != 200:
+        return rule["status"], {"error": {"message": "scripted error", "type": "server_error", "code": rule["status"]}}
+
+    system_prompt = "\n".join(str(x.get("content", "")) for x in messages if x.get("role") == "system")
+
+    content = rule["response"] if rule is not None else echo_response(last_user_message, system_prompt)
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(content)
+    cached_tokens = min(state.cache_prompt(prompt), prompt_tokens)
+
+    state.count("completions")
+    state.count("prompt_tokens", prompt_tokens)
+    state.count("completion_tokens", completion_tokens)
+    state.count("cached_tokens", cached_tokens)
+
+    return 200, {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "logprobs": None,
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+    }
+
+def run_batch(state: MockState, batch: dict) -> None:
+    """Processes a batch job (no latency, errors are injected per request)"""
+    input_file = state.files[batch["input_file_id"]]
+    outputs = []
+    errors = []
+    for line in input_file["content"].decode("utf-8").splitlines():
+        if len(line.strip()) == 0:
+            continue
+        request = json.loads(line)
+
+        if state.inject_error():
+            status, body = 500, {"error": {"message": "injected server error", "type": "server_error"}}
+        else:
+            status, body = complete(state, request["body"])
+
+        result = {
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": request["custom_id"],
+            "response": {"status_code": status, "request_id": uuid.uuid4().hex, "body": body},
+            "error": None
+        }
+        (outputs if status == 200 else errors).append(result)
+
+    for results, key in [(outputs, "output_file_id"), (errors, "error_file_id")]:
+        if len(results) > 0:
+            content = "\n".join(json.dumps(x, ensure_ascii=False) for x in results).encode("utf-8")
+            batch[key] = store_file(state, f"{batch['id']}_{key}.jsonl", "batch_output", content)["id"]
+
+    batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+
+def store_file(state: MockState, filename: str, purpose: str, content: bytes) -> dict:
+    """Stores an uploaded (or generated) file"""
+    file_object = {
+        "id": f"file-{uuid.uuid4().hex}",
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed"
+    }
+    with state.lock:
+        state.files[file_object["id"]] = {**file_object, "content": content}
+
+    return file_object
+
+def get_batch(state: MockState, batch_id: str) -> dict | None:
+    """Returns a batch job, completing it once its delay has elapsed"""
+    with state.lock:
+        batch = state.batches.get(batch_id)
+    if batch is None:
+        return None
+
+    if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= state.args.batch_delay:
+        run_batch(state, batch)
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    return {key: value for key, value in batch.items()}
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Routes the OpenAI-compatible endpoints"""
+    state: MockState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _path(self) -> str:
+        path = self.path.split("?")[0]
+        return path[len("/openai"):] if path.startswith("/openai/") else path
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_bytes(self, content: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self) -> None:
+        path = self._path()
+
+        if path == "/stats":
+            with self.state.lock:
+                return self._send_json(200, dict(self.state.stats))
+
+        match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        if match and match.group(1) in self.state.files:
+            return self._send_bytes(self.state.files[match.group(1)]["content"])
+
+        match = re.fullmatch(r"/v1/batches/([^/]+)", path)
+        if match:
+            batch = get_batch(self.state, match.group(1))
+            if batch is not None:
+                return self._send_json(200, batch)
+
+        self._send_json(404, {"error": {"message": f"not found: {path}", "type": "invalid_request_error"}})
+
+    def do_POST(self) -> None:
+        path = self._path()
+        raw_body = self._read_body()
+
+        match path:
+            case "/v1/chat/completions":
+                self._chat_completions(json.loads(raw_body))
+            case "/v1/files":
+                self._upload_file(raw_body)
+            case "/v1/batches":
+                self._create_batch(json.loads(raw_body))
+            case _:
+                self._send_json(404, {"error": {"message": f"not found: {path}", "type": "invalid_request_error"}})
+
+    def _chat_completions(self, body: dict) -> None:
+        state = self.state
+        prompt_tokens = estimate_tokens("\n".join(str(x.get("content", "")) for x in body.get("messages", [])))
+
+        retry_after = state.check_quota(prompt_tokens)
+        if retry_after is not None:
+            state.count("rate_limited")
+            return self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_exceeded", "code": "rate_limit_exceeded"}},
+                {"Retry-After": f"{retry_after:.3f}", "Retry-After-Ms": str(int(retry_after * 1000))}
+            )
+
+        if state.inject_error():
+            state.count("errors")
+            return self._send_json(500, {"error": {"message": "injected server error (mock)", "type": "server_error"}})
+
+        status, response = complete(state, body)
+        if status == 200:
+            time.sleep(state.sample_latency(response["usage"]["completion_tokens"]))
+        else:
+            state.count("errors")
+
+        self._send_json(status, response)
+
+    def _upload_file(self, raw_body: bytes) -> None:
+        # multipart/form-data, parsed with the stdlib email parser
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8") + raw_body
+        )
+
+        fields = {}
+        filename = "upload.jsonl"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = part.get_payload(decode=True)
+            if name == "file" and part.get_filename() is not None:
+                filename = part.get_filename()
+
+        if "file" not in fields:
+            return self._send_json(400, {"error": {"message": "missing 'file' field", "type": "invalid_request_error"}})
+
+        purpose = (fields.get("purpose") or b"batch").decode("utf-8")
+        file_object = store_file(self.state, filename, purpose, fields["file"])
+        self._send_json(200, file_object)
+
+    def _create_batch(self, body: dict) -> None:
+        if body.get("input_file_id") not in self.state.files:
+            return self._send_json(400, {"error": {"message": "unknown input file", "type": "invalid_request_error"}})
+
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "errors": None,
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "in_progress_at": int(time.time()),
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata")
+        }
+        with self.state.lock:
+            self.state.batches[batch["id"]] = batch
+
+        self._send_json(200, batch)
+
+def main():
+    args = parser.parse_args()
+
+    if args.latency_dist == "lognormal" and args.latency_mean <= 0:
+        print("Error: the lognormal latency distribution requires a positive --latency-mean!")
+        exit(2)
+
+    if not (0 <= args.rate_limit_rate <= 1 and 0 <= args.error_rate <= 1):
+        print("Error: --rate-limit-rate and --error-rate must be probabilities (0-1)!")
+        exit(2)
+
+    MockRequestHandler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockRequestHandler)
+    print(f"INFO\t Mock LLM server listening on http://{args.host}:{args.port}/v1")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"INFO\t Mock LLM server stats: {json.dumps(MockRequestHandler.state.stats)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
-import os, json, time, argparse, spacy
-from dotenv import load_dotenv
+import os, argparse, asyncio, spacy
 import pandas as pd
+from dotenv import load_dotenv
+from llm_cache import add_cache_arguments, validate_cache_arguments, setup_llm_cache, print_cache_stats, cache_if_valid
+from rate_limiter import add_rate_limit_arguments, validate_rate_limit_arguments, get_rate_limiter, get_rate_limit_kwargs, with_rate_limit_retries, print_rate_limit_stats, GROQ_DEFAULT_RPM, GROQ_DEFAULT_TPM
+from batch_backend import BatchBackend, add_batch_arguments, validate_batch_arguments, print_batch_stats
+from metrics import add_metrics_arguments, setup_metrics, print_metrics_stats, metrics_tags
+from row_pipeline import add_concurrency_arguments, validate_concurrency_arguments, process_rows, get_window
+from iteration_memo import IterationMemo, add_memo_arguments, setup_iteration_memo, print_memo_stats
+from conformance import ConformanceChecker, add_conformance_arguments, validate_conformance_arguments, setup_conformance_checker, print_conformance_stats
+from data_io import read_table, TableWriter, get_format, is_supported_format, TABULAR_FORMATS
 from utils import regex_message_parser, strip_string, TEXT_TAG_REGEX_PATTERN, token_usage_message_parser, compare_texts
 from langchain_core.runnables import Runnable
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 
@@ -18,10 +27,10 @@ parser = argparse.ArgumentParser(
     description="Given a set of texts as input, performs text transformations to make the input text conform to given linguistic constraints."
 )
 
-parser.add_argument("input", help="a TSV file containing the texts to paraphrase")
+parser.add_argument("input", help="a TSV/Parquet/Arrow file containing the texts to paraphrase")
 parser.add_argument("-c", "--constraints", help="a plain-text file containing the linguistic constraints to follow when paraphrasing", required=True)
 parser.add_argument("-l", "--label", help="(optional) the label of the column that contains input data", default="text")
-parser.add_argument('-o', '--output', help="(optional) output file")
+parser.add_argument('-o', '--output', help="(optional) output file (TSV/Parquet/Arrow)")
 parser.add_argument('-d', '--debug', action='store_true', help="(optional) log additional information")
 parser.add_argument('-g', '--groq', action='store_true', help="(optional) run on groq cloud")
 parser.add_argument('-t', '--type', help="(optional) how the paraphrase should be performed, default is fulltext", 
@@ -36,10 +45,22 @@ parser.add_argument("-r", "--retries",
                    help="maximum number of retries if model fails to respond as expected", 
                    type=int,
                    default=0)
+parser.add_argument("--prompt-layout",
+                   help="(optional) prompt layout, static-first puts the (static) instructions and constraints before the text, so that providers can cache the prompt prefix (default is text-first)",
+                   choices=['text-first', 'static-first'],
+                   type=str,
+                   default='text-first')
+add_concurrency_arguments(parser)
+add_conformance_arguments(parser)
+add_memo_arguments(parser)
+add_cache_arguments(parser)
+add_rate_limit_arguments(parser)
+add_batch_arguments(parser)
+add_metrics_arguments(parser)
 
 def validate_args(args):
     """Validate command line arguments"""
-    if not (os.path.isfile(args.input) and (os.path.splitext(args.input)[-1].lower() == ".tsv")):
+    if not (os.path.isfile(args.input) and is_supported_format(args.input)):
         print("Error: the input file does not exist or is not a supported format!")
         exit(2)
 
@@ -47,11 +68,15 @@ def validate_args(args):
         print("Error: the constraints file provided does not exist!")
         exit(2)
 
-    output_file = args.output if args.output else f"{os.path.splitext(args.input)[0]}_paraphrase_{args.type}.tsv"
+    output_file = args.output if args.output else f"{os.path.splitext(args.input)[0]}_paraphrase_{args.type}{get_format(args.input)}"
     if os.path.exists(output_file) or not os.path.exists(os.path.dirname(os.path.abspath(output_file))):
         print(f"Error: an output file with path '{output_file}' already exists!")
         exit(2)
 
+    if not is_supported_format(output_file):
+        print(f"Error: an unsupported output file format was specified. Please use one of {TABULAR_FORMATS}!")
+        exit(2)
+
     # Check if sentencizer is required (for both bysentence and bysentence_nocot)
     if (args.type == "bysentence" or args.type == "bysentence_nocot") and not args.sentencizer:
         print(f"Error: --sentencizer is required when using --type={args.type}!")
@@ -61,6 +86,12 @@ def validate_args(args):
         print("Error: --retries must be a non-negative integer!")
         exit(2)
 
+    validate_concurrency_arguments(args)
+    validate_conformance_arguments(args)
+    validate_cache_arguments(args)
+    validate_rate_limit_arguments(args)
+    validate_batch_arguments(args)
+
     return output_file
 
 def load_spacy_model(language):
@@ -74,7 +105,7 @@ def load_spacy_model(language):
         case 'russian':
             return spacy.load("ru_core_news_lg")
 
-def get_prompt_template(paraphrase_type: str) -> ChatPromptTemplate:
+def get_prompt_template(paraphrase_type: str, layout: str = "text-first") -> ChatPromptTemplate:
     """Return appropriate prompt template based on selected paraphrase type
     
     Arguments:
@@ -83,6 +114,11 @@ def get_prompt_template(paraphrase_type: str) -> ChatPromptTemplate:
             - 'bysentence': Process sentence by sentence with COT specific instructions
             - 'nocot': Process entire text without COT specific instructions
             - 'bysentence_nocot': Process sentence by sentence without COT specific instructions
+        layout (str): The prompt layout:
+            - 'text-first': a single user message, the input text precedes the instructions and constraints
+            - 'static-first': the instructions and constraints (identical for every request) come first, in
+              a system message, followed by the input text: requests share a long prefix, that can be
+              cached by the provider
             
     Returns:
         ChatPromptTemplate: Chain-ready prompt template
@@ -122,14 +158,14 @@ Note: The final version MUST be enclosed in <text> tags, regardless of whether c
 
     output_format = output_format.format(text_type=text_type)
     
-    # 3. General template to fill up
-    base_message = """# Task:
-Check if the given {text_type} complies with the constraints provided; generate a paraphrase when necessary.
+    # 3. General template to fill up (task, input text, instructions)
+    task_message = """# Task:
+Check if the given {text_type} complies with the constraints provided; generate a paraphrase when necessary."""
 
-# Original {text_type}:
-{input_text}
+    input_message = """# Original {text_type}:
+{input_text}"""
 
-# Constraints checking:
+    instructions_message = """# Constraints checking:
 Check {check_scope} againts ALL the constraints.
 - If it violates no constraint, keep it as is.
 - If it violates one or more constraints, paraphrase {action_scope}.
@@ -145,37 +181,178 @@ Check {check_scope} againts ALL the constraints.
 {constraints}"""
 
     # 4. format the complete template
-    message = base_message.format(
-        text_type=text_type,
-        check_scope=check_scope,
-        action_scope=action_scope,
-        input_text="{input_text}",  # chain placeholder
-        constraints="{constraints}", # chain placeholder
-        output_format=output_format
-    )
+    values = {
+        "text_type": text_type,
+        "check_scope": check_scope,
+        "action_scope": action_scope,
+        "input_text": "{input_text}",  # chain placeholder
+        "constraints": "{constraints}", # chain placeholder
+        "output_format": output_format
+    }
+
+    if layout == "static-first":
+        return ChatPromptTemplate.from_messages([
+            ("system", f"{task_message}\n\n{instructions_message}".format(**values)),
+            ("user", input_message.format(**values))
+        ])
+
+    message = f"{task_message}\n\n{input_message}\n\n{instructions_message}".format(**values)
 
     return ChatPromptTemplate.from_messages([("user", message)])
 
-def setup_llm(use_groq):
-    """Configure and return appropriate LLM"""
+def setup_llm(use_groq, rpm=None, tpm=None):
+    """Configure and return appropriate LLM (and its rate limiter)"""
     model = os.getenv("OPENAI_MODEL")
     temperature = 0
     top_p = 1.00
 
     if use_groq:
-        return ChatGroq(
-            model=os.getenv("GROQ_MODEL"),
+        model = os.getenv("GROQ_MODEL")
+        limiter = get_rate_limiter("groq", model, rpm or GROQ_DEFAULT_RPM, tpm or GROQ_DEFAULT_TPM)
+        llm = ChatGroq(
+            model=model,
             temperature=temperature,
-            model_kwargs={"top_p": top_p}
+            model_kwargs={"top_p": top_p},
+            **get_rate_limit_kwargs(limiter)
         )
     else:
-        return ChatOpenAI(
+        limiter = get_rate_limiter("openai", model, rpm, tpm)
+        llm = ChatOpenAI(
             model=model,
             temperature=temperature,
-            top_p=top_p
+            top_p=top_p,
+            **get_rate_limit_kwargs(limiter)
         )
 
-def process_text(
+    return with_rate_limit_retries(llm), limiter
+
+def setup_batch_backend(use_groq, file_prefix, poll_interval):
+    """Configure the batch backend (same model and parameters used by setup_llm)"""
+    model = os.getenv("GROQ_MODEL") if use_groq else os.getenv("OPENAI_MODEL")
+    temperature = 0
+    top_p = 1.00
+
+    return BatchBackend(model, {"temperature": temperature, "top_p": top_p}, file_prefix, use_groq, poll_interval)
+
+class ParaphraseSession():
+    """The iterative paraphrase of a single text chunk (sentence or full text).
+
+    The text is paraphrased again and again, until the model output
+    does not change or 'max_iterations' is reached. Malformed outputs
+    (no <text> tags) are retried up to 'max_retries' times. If a
+    conformance checker is given, iterations stop as soon as an output
+    passes the local checks (saving the confirmation round).
+
+    The session is driven one model response at a time, so that it can
+    run both with synchronous calls and with batch rounds."""
+    def __init__(self, text: str, max_iterations: int, max_retries: int, checker: ConformanceChecker | None = None) -> None:
+        self.current = text
+        self.messages = []
+        self.iteration = None
+        self.token_usage = 0
+        self.warnings = []
+        self.last_good_response = None  # Track the last good response
+        self.done = False
+
+        self._max_iterations = max_iterations
+        self._max_retries = max_retries
+        self._retry_count = 0
+        self._checker = checker
+
+        self._start_iteration(1)
+
+    def _start_iteration(self, iteration: int) -> None:
+        if iteration >= self._max_iterations:
+            self.done = True
+            return
+
+        self.iteration = iteration
+        self._retry_count = 0
+
+        # Add the user message for this iteration
+        self.messages.append({
+            "role": "user",
+            "content": self.current
+        })
+
+    def get_inputs(self, constraints: str) -> dict:
+        """Returns the chain inputs of the next request"""
+        return {
+            "input_text": self.current,
+            "constraints": constraints
+        }
+
+    def get_tags(self) -> dict:
+        """Returns the metrics tags of the next request"""
+        return {
+            "iteration": self.iteration,
+            "attempt": self._retry_count + 1
+        }
+
+    def apply(self, results: AIMessage, message_parser: Callable[...,str], token_parser: Callable[...,int]) -> None:
+        """Processes a model response, moving to the next iteration (or retry)"""
+        i = self.iteration
+        max_retries = self._max_retries
+
+        # Record the response
+        self.messages.append({
+            "role": "assistant",
+            "content": results.content
+        })
+
+        # Update token usage
+        self.token_usage += token_parser(results)
+
+        # Try to extract the text content with the parser
+        message_content = message_parser(results)
+
+        if message_content is not None:
+            # We got a valid response with matching <text> tags
+            self.last_good_response = message_content
+        else:
+            # Parser returned None (no <text> tags found) - need to retry
+            self._retry_count += 1
+            if self._retry_count <= max_retries:
+                # Document the retry in messages
+                retry_message = f"Retry {self._retry_count}/{max_retries}: No <text> tags found in response, retrying..."
+                self.messages.append({
+                    "role": "system",
+                    "content": retry_message
+                })
+                return
+
+            # Max retries reached, use last good response or mark as error
+            if self.last_good_response:
+                warning = f"WARNING: Iteration {i}: Failed to find <text> tags after {max_retries} retries. Using last good response."
+                self.warnings.append(warning)
+                message_content = self.last_good_response
+            else:
+                warning = f"ERROR: Iteration {i}: Failed to find <text> tags after {max_retries} retries. No good previous response available. Using original text."
+                self.warnings.append(warning)
+                message_content = self.current
+
+        # Check if we should continue iterations (text hasn't changed)
+        if compare_texts(message_content, self.current):
+            self.done = True
+        else:
+            # Update current text for next iteration
+            self.current = message_content
+
+            # a text passing the local checks needs no confirmation round
+            if self._checker is not None and i + 1 < self._max_iterations and self._checker.check(message_content):
+                self.messages.append({
+                    "role": "system",
+                    "content": f"Iteration {i}: the paraphrase passed the local conformance check, stopping."
+                })
+                self.done = True
+            else:
+                self._start_iteration(i + 1)
+
+    def get_results(self) -> tuple:
+        """Returns (paraphrase, iteration, messages, token_usage, warnings)"""
+        return self.current, self.iteration, self.messages, self.token_usage, self.warnings
+
+async def process_text(
     text: str,
     chain: Runnable,
     message_parser: Callable[...,str],
@@ -183,7 +360,9 @@ def process_text(
     constraints: str,
     max_iterations: int,
     max_retries: int,
-    use_groq: bool):
+    semaphore: asyncio.Semaphore,
+    checker: ConformanceChecker | None = None,
+    memo: IterationMemo | None = None):
     """Process a single text chunk (sentence or full text) with retry mechanism
     
     Arguments:
@@ -194,86 +373,188 @@ def process_text(
         constraints (str): the linguistic constraints list
         max_iterations (int): the upper limit to the iterative paraphrase process
         max_retries (int): maximum number of retries if the model output is invalid
-        use_groq (bool): set to True to run inference on groq cloud models"""
-
-    current = text
-    messages = []
-    iteration = None
-    token_usage = 0
-    warnings = []
-    last_good_response = None  # Track the last good response
-    
-    for i in range(1, max_iterations):
-        iteration = i
-        retry_count = 0
-        successful = False
-        
-        # Add the user message for this iteration
-        messages.append({
-            "role": "user",
-            "content": current
-        })
-        
-        # Try to get a valid response with retries
-        while retry_count <= max_retries and not successful:
-            # Invoke the model
-            results = chain.invoke({
-                "input_text": current,
-                "constraints": constraints
-            })
-            
-            # Record the response
-            messages.append({
-                "role": "assistant",
-                "content": results.content
-            })
-            
-            # --- this is to keep consumption within free tier limits
-            if use_groq:
-                time.sleep(5)
-            
-            # Update token usage
-            token_usage += token_parser(results)
-            
-            # Try to extract the text content with the parser
-            message_content = message_parser(results)
-            
-            if message_content is not None:
-                # We got a valid response with matching <text> tags
-                last_good_response = message_content
-                successful = True
-            else:
-                # Parser returned None (no <text> tags found) - need to retry
-                retry_count += 1
-                if retry_count <= max_retries:
-                    # Document the retry in messages
-                    retry_message = f"Retry {retry_count}/{max_retries}: No <text> tags found in response, retrying..."
-                    messages.append({
-                        "role": "system",
-                        "content": retry_message
-                    })
-
-                else:
-                    # Max retries reached, use last good response or mark as error
-                    if last_good_response:
-                        warning = f"WARNING: Iteration {i}: Failed to find <text> tags after {max_retries} retries. Using last good response."
-                        warnings.append(warning)
-                        message_content = last_good_response
-                        successful = True  # Consider it successful since we're using a valid response
-                    else:
-                        warning = f"ERROR: Iteration {i}: Failed to find <text> tags after {max_retries} retries. No good previous response available. Using original text."
-                        warnings.append(warning)
-                        message_content = current
-                        successful = True  # Mark as successful to exit the retry loop, but with an error value
-            
-        # Check if we should continue iterations (text hasn't changed)
-        if compare_texts(message_content, current):
-            break
+        semaphore (asyncio.Semaphore): limits the number of concurrent LLM requests
+        checker (ConformanceChecker | None): (optional) stops iterating when an output passes the local checks
+        memo (IterationMemo | None): (optional) skips the LLM call of the text states already seen"""
+    session = ParaphraseSession(text, max_iterations, max_retries, checker)
+
+    async def invoke():
+        # malformed responses are not cached, so that their retries make new requests
+        async with semaphore:
+            with metrics_tags(**session.get_tags()), cache_if_valid(message_parser):
+                return await chain.ainvoke(session.get_inputs(constraints))
+
+    while not session.done:
+        # Invoke the model (unless the current text state is memoised)
+        if memo is not None:
+            results = await memo.ainvoke(session.current, invoke, message_parser)
         else:
-            # Update current text for next iteration
-            current = message_content
-    
-    return current, iteration, messages, token_usage, warnings
+            results = await invoke()
+
+        # the local check tags the output (in a worker thread, so other chunks' requests can proceed)
+        if checker is not None:
+            await asyncio.to_thread(session.apply, results, message_parser, token_parser)
+        else:
+            session.apply(results, message_parser, token_parser)
+
+    return session.get_results()
+
+async def process_texts(
+    row_chunks: Iterable[list[str]],
+    chain: Runnable,
+    message_parser: Callable[...,str],
+    token_parser: Callable[...,int],
+    constraints: str,
+    max_iterations: int,
+    max_retries: int,
+    on_result: Callable[[int, list[tuple]], None],
+    concurrency: int = 1,
+    checker: ConformanceChecker | None = None,
+    memo: IterationMemo | None = None) -> int:
+    """Process the text chunks (sentences or full texts) of a sequence of rows.
+    All the chunks of the rows in progress are paraphrased concurrently, with
+    at most 'concurrency' LLM requests in flight: a row with many chunks (or
+    iterations) does not hold back the following rows. Rows are consumed
+    lazily and delivered in input order (see row_pipeline.process_rows).
+
+    Arguments:
+        row_chunks (Iterable[list[str]]): the text chunks of each row, in text order
+        on_result (Callable[[int, list[tuple]], None]): called with the index and the
+            (paraphrase, iteration, messages, token_usage, warnings) of each chunk of a row
+        concurrency (int): maximum number of concurrent LLM requests (shared by all rows)
+        checker (ConformanceChecker | None): (optional) stops iterating when an output passes the local checks
+        memo (IterationMemo | None): (optional) skips the LLM call of the text states already seen
+
+    Returns:
+        int: the number of processed rows
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process_row(row, chunks):
+        # gather keeps the chunks (sentences) in text order
+        return await asyncio.gather(*[
+            process_chunk(row, chunk_index, chunk)
+            for chunk_index, chunk in enumerate(chunks)
+        ])
+
+    async def process_chunk(row, chunk_index, chunk):
+        with metrics_tags(row=row, chunk=chunk_index, step="paraphrase"):
+            return await process_text(
+                chunk, chain, message_parser, token_parser, constraints,
+                max_iterations, max_retries, semaphore, checker, memo
+            )
+
+    return await process_rows(row_chunks, process_row, on_result, get_window(concurrency))
+
+def process_texts_batch(
+    texts: list[str],
+    prompt_template: ChatPromptTemplate,
+    backend: BatchBackend,
+    message_parser: Callable[...,str],
+    token_parser: Callable[...,int],
+    constraints: str,
+    max_iterations: int,
+    max_retries: int,
+    rows: list[int] | None = None,
+    checker: ConformanceChecker | None = None,
+    memo: IterationMemo | None = None):
+    """Process a list of text chunks using the batch backend. Every
+    paraphrase iteration (or retry) of all the chunks is a batch round.
+    If given, 'rows' maps each chunk to its input row (metrics tags),
+    'checker' stops the iterations of outputs passing the local checks,
+    and 'memo' resolves the text states already seen without a request
+    (chunks sharing a text state in a round share its request).
+
+    Returns:
+        list[tuple]: (paraphrase, iteration, messages, token_usage, warnings) for each text chunk
+    """
+    sessions = [ParaphraseSession(text, max_iterations, max_retries, checker) for text in texts]
+
+    round_counter = 0
+    while True:
+        # memoised text states are resolved without a batch round
+        if memo is not None:
+            for session in sessions:
+                while not session.done and (results := memo.lookup(session.current)) is not None:
+                    session.apply(results, message_parser, token_parser)
+
+        active = [(index, session) for index, session in enumerate(sessions) if not session.done]
+        if len(active) == 0:
+            break
+
+        # with a memo, a single request is made for the chunks sharing a text state
+        requests = {}
+        for index, session in active:
+            requests.setdefault(session.current if memo is not None else index, index)
+
+        round_counter += 1
+        print(f"INFO\tParaphrase round {round_counter}: {len(active)} active texts ({len(requests)} requests)")
+
+        responses = backend.run(
+            {str(index): prompt_template.format_messages(**sessions[index].get_inputs(constraints)) for index in requests.values()},
+            description=f"paraphrase round {round_counter}",
+            tags={str(index): {"row": rows[index] if rows is not None else index, **sessions[index].get_tags()} for index in requests.values()}
+        )
+
+        assigned = [(session, index, requests[session.current if memo is not None else index]) for index, session in active]
+        for session, index, request in assigned:
+            results = responses[str(request)]
+            if memo is not None and request == index and message_parser(results) is not None:
+                memo.update(session.current, results)
+            session.apply(results, message_parser, token_parser)
+
+    return [session.get_results() for session in sessions]
+
+def get_output_columns(paraphrase_type: str, debug: bool) -> list[str]:
+    """Returns the columns added to the output table"""
+    if not debug:
+        return ["paraphrase"]
+
+    if paraphrase_type.startswith("bysentence"):
+        return ["paraphrase", "iterations", "total_iterations", "warnings", "tokens", "messages"]
+    return ["paraphrase", "iterations", "warnings", "tokens", "messages"]
+
+def get_row_outputs(chunk_results: list[tuple], by_sentence: bool) -> dict:
+    """Merges the results of the chunks of a row into its output columns
+
+    Arguments:
+        chunk_results (list[tuple]): (paraphrase, iteration, messages, token_usage, warnings) for each chunk of the row
+        by_sentence (bool): whether the row was paraphrased sentence by sentence
+
+    Returns:
+        dict: the row output values, keyed by column (see get_output_columns)
+    """
+    if not by_sentence:
+        current, iteration, message_session, token_usage, warnings = chunk_results[0]
+        return {
+            "paraphrase": current,
+            "iterations": iteration,
+            "warnings": warnings,
+            "tokens": token_usage,
+            "messages": message_session
+        }
+
+    session_text = []
+    session_messages = []
+    session_iterations = []
+    session_tokens = 0
+    session_warnings = []
+
+    for current, sent_iter, sent_messages, sent_tokens, warnings in chunk_results:
+        session_text.append(current)
+        session_iterations.append(sent_iter)
+        session_messages.append(sent_messages)
+        session_tokens += sent_tokens
+        session_warnings.extend(warnings)
+
+    return {
+        "paraphrase": " ".join(session_text),
+        "iterations": session_iterations,
+        "total_iterations": sum(session_iterations),
+        "warnings": session_warnings,
+        "tokens": session_tokens,
+        "messages": session_messages
+    }
 
 def main():
     # Parse and validate arguments
@@ -284,7 +565,7 @@ def main():
     with open(args.constraints, "r", encoding="utf-8") as f_in:
         constraints = f_in.read()
 
-    df = pd.read_csv(args.input, sep="\t", encoding="utf-8", header=0)
+    df = read_table(args.input)
     if args.label not in df:
         print(f"Error: no column named '{args.label}' exists in '{args.input}'!")
         exit(2)
@@ -293,9 +574,14 @@ def main():
     df.rename(columns={args.label: 'text'}, inplace=True)
 
     # Setup processing pipeline
+    metrics = setup_metrics(args, "paraphrase")
     nlp = load_spacy_model(args.sentencizer) if args.type.startswith("bysentence") else None
-    prompt_template = get_prompt_template(args.type)
-    llm = setup_llm(args.groq)
+    prompt_template = get_prompt_template(args.type, args.prompt_layout)
+    llm, limiter = setup_llm(args.groq, args.rpm, args.tpm)
+    cache = setup_llm_cache(args)
+    backend = setup_batch_backend(args.groq, os.path.splitext(output_file)[0], args.batch_poll) if args.batch else None
+    checker = setup_conformance_checker(args)
+    memo = setup_iteration_memo(args, constraints, prompt_template, f"groq:{os.getenv('GROQ_MODEL')}" if args.groq else f"openai:{os.getenv('OPENAI_MODEL')}")
     
     # Setup chain and parsers
     message_parser = regex_message_parser(regex=TEXT_TAG_REGEX_PATTERN)
@@ -303,75 +589,60 @@ def main():
     chain = prompt_template | llm
 
     max_iterations = 10
-    paraphrases = []
-    iterations = []
-    messages = []
-    tokens = []
-    all_warnings = []  # List to collect warnings
-
-    counter = 0
-    for input_text in df['text']:
+    by_sentence = args.type.startswith("bysentence")
+    columns = get_output_columns(args.type, args.debug)
 
-        counter += 1
-        print(f"INFO\tParaphrasing sample [{counter}/{len(df['text'])}]")
-        
-        # Check if it's a sentence-by-sentence approach
-        if args.type.startswith("bysentence"):
-            # Process sentence by sentence
-            documents = nlp(input_text)
-            sentences = [strip_string(sent.text) for sent in documents.sents]
-            
-            session_text = []
-            session_messages = []
-            session_iterations = []
-            session_tokens = 0
-            session_warnings = []
-
-            for sentence in sentences:
-                current, sent_iter, sent_messages, sent_tokens, warnings = process_text(
-                    sentence, chain, message_parser, token_parser, constraints,
-                    max_iterations, args.retries, args.groq
-                )
-                session_text.append(current)
-                session_iterations.append(sent_iter)
-                session_messages.append(sent_messages)
-                session_tokens += sent_tokens
-                session_warnings.extend(warnings)
-
-            paraphrases.append(" ".join(session_text))
-            iterations.append(session_iterations)
-            messages.append(session_messages)
-            tokens.append(session_tokens)
-            all_warnings.append(session_warnings)
-        else:
-            # Process entire text at once (fulltext or nocot)
-            current, iteration, message_session, token_usage, warnings = process_text(
-                input_text, chain, message_parser, token_parser, constraints,
-                max_iterations, args.retries, args.groq
-            )
-            paraphrases.append(current)
-            iterations.append(iteration)
-            messages.append(message_session)
-            tokens.append(token_usage)
-            all_warnings.append(warnings)
-
-    # Add results to dataframe
-    df.insert(len(df.columns), "paraphrase", paraphrases)
-
-    if args.debug:
-        if args.type.startswith("bysentence"):
-            df.insert(len(df.columns), "iterations", list(map(lambda x: json.dumps(x, ensure_ascii=False), iterations)))
-            df.insert(len(df.columns), "total_iterations", list(map(lambda x: sum(x), iterations)))
-            df.insert(len(df.columns), "warnings", list(map(lambda x: json.dumps(x, ensure_ascii=False), all_warnings)))
+    # Check if it's a sentence-by-sentence approach (sentences are split lazily, as rows are processed)
+    if by_sentence:
+        # Process sentence by sentence
+        row_chunks = ([strip_string(sent.text) for sent in nlp(input_text).sents] for input_text in df['text'])
+    else:
+        # Process entire text at once (fulltext or nocot)
+        row_chunks = ([input_text] for input_text in df['text'])
+
+    # Rows are written (in input order) as soon as they are completed
+    writer = TableWriter(output_file)
+
+    def write_row(index, chunk_results):
+        outputs = get_row_outputs(chunk_results, by_sentence)
+        row = df.iloc[[index]].reset_index(drop=True)
+        for column in columns:
+            row[column] = pd.Series([outputs[column]])
+        writer.write(row)
+        if backend is None:
+            print(f"INFO\tParaphrased sample [{index + 1}/{len(df)}]")
+
+    with writer:
+        # in batch mode all the chunks are processed together, one batch round per iteration
+        if backend is not None:
+            row_chunks = list(row_chunks)
+            chunks = [chunk for row in row_chunks for chunk in row]
+            chunk_rows = [index for index, row in enumerate(row_chunks) for _ in row]
+            print(f"INFO\tParaphrasing {len(df)} samples ({len(chunks)} text chunks) in batch mode")
+            with metrics_tags(step="paraphrase"):
+                batch_results = iter(process_texts_batch(
+                    chunks, prompt_template, backend, message_parser, token_parser, constraints,
+                    max_iterations, args.retries, chunk_rows, checker, memo
+                ))
+            for index, row in enumerate(row_chunks):
+                write_row(index, [next(batch_results) for _ in row])
         else:
-            df.insert(len(df.columns), "iterations", iterations)
-            df.insert(len(df.columns), "warnings", all_warnings)
-        
-        df.insert(len(df.columns), "tokens", tokens)
-        df.insert(len(df.columns), "messages", list(map(lambda x: json.dumps(x, ensure_ascii=False), messages)))
-
-    # Write results
-    df.to_csv(output_file, sep="\t", index=False, encoding="utf-8")
+            print(f"INFO\tParaphrasing {len(df)} samples ({args.concurrency} concurrent requests)")
+            asyncio.run(process_texts(
+                row_chunks, chain, message_parser, token_parser, constraints,
+                max_iterations, args.retries, write_row, args.concurrency, checker, memo
+            ))
+
+        if len(df) == 0:
+            writer.write(df.assign(**{column: [] for column in columns}))
+
+    print(f"INFO\tWritten {writer.rows} rows to '{output_file}'")
+    print_cache_stats(cache)
+    print_rate_limit_stats(limiter)
+    print_batch_stats(backend)
+    print_conformance_stats(checker)
+    print_memo_stats(memo)
+    print_metrics_stats(metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,6 @@
-import copy
-from pos_tagger import POSTagger, Language, TAGMethod
-from utils import is_regular_it_verb
+from bisect import bisect_left
+from utils import get_irregular_verb_lexicon, TextOffsets
+from rules import RuleSet, LazyTable
 
 # --- italian
 
@@ -41,148 +41,279 @@ italian_coordinate_clause_error_message = """[SYNTAX]: The sentence '{sentence_t
 italian_subordinate_clause_error_message = """[SYNTAX]: The sentence '{sentence_text}' (with 'type' = '{type}') contains a subordinate clause '{subordinate_clause_text}' with 'function' = '{subordinate_clause_function}', which falls outside of the specifications of the A1 inventory."""
 italian_subordinate_clause_conditional_error_message = """[SYNTAX]: The sentence '{sentence_text}' (with 'type' = '{type}') contains a subordinate clause '{subordinate_clause_text}' with 'function' = '{subordinate_clause_function}', which is allowed according to the A1 inventory, however it does not seem to be introduced by 'se', which is a requirement."""
 
-def parse_italian_analysis(input: dict, check_syntax: bool = False) -> dict:
-    results = copy.deepcopy(italian_eval_template)
+def locate_fragment(offsets: TextOffsets, item: dict, key: str, start: int = 0, end: int | None = None) -> dict:
+    """Returns a copy of a report item with the character offsets
+    ('start', 'end') of its 'key' text (searched in [start:end] first)"""
+    item = dict(item)
+    span = offsets.find(item.get(key), start, end) or offsets.find(item.get(key))
+    item["start"], item["end"] = span if span is not None else (None, None)
+    return item
+
+def align_italian_analysis(input: dict, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
+    """Aligns an analysis report to the analyzed text: verbs and clauses
+    get character offsets ('start', 'end'; None if not found in the text)
+    and the report gets an 'alignment' of the POS-tagged tokens, used by
+    the syntax checks. The input report is not modified.
+
+    Arguments:
+        input (dict): the analysis report
+        text (str | None): the analyzed text (default: the syntactical analysis 'text')
+        pos_tags (list[dict] | None): the POS tags of the analyzed text, as returned by POSTagger.tag_text
+
+    Returns:
+        dict: the aligned copy of the report (the report itself if it has no syntactical analysis)
+    """
+    syntax = input.get("syntactical_analysis") if isinstance(input, dict) else None
+    if not isinstance(syntax, dict) or not isinstance(syntax.get("sentences"), list):
+        return input
+
+    if not isinstance(text, str):
+        text = syntax.get("text") if isinstance(syntax.get("text"), str) else ""
+    offsets = TextOffsets(text)
+    report = dict(input)
+
+    # --- verbs (in text order)
+    verbs = []
+    cursor = 0
+    for verb in input.get("verbs", []):
+        if isinstance(verb, dict):
+            verb = locate_fragment(offsets, verb, "text", cursor)
+            cursor = verb["end"] if verb["end"] is not None else cursor
+        verbs.append(verb)
+
+    if "verbs" in input:
+        report["verbs"] = verbs
+
+    imperatives = [
+        verb for verb in verbs
+        if isinstance(verb, dict) and isinstance(verb.get("mood"), str) and verb["mood"].lower() == "imperativo"
+    ]
+    imperative_spans = sorted((verb["start"], verb["end"]) for verb in imperatives if verb["start"] is not None)
+
+    # --- clauses (within their sentence)
+    sentences = []
+    cursor = 0
+    for sentence in syntax["sentences"]:
+        if isinstance(sentence, dict) and isinstance(sentence.get("clauses"), dict):
+            sentence = locate_fragment(offsets, sentence, "content", cursor)
+            cursor = sentence["end"] if sentence["end"] is not None else cursor
+            start, end = (sentence["start"], sentence["end"]) if sentence["start"] is not None else (0, len(text))
+
+            clauses = dict(sentence["clauses"])
+            if isinstance(clauses.get("main_clause"), dict):
+                clauses["main_clause"] = locate_fragment(offsets, clauses["main_clause"], "content", start, end)
+            for key in ["coordinate_clauses", "subordinate_clauses"]:
+                if isinstance(clauses.get(key), list):
+                    clauses[key] = [locate_fragment(offsets, x, "content", start, end) if isinstance(x, dict) else x for x in clauses[key]]
+            sentence["clauses"] = clauses
+
+        sentences.append(sentence)
+
+    report["syntactical_analysis"] = {**syntax, "sentences": sentences}
+
+    # --- tokens (flagged if tagged as VERB within an imperative verb)
+    tokens = None
+    if isinstance(pos_tags, list):
+        tokens = []
+        index = 0
+        for token, span in zip(pos_tags, offsets.align_tokens(pos_tags)):
+            if span is None:
+                continue
+            while index < len(imperative_spans) and imperative_spans[index][1] <= span[0]:
+                index += 1
+            imperative = index < len(imperative_spans) and imperative_spans[index][0] <= span[0] and span[1] <= imperative_spans[index][1]
+            tokens.append((span[0], span[1], token["pos"] == "VERB" and imperative))
+
+    report["alignment"] = {
+        "tokens": tokens,
+        "starts": [token[0] for token in tokens] if tokens is not None else None,
+        "imperative_spans": imperative_spans,
+        "imperative_texts": [verb["text"].lower() for verb in imperatives if isinstance(verb.get("text"), str)]
+    }
+
+    return report
+
+def italian_volitive_without_imperative(clause: dict, input: dict) -> bool:
+    """Checks if a volitive main clause lacks a verb in imperative mood,
+    i.e. a token of the clause tagged as VERB within an imperative verb
+    of the report (without POS tags: an imperative verb of the clause)"""
+    alignment = input["alignment"]
+    start, end = clause["main_clause_start"], clause["main_clause_end"]
+
+    # the clause is not found in the text
+    if start is None:
+        content = clause["main_clause_text"].lower()
+        return not any(verb in content for verb in alignment["imperative_texts"])
+
+    if alignment["tokens"] is None:
+        return not any(start <= verb_start and verb_end <= end for verb_start, verb_end in alignment["imperative_spans"])
+
+    tokens = alignment["tokens"]
+    index = bisect_left(alignment["starts"], start)
+    while index < len(tokens) and tokens[index][0] < end:
+        if tokens[index][2] and tokens[index][1] <= end:
+            return False
+        index += 1
+
+    return True
+
+# --- rules
+italian_rules = RuleSet({
+    "template": italian_eval_template,
+    "prepare": align_italian_analysis,
+    "sections": [
+        # --- grammar
+        {
+            "items": "pronouns",
+            "counter": "errors_pronouns",
+            "fields": {"text": "text", "kind": ("lower", "kind")},
+            "required": ["text", "kind"],
+            "rules": [
+                # 1 - pronoun outside of allowed categories
+                {"when": ("not_in", "kind", italian_allowed_pronouns_categories), "message": italian_pronouns_error_message}
+            ]
+        },
+        {
+            "items": "numbers",
+            "counter": "errors_numbers",
+            "fields": {"text": "text", "text_lower": ("lower", "text"), "kind": ("lower", "kind")},
+            "required": ["text", "kind"],
+            "rules": [
+                # 1 - Number is ordinal and outside of allowed range
+                {
+                    "when": ("all", [("eq", "kind", "ordinale"), ("not_in", "text_lower", italian_allowed_ordinal_numbers)]),
+                    "message": italian_numbers_error_message
+                }
+            ]
+        },
+        {
+            "items": "verbs",
+            "counter": "errors_verbs",
+            "fields": {
+                "text": "text",
+                "lemma": ("lower", "lemma"),
+                "voice": ("lower", "voice"),
+                "mood": ("lower", "mood"),
+                "tense": ("lower", "tense"),
+                "person": ("lower", "person"),
+                "number": ("lower", "number")
+            },
+            "required": [
+                "text", "lemma", "voice", "mood", "tense",
+                {"when": ("in", "mood", ["imperativo", "condizionale"]), "fields": ["person", "number"]}
+            ],
+            "rules": [
+                # 1 - Main verb is irregular
+                {
+                    "when": ("in", "lemma", LazyTable(lambda: get_irregular_verb_lexicon("italian").disallowed_irregulars)),
+                    "message": italian_verbs_regular_error_message
+                },
+                # 2 - Main verb is not in active voice
+                {"when": ("not_in", "voice", italian_allowed_voices), "message": italian_verbs_voice_error_message},
+                # 3 - Verb is conjugated in a mood/tense combination out of inventory
+                ## Note: if in imperative mood, also have to check person
+                {
+                    "when": ("all", [
+                        ("eq", "mood", "imperativo"),
+                        ("ne", "person", "second"),
+                        ("not_in", "tense", italian_allowed_mood_tense_combinations["imperativo"])
+                    ]),
+                    "message": italian_verbs_mood_p_n_error_message
+                },
+                {
+                    "when": ("all", [
+                        ("eq", "mood", "condizionale"),
+                        ("any", [
+                            ("ne", "lemma", "volere"),
+                            ("not_in", "tense", italian_allowed_mood_tense_combinations["condizionale"]),
+                            ("ne", "person", "first"),
+                            ("ne", "number", "singular")
+                        ])
+                    ]),
+                    "message": italian_verbs_mood_tense_p_n_error_message
+                },
+                {
+                    "when": ("all", [
+                        ("not_in", "mood", ["imperativo", "condizionale"]),
+                        ("not_in", ("mood", "tense"), [
+                            (mood, tense)
+                            for mood, tenses in italian_allowed_mood_tense_combinations.items()
+                            for tense in tenses
+                        ])
+                    ]),
+                    "message": italian_verbs_mood_tense_error_message
+                }
+            ]
+        },
+        # --- syntax
+        {
+            "syntax": True,
+            "counters": {"errors_syntax": 0},
+            "items": "syntactical_analysis.sentences",
+            "counter": "errors_syntax",
+            "fields": {"sentence_text": "content", "type": ("lower", "type")},
+            "required": ["sentence_text", "type"],
+            "children": [
+                {
+                    "item": "clauses.main_clause",
+                    "fields": {
+                        "main_clause_text": "content",
+                        "main_clause_function": ("lower", "function"),
+                        "main_clause_start": "start",
+                        "main_clause_end": "end"
+                    },
+                    "required": ["main_clause_text", "main_clause_function"],
+                    "rules": [
+                        # 1 - Main clause outside of allowed clause functions
+                        {"when": ("not_in", "main_clause_function", italian_allowed_main_clauses), "message": italian_main_clause_error_message},
+                        # 1A - Check verb within volitive clause
+                        {
+                            "when": ("all", [("eq", "main_clause_function", "volitiva"), ("check", italian_volitive_without_imperative)]),
+                            "message": italian_main_clause_volitive_error_message
+                        }
+                    ]
+                },
+                {
+                    "items": "clauses.coordinate_clauses",
+                    "fields": {"coordinate_clause_text": "content", "coordinate_clause_type": ("lower", "type")},
+                    "required": ["coordinate_clause_text", "coordinate_clause_type"],
+                    "rules": [
+                        # 2 - Coordinate clauses outside of allowed types
+                        {"when": ("not_in", "coordinate_clause_type", italian_allowed_coordinate_clauses), "message": italian_coordinate_clause_error_message}
+                    ]
+                },
+                {
+                    "items": "clauses.subordinate_clauses",
+                    "fields": {
+                        "subordinate_clause_text": "content",
+                        "subordinate_clause_content": ("lower", "content"),
+                        "subordinate_clause_function": ("lower", "function")
+                    },
+                    "required": ["subordinate_clause_text", "subordinate_clause_function"],
+                    "rules": [
+                        # 3 - Subordinate clauses outside of allowed functions
+                        {"when": ("not_in", "subordinate_clause_function", italian_allowed_subordinate_clauses), "message": italian_subordinate_clause_error_message},
+                        # 3A - Conditinal subordinate clauses additional check
+                        {
+                            "when": ("all", [
+                                ("eq", "subordinate_clause_function", "condizionale"),
+                                ("not", ("startswith", "subordinate_clause_content", "se"))
+                            ]),
+                            "message": italian_subordinate_clause_conditional_error_message
+                        }
+                    ]
+                }
+            ]
+        }
+    ]
+})
+
+def parse_italian_analysis(input: dict, check_syntax: bool = False, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
     """Given a text analysis report, performs a
     rule-based evaluation to check if the italian A1
-    invetory constraints are satisfied."""
-
-    # --- grammar
-    # check pronouns
-    for pronoun in input["pronouns"]:
-        text = pronoun["text"]
-        kind = pronoun["kind"].lower()
-
-        # 1 - pronoun outside of allowed categories
-        if (kind not in italian_allowed_pronouns_categories):
-            results["errors_pronouns"] = results["errors_pronouns"] + 1
-            results["errors_log"].append(italian_pronouns_error_message.format(text = text, kind = kind))
-    
-    # check numbers
-    for number in input["numbers"]:
-        text = number["text"]
-        kind = number["kind"].lower()
-
-        # 1 - Number is ordinal and outside of allowed range
-        if (kind == "ordinale"):
-            if (text.lower() not in italian_allowed_ordinal_numbers):
-                results["errors_numbers"] = results["errors_numbers"] + 1
-                results["errors_log"].append(italian_numbers_error_message.format(text = text))
-    
-    # check verbs
-    for verb in input["verbs"]:
-        text = verb["text"]
-        lemma = verb["lemma"].lower()
-        voice = verb["voice"].lower()
-        mood = verb["mood"].lower()
-        tense = verb["tense"].lower()
-
-        # 1 - Main verb is irregular
-        if (not is_regular_it_verb(verb=lemma, check_allowed=True)):
-            results["errors_verbs"] = results["errors_verbs"] + 1
-            results["errors_log"].append(italian_verbs_regular_error_message.format(text = text, lemma=lemma))
-        
-        # 2 - Main verb is not in active voice
-        if (voice not in italian_allowed_voices):
-            results["errors_verbs"] = results["errors_verbs"] + 1
-            results["errors_log"].append(italian_verbs_voice_error_message.format(text=text))
-
-        # 3 - Verb is conjugated in a mood/tense combination out of inventory
-        ## Note: if in imperative mood, also have to check person
-        match mood:
-            case "imperativo":
-                person = verb["person"].lower()
-                number = verb["number"].lower()
-
-                if ((person != "second") and (tense not in italian_allowed_mood_tense_combinations["imperativo"])):
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(italian_verbs_mood_p_n_error_message.format(text = text, mood = mood, person = person, number = number))
-
-            case "condizionale":
-                person = verb["person"].lower()
-                number = verb["number"].lower()
-
-                if ((lemma != "volere") or
-                    (tense not in italian_allowed_mood_tense_combinations["condizionale"]) or
-                    (person != "first") or
-                    (number != "singular") ):
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(italian_verbs_mood_tense_p_n_error_message.format(text = text, mood = mood, tense = tense, person = person, number = number))
-
-            case _:
-                if (mood not in set(italian_allowed_mood_tense_combinations.keys())):
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(italian_verbs_mood_tense_error_message.format(text = text, mood = mood, tense = tense))
-                else:
-                    if (tense not in set(italian_allowed_mood_tense_combinations[mood])):
-                        results["errors_verbs"] = results["errors_verbs"] + 1
-                        results["errors_log"].append(italian_verbs_mood_tense_error_message.format(text = text, mood = mood, tense = tense))
-
-    # --- syntax
-    if check_syntax:
-        # add syntax key to report
-        results["errors_syntax"] = 0
-
-        for sentence in input["syntactical_analysis"]["sentences"]:
-            sentence_text = sentence["content"]
-            sentence_type = sentence["type"].lower()
-            sentence_clauses = sentence["clauses"]
-
-            # 1 - Main clause outside of allowed clause functions
-            main_clause = sentence_clauses["main_clause"]
-            main_clause_text = main_clause["content"]
-            main_clause_function = main_clause["function"].lower()
-
-            if (main_clause_function not in italian_allowed_main_clauses):
-                results["errors_syntax"] = results["errors_syntax"] + 1
-                results["errors_log"].append(italian_main_clause_error_message.format(type=sentence_type, sentence_text=sentence_text, main_clause_text=main_clause_text, main_clause_function=main_clause_function))
-
-            # 1A - Check verb within volitive clause
-            if (main_clause_function == "volitiva"):
-                tokens = POSTagger(language=Language.IT, method=TAGMethod.STANZA).tag_text(main_clause_text)
-                has_imperative = False
-                for token in tokens:
-                    if token["pos"] == "VERB":
-                        for verb in input["verbs"]:
-                            if (verb["text"].lower().includes(token["text"].lower())):
-                                if(verb["mood"].lower() == "imperativo"):
-                                    has_imperative = True
-                                    break
-
-                    if has_imperative:
-                        break
-                
-                if(not has_imperative):
-                    results["errors_syntax"] = results["errors_syntax"] + 1
-                    results["errors_log"].append(italian_main_clause_volitive_error_message.format(type=sentence_type, sentence_text=sentence_text, main_clause_text=main_clause_text, main_clause_function=main_clause_function))
-
-            # 2 - Coordinate clauses outside of allowed types
-            for coordinate_clause in sentence_clauses["coordinate_clauses"]:
-                coordinate_clause_text = coordinate_clause["content"]
-                coordinate_clause_type = coordinate_clause["type"].lower()
-
-                if (coordinate_clause_type not in italian_allowed_coordinate_clauses):
-                    results["errors_syntax"] = results["errors_syntax"] + 1
-                    results["errors_log"].append(italian_coordinate_clause_error_message.format(type=sentence_type, sentence_text=sentence_text, coordinate_clause_text=coordinate_clause_text, coordinate_clause_type=coordinate_clause_type))  
-
-            # 3 - Subordinate clauses outside of allowed functions
-            for subordinate_clause in sentence_clauses["subordinate_clauses"]:
-                subordinate_clause_text = subordinate_clause["content"]
-                subordinate_clause_function = subordinate_clause["function"].lower()
-
-                if (subordinate_clause_function not in set(italian_allowed_subordinate_clauses)):
-                    results["errors_syntax"] = results["errors_syntax"] + 1
-                    results["errors_log"].append(italian_subordinate_clause_error_message.format(type=sentence_type, sentence_text=sentence_text, subordinate_clause_text=subordinate_clause_text, subordinate_clause_function=subordinate_clause_function))
-
-                # 3A - Conditinal subordinate clauses additional check
-                if (subordinate_clause_function == "condizionale"):
-                    content = subordinate_clause_text.lower()
-
-                    if(not content.startswith("se")):
-                        results["errors_syntax"] = results["errors_syntax"] + 1
-                        results["errors_log"].append(italian_subordinate_clause_conditional_error_message.format(type=sentence_type, sentence_text=sentence_text, subordinate_clause_text=subordinate_clause_text, subordinate_clause_function=subordinate_clause_function))
-
-    return results
+    invetory constraints are satisfied. The analyzed text
+    and its POS tags are used by the syntax checks."""
+    return italian_rules.evaluate(input, check_syntax, text, pos_tags)
 
 # --- english
 
@@ -228,140 +359,409 @@ english_finite_modal_error = "[VERBS]: The verb '{text}', which is conjugated in
 english_finite_voice_error = "[VERBS]: The verb '{text}', which is conjugated in 'mood'='{mood}', 'tense'='{tense}' and 'aspect'='{aspect}', is in 'voice'='{voice}'. This specific mood x tense x aspect combination cannot be used in passive voice according to the A1 inventory."
 english_finite_conj_error = "[VERBS]: The verb '{text}' is conjugated in 'mood'='{mood}', 'tense'='{tense}' and 'aspect'='{aspect}'. This combination is not allowed for finite verb forms according to the A1 inventory."
 
-def parse_english_analysis(input: dict, check_syntax: bool = False) -> dict:
-    results = copy.deepcopy(english_eval_template)
+
+# --- rules
+english_rules = RuleSet({
+    "template": english_eval_template,
+    "sections": [
+        # --- grammar
+        {
+            "items": "nouns",
+            "counter": "errors_nouns",
+            "fields": {"text": "text", "number": ("lower", "number"), "possessive": "possessive", "regular": "regular"},
+            "required": ["text", "number", "possessive", "regular"],
+            "rules": [
+                # 1 - check if noun is plural + irregular
+                {"when": ("all", [("eq", "number", "plural"), ("false", "regular")]), "message": english_noun_irregular_error_message}
+            ]
+        },
+        {
+            "items": "pronouns",
+            "counter": "errors_pronouns",
+            "fields": {"text": "text", "text_lower": ("lower", "text"), "kind": ("lower", "kind")},
+            "required": ["text", "kind"],
+            "rules": [
+                # 1 - check if pronoun category is allowed
+                {"when": ("not_in", "kind", english_allowed_pronouns), "message": english_pronoun_category_error},
+                # 2 - check if interrogative pronoun is within allowed list
+                {
+                    "when": ("all", [("eq", "kind", "interrogative"), ("not_in", "text_lower", english_allowed_interrogative_pronouns)]),
+                    "message": english_pronoun_interrogative_error
+                }
+            ]
+        },
+        {
+            "items": "adjectives",
+            "counter": "errors_adjectives",
+            "fields": {"text": "text", "function": ("lower", "function"), "degree": ("lower", "degree"), "regular": "regular"},
+            "required": ["text", "function", "degree", "regular"],
+            "rules": [
+                # 1 - check if function is within allowed categories
+                {"when": ("not_in", "function", english_allowed_adjectives), "message": english_adjective_category_error},
+                # 2 - check if descriptive adjective is regular
+                {
+                    "when": ("all", [("eq", "function", "descriptive"), ("ne", "degree", "positive"), ("false", "regular")]),
+                    "message": english_adjective_irregular_error
+                }
+            ]
+        },
+        {
+            "items": "verbs",
+            "counter": "errors_verbs",
+            "fields": {
+                "finite": "finite",
+                "text": "text",
+                "lemma": ("lower", "lemma"),
+                "voice": ("lower", "voice"),
+                "modal": "modal",
+                "verb_form": "verb_form",
+                "auxiliary": "auxiliary",
+                "mood": ("lower", "mood"),
+                "tense": ("lower", "tense"),
+                "aspect": ("lower", "aspect"),
+                "modal_lemma": ("coalesce", "auxiliary", "lemma")
+            },
+            "required": [
+                "finite", "text", "lemma", "voice", "modal",
+                {"when": ("false", "finite"), "fields": ["verb_form"]},
+                {"when": ("true", "finite"), "fields": ["auxiliary", "mood", "tense", "aspect"]}
+            ],
+            "rules": [
+                # A - non-finite
+                # 1A. check modal
+                {
+                    "when": ("all", [("false", "finite"), ("true", "modal"), ("not_in", "lemma", english_allowed_modals)]),
+                    "message": english_non_finite_modal_error
+                },
+                # 2A. check voice
+                {"when": ("all", [("false", "finite"), ("eq", "voice", "passive")]), "message": english_non_finite_voice_error},
+
+                # B - finite
+                # 'be going to' construct (no further checks)
+                {
+                    "when": ("all", [
+                        ("true", "finite"), ("true", "modal"), ("eq", "auxiliary", "be going to"),
+                        ("eq", "mood", "indicative"), ("eq", "tense", "present"), ("eq", "aspect", "continuous")
+                    ]),
+                    "message": english_finite_going_to_future_error,
+                    "stop": True
+                },
+                {
+                    "when": ("all", [
+                        ("true", "finite"), ("true", "modal"), ("eq", "auxiliary", "be going to"),
+                        ("eq", "mood", "indicative"), ("eq", "tense", "past"), ("eq", "aspect", "continuous")
+                    ]),
+                    "message": english_finite_going_to_past_error,
+                    "stop": True
+                },
+                # 1B. conjugation
+                {
+                    "when": ("all", [
+                        ("true", "finite"),
+                        ("ne", "mood", "imperative"),
+                        ("not_in", ("mood", "tense", "aspect"), [
+                            (mood, tense, aspect)
+                            for mood, combinations in english_allowed_finite_conj.items()
+                            for tense, aspect in combinations
+                        ])
+                    ]),
+                    "message": english_finite_conj_error
+                },
+                # 2B. voice
+                {
+                    "when": ("all", [
+                        ("true", "finite"),
+                        ("eq", "voice", "passive"),
+                        ("not_in", ("mood", "tense", "aspect"), [
+                            (mood, tense, aspect)
+                            for mood, combinations in english_allowed_passive_voice_conj.items()
+                            for tense, aspect in combinations
+                        ])
+                    ]),
+                    "message": english_finite_voice_error
+                },
+                # 3B. modal
+                # sub - semi-modals/semi-aux
+                {
+                    "when": ("all", [("true", "finite"), ("true", "modal"), ("in", "modal_lemma", english_semi_modal_constructs)]),
+                    "message": english_finite_semi_modal_error,
+                    "args": {"auxiliary": "modal_lemma"}
+                },
+                {
+                    "when": ("all", [
+                        ("true", "finite"), ("true", "modal"),
+                        ("not_in", "modal_lemma", english_semi_modal_constructs),
+                        ("not_in", "modal_lemma", english_allowed_modals)
+                    ]),
+                    "message": english_finite_modal_error,
+                    "args": {"auxiliary": "modal_lemma"}
+                }
+            ]
+        }
+        # --- syntax (no checks yet)
+    ]
+})
+
+def parse_english_analysis(input: dict, check_syntax: bool = False, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
     """Given a text analysis report, performs a
     rule-based evaluation to check if the english A1
     invetory constraints are satisfied."""
+    return english_rules.evaluate(input, check_syntax, text, pos_tags)
 
-    # --- grammar
-    # check nouns
-    for noun in input["nouns"]:
-        text = noun["text"]
-        number = noun["number"].lower()
-        possessive = noun["possessive"]
-        regular = noun["regular"]
-
-        # 1 - check if noun is plural + irregular
-        if (number == "plural" and (not regular)):
-            results["errors_nouns"] = results["errors_nouns"] + 1
-            results["errors_log"].append(english_noun_irregular_error_message.format(text = text))
-
-    # check pronouns
-    for pronoun in input["pronouns"]:
-        text = pronoun["text"]
-        kind = pronoun["kind"].lower()
-
-        # 1 - check if pronoun category is allowed
-        if (kind not in english_allowed_pronouns):
-            results["errors_pronouns"] = results["errors_pronouns"] + 1
-            results["errors_log"].append(english_pronoun_category_error.format(text = text, kind = kind))
-
-        # 2 - check if interrogative pronoun is within allowed list
-        if (kind == "interrogative" and (text.lower() not in english_allowed_interrogative_pronouns)):
-            results["errors_pronouns"] = results["errors_pronouns"] + 1
-            results["errors_log"].append(english_pronoun_interrogative_error.format(text = text))
-    
-    # check adjectives
-    for adjective in input["adjectives"]:
-        text = adjective["text"]
-        function = adjective["function"].lower()
-        degree = adjective["degree"].lower()
-        regular = adjective["regular"]
-
-        # 1 - check if function is within allowed categories
-        if (function not in english_allowed_adjectives):
-            results["errors_adjectives"] = results["errors_adjectives"] + 1
-            results["errors_log"].append(english_adjective_category_error.format(text = text))
-        
-        # 2 - check if descriptive adjective is regular
-        if ((function == "descriptive") and (degree != "positive") and (not regular)):
-            results["errors_adjectives"] = results["errors_adjectives"] + 1
-            results["errors_log"].append(english_adjective_irregular_error.format(text = text, degree = degree))
-
-
-    # check verbs
-    for verb in input["verbs"]:
-
-        # common propeties
-        finite = verb["finite"]
-        text = verb["text"]
-        lemma = verb["lemma"].lower()
-        voice = verb["voice"].lower()
-        modal = verb["modal"]
-
-        # A - non-finite
-        if not finite:
-            verb_form = verb["verb_form"]
-
-            # 1A. check modal
-            if (modal and (lemma not in english_allowed_modals)):
-                results["errors_verbs"] = results["errors_verbs"] + 1
-                results["errors_log"].append(english_non_finite_modal_error.format(text=text, verb_form=verb_form, lemma=lemma))
-
-            # 2A. check voice
-            if voice == "passive":
-                results["errors_verbs"] = results["errors_verbs"] + 1
-                results["errors_log"].append(english_non_finite_voice_error.format(text=text, verb_form=verb_form, voice=voice))
-
-        # B - finite
-        if finite:
-            auxiliary = verb["auxiliary"]
-            mood = verb["mood"].lower()
-            tense = verb["tense"].lower()
-            aspect = verb["aspect"].lower()
-
-            # OUT OF MAIN LOOP - 'be going to' construct
-            if (modal and auxiliary == "be going to"):
-                if (mood == "indicative" and tense == "present" and aspect == "continuous"):
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(english_finite_going_to_future_error.format(text=text, mood=mood, tense=tense, aspect=aspect, auxiliary=auxiliary))
-                    continue
-
-                if (mood == "indicative" and tense == "past" and aspect == "continuous"):
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(english_finite_going_to_past_error.format(text=text, mood=mood, tense=tense, aspect=aspect, auxiliary=auxiliary))
-                    continue
-
-
-            # 1B. conjugation
-            if (mood in english_allowed_finite_conj.keys()):
-                if(not mood == "imperative"):
-                    if(not ((tense, aspect) in set(english_allowed_finite_conj[mood]))):
-                        results["errors_verbs"] = results["errors_verbs"] + 1
-                        results["errors_log"].append(english_finite_conj_error.format(text=text, mood=mood, tense=tense, aspect=aspect))
-            else:
-                results["errors_verbs"] = results["errors_verbs"] + 1
-                results["errors_log"].append(english_finite_conj_error.format(text=text, mood=mood, tense=tense, aspect=aspect))
-
-            # 2B. voice
-            if (voice == "passive"):
-                if (mood in english_allowed_passive_voice_conj.keys()):
-                    if (not((tense, aspect) in set(english_allowed_passive_voice_conj[mood]))):
-                        results["errors_verbs"] = results["errors_verbs"] + 1
-                        results["errors_log"].append(english_finite_voice_error.format(text=text, mood=mood, tense=tense, aspect=aspect, voice=voice))
-                
-                else:
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(english_finite_voice_error.format(text=text, mood=mood, tense=tense, aspect=aspect, voice=voice))
-            
-            # 3B. modal
-            if modal:
-                modal_lemma = auxiliary
-                if modal_lemma is None:
-                    modal_lemma = lemma
+# --- russian
 
-                # sub - semi-modals/semi-aux
-                if (modal_lemma in english_semi_modal_constructs):
-                    results["errors_verbs"] = results["errors_verbs"] + 1
-                    results["errors_log"].append(english_finite_semi_modal_error.format(text=text, mood=mood, tense=tense, aspect=aspect, auxiliary=modal_lemma))
-                else:
-                    if (modal_lemma not in english_allowed_modals):
-                        results["errors_verbs"] = results["errors_verbs"] + 1
-                        results["errors_log"].append(english_finite_modal_error.format(text=text, mood=mood, tense=tense, aspect=aspect, auxiliary=modal_lemma))
-
-    # --- syntax
-    if (check_syntax):
-        pass
-
-    return results
\ No newline at end of file
+# --- output template
+russian_eval_template = {
+    "errors_nouns": 0,
+    "errors_pronouns": 0,
+    "errors_adjectives": 0,
+    "errors_verbs": 0,
+    "errors_adverbs": 0,
+    "errors_numerals": 0,
+    "errors_log": []
+}
+
+# --- control references
+# allowed (case, general meaning) pairs, with the allowed specific meanings. The nouns
+# task reports a specific meaning only for the pairs listed in its schema (nominative,
+# genitive, and prepositional with verbal government): the other pairs are checked on
+# the general meaning alone. Inventory meanings (inventories/constraints_russian.md) ->
+#   nominative: лицо активного действия, наличие предмета, факты и события -> subjective;
+#               предмет обладания -> objective; характеристика лица, название лица
+#               (предмета) -> attributive; идентификация лица -> necessary
+#               informational completion; обращение -> vocative expression
+#   genitive:   отсутствие предмета (лица) -> subjective; определение предмета (лица),
+#               обозначение количества, исходный пункт движения, лицо, которому
+#               принадлежит что-либо (у: the schema reports it as the place of the
+#               object) -> attributive; обозначение количества, месяц и дата, verbal
+#               government -> necessary informational completion
+#   dative:     лицо, о возрасте которого идет речь, лицо, испытывающее необходимость
+#               -> subjective; адресат действия -> objective; цель движения (к) ->
+#               attributive; verbal government -> necessary informational completion
+#   accusative: логический субъект при глаголе 'звать' -> subjective; объект действия
+#               -> objective; продолжительность, направление движения, время ->
+#               attributive; verbal government -> necessary informational completion
+#   instrumental: с глаголом 'заниматься' -> objective; профессия лица, совместность,
+#               определение -> attributive; verbal government -> necessary informational completion
+#   prepositional: объект речи, мысли -> objective; место, средство передвижения ->
+#               attributive; verbal government -> necessary informational completion
+russian_allowed_noun_case_meanings = {
+    ("nominative", "subjective"): ["субъект активного действия", "наличие предмета/события"],
+    ("nominative", "objective"): ["предмет обладания"],
+    ("nominative", "attributive"): ["характеристика лица/предмета", "общая идентификация лица/предмета"],
+    ("nominative", "necessary informational completion"): ["персональная идентификация лица/предмета"],
+    ("nominative", "vocative expression"): [],
+    ("genitive", "subjective"): ["отсутствие лица (предмета)"],
+    ("genitive", "attributive"): [
+        "определение предмета (без предлога)",
+        "определение предмета (c предлогами)",
+        "обозначение части целого, меры",
+        "место предмета/действия",
+        "с предлогом от: удаление от объекта / лица; лицо как исходный пункт движения; лицо-отправитель"
+    ],
+    ("genitive", "necessary informational completion"): ["падеж обусловлен глагольным управлением", "обозначение количества в сочетании с числительным", "точная дата действия", "месяц в дате"],
+    ("dative", "subjective"): [],
+    ("dative", "objective"): [],
+    ("dative", "attributive"): [],
+    ("dative", "necessary informational completion"): [],
+    ("accusative", "subjective"): [],
+    ("accusative", "objective"): [],
+    ("accusative", "attributive"): [],
+    ("accusative", "necessary informational completion"): [],
+    ("instrumental", "objective"): [],
+    ("instrumental", "attributive"): [],
+    ("instrumental", "necessary informational completion"): [],
+    ("prepositional", "objective"): [],
+    ("prepositional", "attributive"): [],
+    ("prepositional", "necessary informational completion"): ["падеж обусловлен глагольным управлением"]
+}
+russian_allowed_pronouns = ["личное", "притяжательное", "указательное", "определительное", "вопросительное", "отрицательное"]
+russian_allowed_short_adjectives = ["рад", "рада", "радо", "рады", "занят", "занята", "занято", "заняты", "должен", "должна", "должно", "должны", "болен", "больна", "больно", "больны"]
+russian_allowed_adverbs = ["места", "времени", "образа действия", "степени", "предикативные", "вопросительные"]
+russian_disallowed_non_finite_forms = ["причастие", "деепричастие"]
+
+# conjugation classes of the A1 inventory patterns (читать, уметь, чувствовать, встретить,
+# отдохнуть, давать, ждать, писать, мочь, идти, ехать, брать), as named by the verbs task
+russian_allowed_conjugation_classes = [x.lower() for x in [
+    "Second-conjugation verbs in -ить, like 'жалить - жалят'",
+    "First-conjugation verbs in -ать/-ять/-еть, like 'читать - читаю', 'жалеть - жалею'",
+    "First-conjugation verbs in -овать/-eвать, like 'рисовать - рисую'",
+    "First-conjugation verbs in -нуть, like 'тянуть - тяну'",
+    "First-conjugation verbs in a changing consonant + -ать and -у/-ю ending in the first person like 'сказать - скажу'",
+    "First-conjugation verbs in -ать with added vowel in stem and -у/-ю ending in the first person like 'брать - беру'",
+    "First-conjugation verbs in -ать/-ять with regular stem and -у/-ю ending in the first person, like 'ждать - жду'",
+    "First-conjugation verbs in -чь, like 'течь - теку', 'мочь - могу'",
+    "First-conjugation verbs in -авать, like 'давать - даю'",
+    "First-conjugation verbs in -ти, like 'идти - иду'",
+    "First-conjugation verbs in -ехать, like 'приехать - приеду'"
+]]
+# inventory patterns with no conjugation class of their own (хотеть - хочу, жить - живу)
+russian_allowed_irregular_verbs = ["хотеть", "жить"]
+
+# --- error messages
+russian_noun_case_error_message = """[NOUNS]: The noun '{text}' has 'case' = '{case}' and 'case_general_meaning' = '{case_general_meaning}'. This combination falls outside of the specifications of the A1 inventory."""
+russian_noun_case_meaning_error_message = """[NOUNS]: The noun '{text}' has 'case' = '{case}' and 'case_general_meaning' = '{case_general_meaning}', with the specific meaning '{case_meaning}'. This case meaning does not belong to the A1 inventory."""
+russian_pronoun_category_error_message = """[PRONOUNS]: The pronoun '{text}' belongs to the '{kind}' category. This pronoun category does not belong to the A1 inventory."""
+russian_adjective_case_error_message = """[ADJECTIVES]: The adjective '{text}' is in '{case}' case. Only adjectives in nominative case are allowed according to the A1 inventory."""
+russian_adjective_short_form_error_message = """[ADJECTIVES]: The adjective '{text}' is a short-form adjective. Only the short forms of 'рад', 'занят', 'должен' and 'болен' are allowed according to the A1 inventory."""
+russian_verb_conjugation_error_message = """[VERBS]: The verb '{lemma}' (ref -> '{text}') belongs to the conjugation class '{conjugation_class}', which falls outside of the verb patterns listed in the A1 inventory."""
+russian_verb_mood_error_message = """[VERBS]: The verb '{text}' has 'mood' = '{mood}'. The subjunctive mood does not belong to the A1 inventory."""
+russian_verb_non_finite_error_message = """[VERBS]: The verb '{text}' is a non-finite form ('{non_finite_form}'). Only infinitives are allowed according to the A1 inventory."""
+russian_adverb_class_error_message = """[ADVERBS]: The adverb '{text}' belongs to the '{adverb_class}' class. This adverb class does not belong to the A1 inventory."""
+russian_numeral_collective_error_message = """[NUMERALS]: The numeral '{text}' is a collective numeral. Collective numerals do not belong to the A1 inventory."""
+russian_numeral_ordinal_case_error_message = """[NUMERALS]: The ordinal numeral '{text}' is in '{case}' case. Ordinal numerals are allowed in nominative case only according to the A1 inventory."""
+
+def annotate_russian_analysis(input: dict, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
+    """Adds the specific case meaning ('case_meaning') to the nouns of
+    an analysis report: the nouns task reports it in a property named
+    after the case and the general meaning (e.g. 'genitive_objective_meaning').
+    The input report is not modified.
+
+    Arguments:
+        input (dict): the analysis report
+        text (str | None): the analyzed text (unused)
+        pos_tags (list[dict] | None): the POS tags of the analyzed text (unused)
+
+    Returns:
+        dict: the annotated copy of the report (the report itself if it has no nouns)
+    """
+    if not isinstance(input, dict) or not isinstance(input.get("nouns"), list):
+        return input
+
+    nouns = []
+    for noun in input["nouns"]:
+        if isinstance(noun, dict):
+            case, general_meaning = noun.get("case"), noun.get("case_general_meaning")
+            meaning = None
+            if isinstance(case, str) and isinstance(general_meaning, str) and general_meaning.lower() != "vocative expression":
+                meaning = noun.get(f"{case.lower()}_{general_meaning.lower().replace(' ', '_')}_meaning")
+            noun = {**noun, "case_meaning": meaning}
+        nouns.append(noun)
+
+    return {**input, "nouns": nouns}
+
+# --- rules
+russian_rules = RuleSet({
+    "template": russian_eval_template,
+    "prepare": annotate_russian_analysis,
+    "sections": [
+        # --- grammar
+        {
+            "items": "nouns",
+            "counter": "errors_nouns",
+            "fields": {
+                "text": "text",
+                "case": ("lower", "case"),
+                "case_general_meaning": ("optional", ("lower", "case_general_meaning")),
+                "case_meaning": ("optional", ("lower", "case_meaning"))
+            },
+            "rules": [
+                # 1 - case used with a general meaning outside of the inventory
+                {
+                    "when": ("all", [
+                        ("true", "case_general_meaning"),
+                        ("not_in", ("case", "case_general_meaning"), list(russian_allowed_noun_case_meanings.keys()))
+                    ]),
+                    "message": russian_noun_case_error_message,
+                    "stop": True
+                },
+                # 2 - specific case meaning outside of the inventory
+                {
+                    "when": ("all", [
+                        ("true", "case_meaning"),
+                        ("not_in", ("case", "case_general_meaning", "case_meaning"), [
+                            (case, general_meaning, meaning)
+                            for (case, general_meaning), meanings in russian_allowed_noun_case_meanings.items()
+                            for meaning in meanings
+                        ])
+                    ]),
+                    "message": russian_noun_case_meaning_error_message
+                }
+            ]
+        },
+        {
+            "items": "pronouns",
+            "counter": "errors_pronouns",
+            "fields": {"text": "text", "kind": ("lower", "kind")},
+            "rules": [
+                # 1 - pronoun outside of allowed categories
+                {"when": ("not_in", "kind", russian_allowed_pronouns), "message": russian_pronoun_category_error_message}
+            ]
+        },
+        {
+            "items": "adjectives",
+            "counter": "errors_adjectives",
+            "fields": {
+                "text": "text",
+                "text_lower": ("lower", "text"),
+                "form": ("lower", "form"),
+                "case": ("optional", ("lower", "case"))
+            },
+            "rules": [
+                # 1 - adjective in an indirect case
+                {"when": ("all", [("true", "case"), ("ne", "case", "nominative")]), "message": russian_adjective_case_error_message},
+                # 2 - short-form adjective outside of the allowed ones
+                {
+                    "when": ("all", [("eq", "form", "short-form"), ("not_in", "text_lower", russian_allowed_short_adjectives)]),
+                    "message": russian_adjective_short_form_error_message
+                }
+            ]
+        },
+        {
+            "items": "verbs",
+            "counter": "errors_verbs",
+            "fields": {
+                "text": "text",
+                "lemma": ("lower", "lemma"),
+                "conjugation_class": ("optional", ("lower", "conjugation_class")),
+                "mood": ("optional", ("lower", "mood")),
+                "non_finite_form": ("optional", ("lower", "non-finite forms"))
+            },
+            "rules": [
+                # 1 - verb conjugated following a pattern out of inventory
+                {
+                    "when": ("all", [
+                        ("true", "conjugation_class"),
+                        ("not_in", "conjugation_class", russian_allowed_conjugation_classes),
+                        ("not_in", "lemma", russian_allowed_irregular_verbs)
+                    ]),
+                    "message": russian_verb_conjugation_error_message
+                },
+                # 2 - subjunctive mood
+                {"when": ("eq", "mood", "сослагательное"), "message": russian_verb_mood_error_message},
+                # 3 - non-finite forms other than the infinitive
+                {"when": ("in", "non_finite_form", russian_disallowed_non_finite_forms), "message": russian_verb_non_finite_error_message}
+            ]
+        },
+        {
+            "items": "adverbs",
+            "counter": "errors_adverbs",
+            "fields": {"text": "text", "adverb_class": ("lower", "class")},
+            "rules": [
+                # 1 - adverb outside of allowed classes
+                {"when": ("not_in", "adverb_class", russian_allowed_adverbs), "message": russian_adverb_class_error_message}
+            ]
+        },
+        {
+            "items": "numerals",
+            "counter": "errors_numerals",
+            "fields": {"text": "text", "kind": ("lower", "kind"), "case": ("optional", ("lower", "case"))},
+            "rules": [
+                # 1 - collective numerals
+                {"when": ("eq", "kind", "collective"), "message": russian_numeral_collective_error_message},
+                # 2 - ordinal numerals in an indirect case
+                {
+                    "when": ("all", [("eq", "kind", "ordinal"), ("true", "case"), ("ne", "case", "nominative")]),
+                    "message": russian_numeral_ordinal_case_error_message
+                }
+            ]
+        }
+        # --- syntax (no checks yet)
+    ]
+})
+
+def parse_russian_analysis(input: dict, check_syntax: bool = False, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
+    """Given a text analysis report, performs a
+    rule-based evaluation to check if the russian A1
+    invetory constraints are satisfied."""
+    return russian_rules.evaluate(input, check_syntax, text, pos_tags)
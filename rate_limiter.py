@@ -0,0 +1,256 @@
+import time, asyncio, threading, argparse
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables import Runnable
+
+###
+# Adaptive rate limiter shared by all the LLM-driven tools.
+#
+# Every (provider, model) pair gets a single limiter, shared by all
+# the requests (and concurrent tasks) of a process:
+#   * requests/minute -> a token bucket, one token per request
+#   * tokens/minute   -> a token bucket debited with the token usage
+#                        returned by each response (it can go in debt,
+#                        new requests wait until the balance is positive)
+#   * rate limit errors (429) pause every request sharing the limiter,
+#     honouring the 'Retry-After' headers, or backing off exponentially
+#
+# Limiters are attached to langchain chat models ('rate_limiter'), so
+# cached responses are never rate limited.
+###
+
+# default limits, used for Groq when no limits are specified (free tier)
+GROQ_DEFAULT_RPM = 30
+GROQ_DEFAULT_TPM = 6000
+
+# retries of failed requests (rate limits, connection and server errors)
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_DELAY = 1.0
+BACKOFF_MAX_DELAY = 120.0
+
+class AdaptiveRateLimiter(BaseRateLimiter):
+    """Requests/minute and tokens/minute token buckets, with a shared
+    pause triggered by rate limit errors. Both limits are optional."""
+    def __init__(self, rpm: float | None = None, tpm: float | None = None, check_every: float = 0.1) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._check_every = check_every
+        self._lock = threading.Lock()
+
+        # both buckets start full
+        self._request_balance = float(rpm) if rpm is not None else 0.0
+        self._token_balance = float(tpm) if tpm is not None else 0.0
+        self._last_refill = time.monotonic()
+
+        self._paused_until = 0.0
+        self._consecutive_failures = 0
+
+        self.requests = 0
+        self.tokens = 0
+        self.rate_limit_errors = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+
+        if self.rpm is not None:
+            self._request_balance = min(float(self.rpm), self._request_balance + elapsed * self.rpm / 60)
+        if self.tpm is not None:
+            self._token_balance = min(float(self.tpm), self._token_balance + elapsed * self.tpm / 60)
+
+    def _try_consume(self) -> float:
+        """Consumes a request if possible. Returns 0 on success,
+        otherwise the (estimated) seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            if self.rpm is not None and self._request_balance < 1:
+                return (1 - self._request_balance) * 60 / self.rpm
+
+            if self.tpm is not None and self._token_balance <= 0:
+                return (1 - self._token_balance) * 60 / self.tpm
+
+            if self.rpm is not None:
+                self._request_balance -= 1
+            self.requests += 1
+
+            return 0
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """Waits (blocking) until a request can be made"""
+        while True:
+            wait = self._try_consume()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+
+            wait = min(wait, self._check_every)
+            self.waited += wait
+            time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """Waits (non blocking the event loop) until a request can be made"""
+        while True:
+            wait = self._try_consume()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+
+            wait = min(wait, self._check_every)
+            self.waited += wait
+            await asyncio.sleep(wait)
+
+    def record_usage(self, total_tokens: int) -> None:
+        """Debits the tokens consumed by a completed request"""
+        with self._lock:
+            self._consecutive_failures = 0
+            self.tokens += total_tokens
+            if self.tpm is not None:
+                self._refill(time.monotonic())
+                self._token_balance -= total_tokens
+
+    def record_rate_limit(self, retry_after: float | None = None) -> None:
+        """Pauses all the requests sharing this limiter after a rate
+        limit error: for 'retry_after' seconds if the provider said so,
+        otherwise backing off exponentially on consecutive errors."""
+        with self._lock:
+            self.rate_limit_errors += 1
+            self._consecutive_failures += 1
+
+            backoff = min(BACKOFF_BASE_DELAY * (2 ** (self._consecutive_failures - 1)), BACKOFF_MAX_DELAY)
+            delay = retry_after if retry_after is not None else backoff
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def get_stats(self) -> dict:
+        """Returns the limiter counters"""
+        return {
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "rate_limit_errors": self.rate_limit_errors,
+            "waited": round(self.waited, 2)
+        }
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """Reports the outcome of every LLM request to its rate limiter"""
+    def __init__(self, limiter: AdaptiveRateLimiter) -> None:
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        self.limiter.record_usage(get_total_tokens(response))
+
+    def on_llm_error(self, error: BaseException, **kwargs) -> None:
+        if is_rate_limit_error(error):
+            self.limiter.record_rate_limit(get_retry_after(error))
+
+def get_total_tokens(response: LLMResult) -> int:
+    """Reads the total token usage of a langchain LLM result"""
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage.get("total_tokens") is not None:
+        return token_usage["total_tokens"]
+
+    total_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage_metadata:
+                total_tokens += usage_metadata.get("total_tokens", 0)
+
+    return total_tokens
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Checks if an error is a provider rate limit error (HTTP 429)"""
+    return getattr(error, "status_code", None) == 429
+
+def get_retry_after(error: BaseException) -> float | None:
+    """Reads the 'Retry-After' headers of a rate limit error (in seconds)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date values are not supported, fall back to exponential backoff
+        return None
+
+    return None
+
+def get_retryable_errors() -> tuple[type[BaseException], ...]:
+    """Returns the provider errors that are worth retrying
+    (rate limits, connection errors and server errors)"""
+    errors = []
+    for module_name in ["openai", "groq"]:
+        try:
+            module = __import__(module_name)
+        except ImportError:
+            continue
+
+        for error_name in ["RateLimitError", "APIConnectionError", "InternalServerError"]:
+            if hasattr(module, error_name):
+                errors.append(getattr(module, error_name))
+
+    return tuple(errors)
+
+# --- limiters registry, one per (provider, model)
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, model: str, rpm: float | None = None, tpm: float | None = None) -> AdaptiveRateLimiter:
+    """Returns the (shared) rate limiter of a provider/model pair,
+    creating it with the given limits on first use."""
+    with _limiters_lock:
+        key = (provider, model)
+        if key not in _limiters:
+            _limiters[key] = AdaptiveRateLimiter(rpm=rpm, tpm=tpm)
+
+        return _limiters[key]
+
+def get_rate_limit_kwargs(limiter: AdaptiveRateLimiter) -> dict:
+    """Returns the chat model constructor arguments that attach a limiter.
+    Client side retries are disabled: failed requests are retried
+    by 'with_rate_limit_retries', sharing the limiter's pauses."""
+    return {
+        "rate_limiter": limiter,
+        "callbacks": [RateLimitCallbackHandler(limiter)],
+        "max_retries": 0
+    }
+
+def with_rate_limit_retries(llm: Runnable) -> Runnable:
+    """Wraps a rate limited chat model, retrying failed requests
+    (with exponential backoff and jitter)."""
+    return llm.with_retry(
+        retry_if_exception_type=get_retryable_errors(),
+        wait_exponential_jitter=True,
+        stop_after_attempt=MAX_ATTEMPTS
+    )
+
+def add_rate_limit_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the rate limiter command line arguments to a tool's parser"""
+    parser.add_argument("--rpm", help="(optional) maximum number of LLM requests per minute", type=float, default=None)
+    parser.add_argument("--tpm", help="(optional) maximum number of LLM tokens per minute", type=float, default=None)
+
+def validate_rate_limit_arguments(args: argparse.Namespace) -> None:
+    """Validates the rate limiter command line arguments"""
+    if (args.rpm is not None and args.rpm <= 0) or (args.tpm is not None and args.tpm <= 0):
+        print("Error: --rpm and --tpm must be positive numbers!")
+        exit(2)
+
+def print_rate_limit_stats(limiter: AdaptiveRateLimiter | None) -> None:
+    """Logs the limiter counters"""
+    if limiter is None:
+        return
+
+    stats = limiter.get_stats()
+    print(f"INFO\t Rate limiter: {stats['requests']} requests, {stats['tokens']} tokens, {stats['rate_limit_errors']} rate limit errors, {stats['waited']}s waited")
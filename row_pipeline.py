@@ -0,0 +1,87 @@
+import asyncio, argparse
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+###
+# Row-level execution engine shared by the LLM-driven tools
+# (paraphrase.py, lexical_simplify.py).
+#
+# Rows are processed concurrently, results are handed back in input
+# order through a bounded reorder buffer: at most 'window' rows are
+# in progress or waiting for a slower preceding row, so a run of any
+# size keeps a constant number of rows in memory and its output can
+# be streamed to disk as it progresses.
+###
+
+DEFAULT_CONCURRENCY = 8
+
+# rows in progress (or buffered) per concurrent LLM request
+ROWS_PER_REQUEST = 4
+
+async def process_rows(
+    rows: Iterable,
+    process_row: Callable[[int, Any], Awaitable],
+    on_result: Callable[[int, Any], None],
+    window: int) -> int:
+    """Processes rows concurrently, delivering their results in input order
+
+    Arguments:
+        rows (Iterable): the input rows, consumed lazily
+        process_row (Callable[[int, Any], Awaitable]): coroutine function called with (index, row)
+        on_result (Callable[[int, Any], None]): called with (index, result) of each row, in input order
+        window (int): maximum number of rows in progress or waiting to be delivered
+
+    Returns:
+        int: the number of processed rows
+    """
+    rows = iter(rows)
+    in_progress = {}
+    completed = {}
+    next_index = 0
+    next_result = 0
+    exhausted = False
+
+    try:
+        while True:
+            # refill the window (rows waiting in the reorder buffer count as well)
+            while not exhausted and len(in_progress) + len(completed) < window:
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_progress[asyncio.ensure_future(process_row(next_index, row))] = next_index
+                next_index += 1
+
+            if len(in_progress) == 0:
+                break
+
+            done, _ = await asyncio.wait(in_progress.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                completed[in_progress.pop(task)] = task.result()
+
+            # deliver the completed prefix of the rows
+            while next_result in completed:
+                on_result(next_result, completed.pop(next_result))
+                next_result += 1
+    finally:
+        # a failing row (or on_result) stops the pipeline: the rows still in progress are cancelled
+        for task in in_progress:
+            task.cancel()
+        await asyncio.gather(*in_progress, return_exceptions=True)
+
+    return next_result
+
+def get_window(concurrency: int) -> int:
+    """Returns the reorder window (number of rows) used for a concurrency level"""
+    return concurrency * ROWS_PER_REQUEST
+
+def add_concurrency_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the row concurrency command line arguments to a tool's parser"""
+    parser.add_argument("-n", "--concurrency", help="(optional) maximum number of concurrent LLM requests", type=int, default=DEFAULT_CONCURRENCY)
+
+def validate_concurrency_arguments(args: argparse.Namespace) -> None:
+    """Validates the row concurrency command line arguments"""
+    if args.concurrency < 1:
+        print("Error: --concurrency must be a positive integer!")
+        exit(2)
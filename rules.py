@@ -0,0 +1,606 @@
+import string, threading
+from collections.abc import Callable
+import numpy as np
+import pandas as pd
+
+###
+# A declarative rule engine for the evaluation of analysis reports.
+#
+# Inventory constraints are described as data (see parsers.py):
+#   * sections -> the item lists of a report to check (e.g. 'verbs'),
+#                 with the error counter they increment, the item fields
+#                 used by their rules and (optional) nested item lists
+#   * fields   -> how item values are read: 'key' (raw value),
+#                 ('lower', 'key'), ('coalesce', 'field', 'field') or
+#                 ('optional', 'key' | ('lower', 'key')) (None if missing)
+#   * required -> (optional) the fields read for every item, before its
+#                 rules (the item schema): a missing or malformed one
+#                 raises; {'when': condition, 'fields': [...]} entries
+#                 are read only for the items matching the condition
+#   * rules    -> a condition and the error message logged (and counted)
+#                 when it holds; 'stop' skips the item's remaining rules
+#
+# Conditions are tuples:
+#   ('in'|'not_in', field or (field, ...), values)
+#   ('eq'|'ne', field, value), ('true'|'false', field)
+#   ('startswith', field, prefix), ('not', condition)
+#   ('all'|'any', [condition, ...]), ('check', callable(view, report) -> bool)
+#
+# Rule sets are compiled on first use: value lists become frozensets
+# (or lazily resolved tables, e.g. irregular verbs lexicons), conditions
+# and messages become python functions. A report is evaluated in one
+# pass per item list; besides the required ones, item fields are read
+# (and normalized) only when a rule needs them, so errors are logged in
+# the same order as the rules.
+#
+# Batches of reports can also be evaluated in vectorised form: item lists
+# are flattened into (long-format) item tables and each rule becomes a
+# column operation (isin, comparisons); error counts are aggregated per
+# report with a groupby and error messages are formatted on demand only.
+###
+
+class LazyTable():
+    """A lookup table resolved (once) when its rule set is compiled
+
+    Arguments:
+        resolve (Callable[[], frozenset]): builds the table values
+    """
+    def __init__(self, resolve: Callable[[], frozenset]) -> None:
+        self.resolve = resolve
+
+def compile_field(spec: str | tuple) -> Callable[[dict, "ItemView"], object]:
+    """Compiles a field specification to a function of (item, view)"""
+    if isinstance(spec, str):
+        return lambda item, view: item[spec]
+
+    match spec[0]:
+        case "lower":
+            key = spec[1]
+            return lambda item, view: item[key].lower()
+        case "coalesce":
+            names = spec[1:]
+            return lambda item, view: next((view[x] for x in names if view[x] is not None), None)
+        case "optional":
+            key = spec[1] if isinstance(spec[1], str) else spec[1][1]
+            getter = compile_field(spec[1])
+            return lambda item, view: getter(item, view) if item.get(key) is not None else None
+        case _:
+            raise ValueError(f"Unknown field specification: {spec}")
+
+class ItemView(dict):
+    """The fields of a report item, read on first access. Names
+    that are not fields of the item are looked up in the parent view."""
+    def __init__(self, item: dict, getters: dict, parent: "ItemView | None" = None) -> None:
+        super().__init__()
+        self._item = item
+        self._getters = getters
+        self._parent = parent
+
+    def __missing__(self, name: str):
+        getter = self._getters.get(name)
+        if getter is None:
+            if self._parent is None:
+                raise KeyError(name)
+            return self._parent[name]
+
+        value = self[name] = getter(self._item, self)
+        return value
+
+def get_values(values) -> frozenset:
+    """Compiles a values list (or a lazy table) to a lookup table"""
+    if isinstance(values, LazyTable):
+        return frozenset(values.resolve())
+    return frozenset(tuple(x) if isinstance(x, list) else x for x in values)
+
+def get_field_reader(field: str | tuple[str, ...]) -> Callable[[ItemView], object]:
+    """Compiles a field reference (or a tuple of fields, for combinations) to a function of (view)"""
+    if isinstance(field, tuple):
+        return lambda view: tuple(view[x] for x in field)
+    return lambda view: view[field]
+
+def compile_condition(condition: tuple) -> Callable[[ItemView, dict], bool]:
+    """Compiles a condition to a function of (view, report)"""
+    operator = condition[0]
+
+    match operator:
+        case "in":
+            read, values = get_field_reader(condition[1]), get_values(condition[2])
+            return lambda view, report: read(view) in values
+        case "not_in":
+            read, values = get_field_reader(condition[1]), get_values(condition[2])
+            return lambda view, report: read(view) not in values
+        case "eq":
+            read, value = get_field_reader(condition[1]), condition[2]
+            return lambda view, report: read(view) == value
+        case "ne":
+            read, value = get_field_reader(condition[1]), condition[2]
+            return lambda view, report: read(view) != value
+        case "true":
+            read = get_field_reader(condition[1])
+            return lambda view, report: bool(read(view))
+        case "false":
+            read = get_field_reader(condition[1])
+            return lambda view, report: not read(view)
+        case "startswith":
+            read, prefix = get_field_reader(condition[1]), condition[2]
+            return lambda view, report: read(view).startswith(prefix)
+        case "not":
+            inner = compile_condition(condition[1])
+            return lambda view, report: not inner(view, report)
+        case "all":
+            inners = [compile_condition(x) for x in condition[1]]
+            return lambda view, report: all(inner(view, report) for inner in inners)
+        case "any":
+            inners = [compile_condition(x) for x in condition[1]]
+            return lambda view, report: any(inner(view, report) for inner in inners)
+        case "check":
+            check = condition[1]
+            return lambda view, report: bool(check(view, report))
+        case _:
+            raise ValueError(f"Unknown rule condition: {operator}")
+
+def compile_message(rule: dict) -> Callable[[ItemView], str]:
+    """Compiles the error message of a rule to a function of (view).
+    Message placeholders are read from the item fields with the same
+    name, unless they are renamed in the rule's 'args'."""
+    message = rule["message"]
+    renames = rule.get("args", {})
+    placeholders = dict.fromkeys(x[1] for x in string.Formatter().parse(message) if x[1] is not None)
+    arguments = {x: renames.get(x, x) for x in placeholders}
+    return lambda view: message.format(**{name: view[field] for name, field in arguments.items()})
+
+def compile_required(entry: str | dict) -> Callable[[ItemView, dict], None]:
+    """Compiles a required field (or a conditional group of fields) to a function of (view, report) reading it"""
+    if isinstance(entry, str):
+        return lambda view, report: view[entry]
+
+    when, names = compile_condition(entry["when"]), entry["fields"]
+    def read(view, report):
+        if when(view, report):
+            for name in names:
+                view[name]
+    return read
+
+class CompiledSection():
+    """A compiled section: an item list (or single item) and its rules.
+    Conditions and messages are compiled to python functions once, and
+    an item list is evaluated in one pass."""
+    def __init__(self, section: dict, counter: str | None = None) -> None:
+        self.single = "item" in section
+        self.path = tuple((section["item"] if self.single else section["items"]).split("."))
+        self.counter = section.get("counter", counter)
+        self.fields = section.get("fields", {})
+        self.getters = {name: compile_field(spec) for name, spec in self.fields.items()}
+        self.children = [CompiledSection(child, self.counter) for child in section.get("children", [])]
+        self.required = [compile_required(entry) for entry in section.get("required", [])]
+        self.rules = [(compile_condition(rule["when"]), compile_message(rule), rule.get("stop", False)) for rule in section.get("rules", [])]
+        self.frame_required = [
+            (None, [entry]) if isinstance(entry, str) else (compile_frame_condition(entry["when"]), entry["fields"])
+            for entry in section.get("required", [])
+        ]
+        self.frame_rules = [FrameRule(rule) for rule in section.get("rules", [])]
+
+    def evaluate_items(self, items: list[dict], report: dict, results: dict, parent: ItemView | None = None) -> None:
+        """Evaluates the rules (and nested sections) of an item list"""
+        errors_log = results["errors_log"]
+        for item in items:
+            view = ItemView(item, self.getters, parent)
+            for read in self.required:
+                read(view, report)
+
+            # rules flagged with 'stop' skip the following ones
+            for when, message, stop in self.rules:
+                if when(view, report):
+                    results[self.counter] += 1
+                    errors_log.append(message(view))
+                    if stop:
+                        break
+
+            for child in self.children:
+                child.evaluate(item, report, results, view)
+
+    def evaluate(self, source: dict, report: dict, results: dict, parent: ItemView | None = None) -> None:
+        items = source
+        for key in self.path:
+            items = items[key]
+
+        self.evaluate_items([items] if self.single else items, report, results, parent)
+
+# --- vectorised evaluation
+MISSING = object()
+
+class ItemFrame():
+    """The flattened items of a section, over a batch of reports.
+    Field columns are built on first access. Rows reading an invalid
+    field (missing, or not a string when normalized) are flagged in
+    'raised': their reports are evaluated one by one instead, raising
+    the same errors as RuleSet.evaluate."""
+    def __init__(self, section: CompiledSection, parent: "ItemFrame | None" = None, position: int = 0) -> None:
+        self.section = section
+        self.parent = parent
+        self.position = position
+        self.items = []
+        self.reports = []
+        self.keys = []
+        self.parent_rows = []
+        self.children = [ItemFrame(child, self, i + 1) for i, child in enumerate(section.children)]
+
+    def extend(self, source: dict, report: int, key: tuple = (), parent_row: int | None = None) -> None:
+        """Flattens the items of a report (or of a parent item)"""
+        items = source
+        for path_key in self.section.path:
+            items = items[path_key]
+
+        for i, item in enumerate([items] if self.section.single else items):
+            if not isinstance(item, dict):
+                raise TypeError(f"Invalid report item: {item!r}")
+
+            row = len(self.items)
+            self.items.append(item)
+            self.reports.append(report)
+            self.keys.append(key + (self.position, i))
+            self.parent_rows.append(parent_row)
+            for child in self.children:
+                child.extend(item, report, self.keys[row], row)
+
+    def truncate(self, length: int) -> None:
+        """Drops the items flattened after the first 'length' ones"""
+        del self.items[length:], self.reports[length:], self.keys[length:], self.parent_rows[length:]
+        for child in self.children:
+            child.truncate(sum(1 for x in child.parent_rows if x < length))
+
+    def reset(self) -> None:
+        """Resets the field columns (once the items are flattened)"""
+        self._columns = {}
+        self.raised = np.zeros(len(self.items), dtype=bool)
+        self._parent_rows = np.array(self.parent_rows if self.parent is not None else [], dtype=np.int64)
+        for child in self.children:
+            child.reset()
+
+    def column(self, name: str) -> tuple[pd.Series, np.ndarray]:
+        """Returns the values of a field and its invalid rows mask"""
+        if name not in self._columns:
+            self._columns[name] = self._resolve(name)
+        return self._columns[name]
+
+    def _resolve(self, name: str) -> tuple[pd.Series, np.ndarray]:
+        spec = self.section.fields.get(name)
+        if spec is None:
+            if self.parent is None:
+                raise KeyError(name)
+            values, invalid = self.parent.column(name)
+            return pd.Series(values.to_numpy()[self._parent_rows], dtype=object), invalid[self._parent_rows]
+
+        return self._resolve_spec(spec)
+
+    def _resolve_spec(self, spec: str | tuple) -> tuple[pd.Series, np.ndarray]:
+        if isinstance(spec, str):
+            values = [item.get(spec, MISSING) for item in self.items]
+            invalid = np.fromiter((x is MISSING for x in values), dtype=bool, count=len(values))
+            return pd.Series([None if x is MISSING else x for x in values], dtype=object), invalid
+
+        match spec[0]:
+            case "lower":
+                values = pd.Series([item.get(spec[1]) for item in self.items], dtype=object)
+                invalid = np.fromiter((type(x) is not str for x in values), dtype=bool, count=len(values))
+                return values.where(invalid, values[~invalid].str.lower()), invalid
+            case "coalesce":
+                values, invalid = self.column(spec[1])
+                for name in spec[2:]:
+                    pending = values.isna().to_numpy()
+                    other_values, other_invalid = self.column(name)
+                    values = values.where(~pending, other_values)
+                    invalid = invalid | (pending & other_invalid)
+                return values, invalid
+            case "optional":
+                key = spec[1] if isinstance(spec[1], str) else spec[1][1]
+                present = np.fromiter((item.get(key) is not None for item in self.items), dtype=bool, count=len(self.items))
+                values, invalid = self._resolve_spec(spec[1])
+                return pd.Series(np.where(present, values.to_numpy(), None), dtype=object), invalid & present
+            case _:
+                raise ValueError(f"Unknown field specification: {spec}")
+
+    def read(self, name: str, mask: np.ndarray) -> pd.Series:
+        """Reads a field on the rows in 'mask' (flagging invalid ones)"""
+        values, invalid = self.column(name)
+        self.raised |= invalid & mask
+        return values
+
+    def get_view(self, row: int) -> dict:
+        """Returns the (valid) fields of a row, for 'check' conditions"""
+        view = self.parent.get_view(self.parent_rows[row]) if self.parent is not None else {}
+        for name in self.section.fields:
+            values, invalid = self.column(name)
+            if not invalid[row]:
+                view[name] = values.iat[row]
+        return view
+
+    def evaluate(self, reports: list[dict], enabled: np.ndarray, counts: dict[str, np.ndarray], hits: list, raised: set[int]) -> None:
+        """Evaluates the section rules on the enabled rows, then the
+        nested sections. Error counts are added to 'counts' (by report),
+        fired rules are appended to 'hits' (for the error logs) and the
+        reports of the rows reading an invalid field are added to 'raised'."""
+        for when, names in self.section.frame_required:
+            candidates = enabled & ~self.raised
+            if when is not None:
+                candidates &= when(self, candidates, reports)
+            for name in names:
+                self.read(name, candidates)
+
+        active = enabled.copy()
+        errors = np.zeros(len(self.items), dtype=np.int64)
+        fired_rules = []
+        for index, rule in enumerate(self.section.frame_rules):
+            candidates = active & ~self.raised
+            fired = rule.when(self, candidates, reports) & candidates
+            for field in rule.args.values():
+                self.read(field, fired)
+
+            errors += fired
+            fired_rules.append((index, rule, fired))
+            if rule.stop:
+                active &= ~fired
+
+        valid = enabled & ~self.raised
+        report_ids = np.array(self.reports, dtype=np.int64)
+        if valid.any():
+            report_errors = pd.Series(errors[valid]).groupby(report_ids[valid]).sum()
+            counts[self.section.counter][report_errors.index.to_numpy()] += report_errors.to_numpy()
+
+        hits += [(self, index, rule, np.flatnonzero(fired & valid)) for index, rule, fired in fired_rules]
+
+        raised.update(report_ids[enabled & self.raised].tolist())
+
+        for child in self.children:
+            child.evaluate(reports, valid[child._parent_rows], counts, hits, raised)
+
+def compile_frame_condition(condition: tuple) -> Callable[[ItemFrame, np.ndarray, list[dict]], np.ndarray]:
+    """Compiles a condition to a vectorised function of (frame, mask, reports).
+    Results are meaningful on the rows in 'mask' only: as with python's
+    and/or, the operands of 'all'/'any' are evaluated on the rows that
+    still need them."""
+    operator = condition[0]
+
+    match operator:
+        case "in" | "not_in":
+            field, values = condition[1], list(get_values(condition[2]))
+            def evaluate(frame, mask, reports):
+                if isinstance(field, tuple):
+                    found = pd.MultiIndex.from_arrays([frame.read(x, mask) for x in field]).isin(values)
+                else:
+                    found = frame.read(field, mask).isin(values).to_numpy()
+                return found if operator == "in" else ~found
+        case "eq" | "ne":
+            field, value = condition[1], condition[2]
+            def evaluate(frame, mask, reports):
+                found = (frame.read(field, mask) == value).to_numpy(dtype=bool)
+                return found if operator == "eq" else ~found
+        case "true" | "false":
+            field = condition[1]
+            def evaluate(frame, mask, reports):
+                found = frame.read(field, mask).to_numpy().astype(bool)
+                return found if operator == "true" else ~found
+        case "startswith":
+            field, prefix = condition[1], condition[2]
+            def evaluate(frame, mask, reports):
+                values = frame.read(field, mask)
+                is_string = np.fromiter((type(x) is str for x in values), dtype=bool, count=len(values))
+                frame.raised |= mask & ~is_string
+                return np.fromiter((is_str and x.startswith(prefix) for x, is_str in zip(values, is_string)), dtype=bool, count=len(values))
+        case "not":
+            inner = compile_frame_condition(condition[1])
+            def evaluate(frame, mask, reports):
+                return ~inner(frame, mask, reports)
+        case "all":
+            inners = [compile_frame_condition(x) for x in condition[1]]
+            def evaluate(frame, mask, reports):
+                found = mask.copy()
+                for inner in inners:
+                    found &= inner(frame, found, reports)
+                return found
+        case "any":
+            inners = [compile_frame_condition(x) for x in condition[1]]
+            def evaluate(frame, mask, reports):
+                found = np.zeros(len(mask), dtype=bool)
+                for inner in inners:
+                    pending = mask & ~found
+                    found |= inner(frame, pending, reports) & pending
+                return found
+        case "check":
+            check = condition[1]
+            def evaluate(frame, mask, reports):
+                found = np.zeros(len(mask), dtype=bool)
+                for row in np.flatnonzero(mask):
+                    # errors are raised again by the one by one evaluation of the report
+                    try:
+                        found[row] = bool(check(frame.get_view(row), reports[frame.reports[row]]))
+                    except Exception:
+                        frame.raised[row] = True
+                return found
+        case _:
+            raise ValueError(f"Unknown rule condition: {operator}")
+
+    return evaluate
+
+class FrameRule():
+    """A rule compiled to column operations"""
+    def __init__(self, rule: dict) -> None:
+        self.when = compile_frame_condition(rule["when"])
+        self.message = rule["message"]
+        self.stop = rule.get("stop", False)
+        renames = rule.get("args", {})
+        placeholders = dict.fromkeys(x[1] for x in string.Formatter().parse(self.message) if x[1] is not None)
+        self.args = {x: renames.get(x, x) for x in placeholders}
+
+    def format(self, frame: ItemFrame, rows: np.ndarray) -> list[str]:
+        """Formats the error messages of the given rows"""
+        columns = {name: frame.column(field)[0].to_numpy()[rows] for name, field in self.args.items()}
+        return [self.message.format(**{name: values[i] for name, values in columns.items()}) for i in range(len(rows))]
+
+class RuleSet():
+    """An inventory rule set, compiled on first use.
+
+    Arguments:
+        spec (dict): the rule set specification:
+            'template' (dict): the evaluation output template (error counters and 'errors_log')
+            'sections' (list[dict]): the checked item lists, in evaluation order.
+                Sections flagged with 'syntax' are evaluated only when syntax checks
+                are enabled, their 'counters' are then added to the output.
+            'prepare' (Callable): (optional) builds the evaluated report from an analysis
+                report, its input text and POS tags, e.g. to add character offsets
+    """
+    def __init__(self, spec: dict) -> None:
+        self._spec = spec
+        self._sections = None
+        self._lock = threading.Lock()
+
+    def _compile(self) -> None:
+        with self._lock:
+            if self._sections is None:
+                self._sections = [(section, CompiledSection(section)) for section in self._spec["sections"]]
+
+    def prepare(self, report: dict, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
+        """Builds the evaluated report (see the 'prepare' specification)"""
+        prepare = self._spec.get("prepare")
+        return prepare(report, text, pos_tags) if prepare is not None else report
+
+    def evaluate(self, report: dict, check_syntax: bool = False, text: str | None = None, pos_tags: list[dict] | None = None) -> dict:
+        """Evaluates an analysis report
+
+        Arguments:
+            report (dict): the analysis report (analysis task results, keyed by task name)
+            check_syntax (bool): set to True to evaluate syntax sections too
+            text (str | None): (optional) the analyzed text
+            pos_tags (list[dict] | None): (optional) the POS tags of the analyzed text
+
+        Returns:
+            dict: the error counters and the errors log
+        """
+        if self._sections is None:
+            self._compile()
+
+        return self._evaluate(self.prepare(report, text, pos_tags), check_syntax)
+
+    def _evaluate(self, report: dict, check_syntax: bool) -> dict:
+        results = {key: (list(value) if isinstance(value, list) else value) for key, value in self._spec["template"].items()}
+        for section, compiled_section in self._sections:
+            if section.get("syntax", False):
+                if not check_syntax:
+                    continue
+                for counter, value in section.get("counters", {}).items():
+                    results.setdefault(counter, value)
+
+            compiled_section.evaluate(report, report, results)
+
+        return results
+
+    def evaluate_batch(
+        self,
+        reports: list[dict],
+        check_syntax: bool = False,
+        texts: list[str] | None = None,
+        pos_tags: list[list[dict]] | None = None) -> list[dict]:
+        """Evaluates a list of analysis reports (the rule set is compiled once)
+
+        Returns:
+            list[dict]: the evaluation of each report, in input order
+        """
+        if self._sections is None:
+            self._compile()
+
+        reports = self._prepare_batch(reports, texts, pos_tags)
+        return [self._evaluate(report, check_syntax) for report in reports]
+
+    def _prepare_batch(self, reports: list[dict], texts: list[str] | None, pos_tags: list[list[dict]] | None) -> list[dict]:
+        texts = texts if texts is not None else [None] * len(reports)
+        pos_tags = pos_tags if pos_tags is not None else [None] * len(reports)
+        return [self.prepare(report, text, tags) for report, text, tags in zip(reports, texts, pos_tags)]
+
+    def evaluate_frame(
+        self,
+        reports: list[dict],
+        check_syntax: bool = False,
+        errors_log: bool = True,
+        texts: list[str] | None = None,
+        pos_tags: list[list[dict]] | None = None) -> pd.DataFrame:
+        """Evaluates a list of analysis reports in vectorised form: the
+        item lists of all reports are flattened into item tables, and
+        rules are evaluated as column operations.
+
+        Arguments:
+            reports (list[dict]): the analysis reports
+            check_syntax (bool): set to True to evaluate syntax sections too
+            errors_log (bool): set to False to skip the error messages (counters only)
+            texts (list[str] | None): (optional) the analyzed texts
+            pos_tags (list[list[dict]] | None): (optional) the POS tags of the analyzed texts
+
+        Returns:
+            pd.DataFrame: one row per report (in input order), with the same
+                columns (and values) as the output of 'evaluate'
+        """
+        if self._sections is None:
+            self._compile()
+
+        reports = self._prepare_batch(reports, texts, pos_tags)
+        template = dict(self._spec["template"])
+        frames = []
+        for index, (section, compiled_section) in enumerate(self._sections):
+            if section.get("syntax", False):
+                if not check_syntax:
+                    continue
+                for counter, value in section.get("counters", {}).items():
+                    template.setdefault(counter, value)
+
+            frames.append(ItemFrame(compiled_section, position=index))
+
+        # flatten item lists (malformed reports are evaluated one by one)
+        evaluated = {}
+        for index, report in enumerate(reports):
+            lengths = [len(frame.items) for frame in frames]
+            try:
+                for frame in frames:
+                    frame.extend(report, index)
+            except (KeyError, IndexError, TypeError):
+                for frame, length in zip(frames, lengths):
+                    frame.truncate(length)
+                evaluated[index] = self._evaluate(report, check_syntax)
+
+        counts = {key: np.full(len(reports), value, dtype=np.int64) for key, value in template.items() if not isinstance(value, list)}
+        hits, raised = [], set()
+        for frame in frames:
+            frame.reset()
+            frame.evaluate(reports, np.ones(len(frame.items), dtype=bool), counts, hits, raised)
+
+        # reports with invalid item fields are evaluated one by one (in order, raising the same errors)
+        for index in sorted(raised):
+            evaluated[index] = self._evaluate(reports[index], check_syntax)
+
+        for index, results in evaluated.items():
+            for key in counts:
+                counts[key][index] = results[key]
+
+        columns = {}
+        for key, value in template.items():
+            if not isinstance(value, list):
+                columns[key] = counts[key]
+            elif key == "errors_log" and errors_log:
+                columns[key] = self._get_errors_logs(len(reports), hits, evaluated)
+
+        return pd.DataFrame(columns, index=range(len(reports)))
+
+    def _get_errors_logs(self, length: int, hits: list, evaluated: dict) -> list[list[str]]:
+        """Formats the error messages of a vectorised evaluation"""
+        entries = [
+            (frame.reports[row], frame.keys[row] + (0, index), message)
+            for frame, index, rule, rows in hits if len(rows) > 0
+            for row, message in zip(rows, rule.format(frame, rows))
+        ]
+        entries.sort(key=lambda x: (x[0], x[1]))
+
+        logs = [[] for _ in range(length)]
+        for report, _, message in entries:
+            logs[report].append(message)
+        for index, results in evaluated.items():
+            logs[index] = results["errors_log"]
+
+        return logs
@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os, itertools
+from data_io import read_table
 
 # --- SECTION 1 - Descriptive Statistics
 ###
@@ -16,7 +17,7 @@ import os, itertools
 ###
 
 # --- i/o references
-INPUT_FILE = "analysis_report.xlsx"
+INPUT_FILE = "analysis_report.xlsx" # output of merge_data.py (.xlsx, .tsv, .parquet or .feather)
 OUTPUT_DIR = "./statistics_descriptive_100"
 
 # table renames
@@ -48,7 +49,7 @@ errors_frequency_bins = {
 }
 
 # --- read data
-df = pd.read_excel(INPUT_FILE, header=0)
+df = read_table(INPUT_FILE)
 
 # separate by language & test by group
 idioms = df["idiom"].unique()
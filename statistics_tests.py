@@ -4,6 +4,7 @@ from scipy.stats import f_oneway, kruskal, shapiro, levene
 from scikit_posthocs import posthoc_dunn, posthoc_tukey_hsd
 import os, math, itertools
 import math
+from data_io import read_table
 
 # --- SECTION 2 - Statistical tests
 ###
@@ -334,11 +335,11 @@ def generate_tests_summary(df, group_by, tests_df, posthocs_dict) -> pd.DataFram
     return table
 
 # --- i/o references
-INPUT_FILE = "analysis_report.xlsx"
+INPUT_FILE = "analysis_report.xlsx" # output of merge_data.py (.xlsx, .tsv, .parquet or .feather)
 OUTPUT_DIR = "./statistics_tests_100"
 
 # --- read data
-df = pd.read_excel(INPUT_FILE, header=0)
+df = read_table(INPUT_FILE)
 
 # separate by language & test by group
 idioms = df["idiom"].unique()
@@ -0,0 +1,254 @@
+import os, json, pytest
+from parsers import (
+    russian_rules, parse_russian_analysis, russian_allowed_noun_case_meanings,
+    russian_noun_case_error_message, russian_noun_case_meaning_error_message,
+    russian_pronoun_category_error_message, russian_adjective_case_error_message,
+    russian_adjective_short_form_error_message, russian_verb_conjugation_error_message,
+    russian_verb_mood_error_message, russian_verb_non_finite_error_message,
+    russian_adverb_class_error_message, russian_numeral_collective_error_message,
+    russian_numeral_ordinal_case_error_message
+)
+
+###
+# Russian rule set (parsers.russian_rules), evaluated on synthetic
+# analysis reports following the schemas of the Russian analysis tasks
+# (analysis_tasks/russian_analysis_tasks.json).
+###
+
+SECTIONS = ["nouns", "pronouns", "adjectives", "verbs", "adverbs", "numerals"]
+
+ALLOWED_CLASS = "First-conjugation verbs in -ать/-ять/-еть, like 'читать - читаю', 'жалеть - жалею'"
+DISALLOWED_CLASS = "Second-conjugation verbs in -ать/-ять/-еть, like 'видеть - видят'"
+
+with open(os.path.join(os.path.dirname(__file__), "..", "analysis_tasks", "russian_analysis_tasks.json"), "r", encoding="utf-8") as f_in:
+    NOUN_PROPERTIES = json.load(f_in)["grammar"]["nouns"]["schema"]["items"]["properties"]
+
+def make_report(**sections) -> dict:
+    """Builds an analysis report (sections not given are empty)"""
+    return {key: sections.get(key, []) for key in SECTIONS}
+
+def noun(text, case, general_meaning, meaning=None, **properties) -> dict:
+    item = {"text": text, "case": case, "case_general_meaning": general_meaning, **properties}
+    if meaning is not None:
+        key = f"{case.lower()}_{general_meaning.replace(' ', '_')}_meaning"
+        assert key in NOUN_PROPERTIES, key
+        item[key] = meaning
+    return item
+
+def verb(text, lemma, conjugation_class=ALLOWED_CLASS, mood="изъявительное", **properties) -> dict:
+    return {"text": text, "lemma": lemma, "conjugation_class": conjugation_class, "mood": mood, "tense": "present", "voice": "действительный", **properties}
+
+def assert_errors(results: dict, counter: str, messages: list[str]) -> None:
+    """Checks that all the errors of a report are the given ones, in the given counter"""
+    for key in russian_rules._spec["template"]:
+        if key != "errors_log":
+            assert results[key] == (len(messages) if key == counter else 0), key
+    assert results["errors_log"] == messages
+
+# --- nouns
+def test_nouns_allowed_meanings_are_in_schema():
+    # the specific meanings checked can be reported by the nouns task
+    for (case, general_meaning), meanings in russian_allowed_noun_case_meanings.items():
+        key = f"{case}_{general_meaning.replace(' ', '_')}_meaning"
+        assert len(meanings) == 0 or set(meanings) <= set(NOUN_PROPERTIES[key]["enum"]), key
+
+@pytest.mark.parametrize("case, general_meaning, meaning", [
+    ("Nominative", "subjective", "субъект активного действия"),
+    ("Nominative", "necessary informational completion", "персональная идентификация лица/предмета"),
+    ("Genitive", "necessary informational completion", "месяц в дате"),
+    ("Genitive", "attributive", "с предлогом от: удаление от объекта / лица; лицо как исходный пункт движения; лицо-отправитель"),
+    ("Genitive", "attributive", "место предмета/действия"),
+    ("Prepositional", "necessary informational completion", "падеж обусловлен глагольным управлением")
+])
+def test_nouns_allowed_case_meanings(case, general_meaning, meaning):
+    results = parse_russian_analysis(make_report(nouns=[noun("дом", case, general_meaning, meaning)]))
+    assert_errors(results, "errors_nouns", [])
+
+@pytest.mark.parametrize("case, general_meaning", [
+    ("Nominative", "subjective"),
+    ("Dative", "subjective"),
+    ("Dative", "objective"),
+    ("Accusative", "attributive"),
+    ("Instrumental", "attributive"),
+    ("Prepositional", "attributive")
+])
+def test_nouns_allowed_pair_without_specific_meaning(case, general_meaning):
+    results = parse_russian_analysis(make_report(nouns=[noun("дом", case, general_meaning)]))
+    assert_errors(results, "errors_nouns", [])
+
+def test_nouns_vocative_expression():
+    results = parse_russian_analysis(make_report(nouns=[
+        noun("Маша", "Nominative", "vocative expression", nominative_vocative_expression=True)
+    ]))
+    assert_errors(results, "errors_nouns", [])
+
+@pytest.mark.parametrize("case, general_meaning", [("Instrumental", "subjective"), ("Prepositional", "subjective")])
+def test_nouns_disallowed_pair_without_specific_meaning(case, general_meaning):
+    results = parse_russian_analysis(make_report(nouns=[noun("дом", case, general_meaning)]))
+    assert_errors(results, "errors_nouns", [
+        russian_noun_case_error_message.format(text="дом", case=case.lower(), case_general_meaning=general_meaning)
+    ])
+
+def test_nouns_disallowed_case_general_meaning():
+    results = parse_russian_analysis(make_report(nouns=[noun("воды", "Genitive", "objective")]))
+    assert_errors(results, "errors_nouns", [
+        russian_noun_case_error_message.format(text="воды", case="genitive", case_general_meaning="objective")
+    ])
+
+def test_nouns_disallowed_specific_meaning():
+    results = parse_russian_analysis(make_report(nouns=[noun("дом", "Nominative", "subjective", "носитель признака")]))
+    assert_errors(results, "errors_nouns", [
+        russian_noun_case_meaning_error_message.format(text="дом", case="nominative", case_general_meaning="subjective", case_meaning="носитель признака")
+    ])
+
+def test_nouns_disallowed_pair_stops():
+    # the specific meaning is not checked (nor read) once the pair is rejected
+    for meaning in ["объект желания", 5]:
+        results = parse_russian_analysis(make_report(nouns=[noun("воды", "Genitive", "objective", meaning)]))
+        assert_errors(results, "errors_nouns", [
+            russian_noun_case_error_message.format(text="воды", case="genitive", case_general_meaning="objective")
+        ])
+
+# --- pronouns
+@pytest.mark.parametrize("kind", ["личное", "притяжательное", "указательное", "определительное", "вопросительное", "отрицательное", "Личное"])
+def test_pronouns_allowed_categories(kind):
+    results = parse_russian_analysis(make_report(pronouns=[{"text": "он", "kind": kind}]))
+    assert_errors(results, "errors_pronouns", [])
+
+@pytest.mark.parametrize("kind", ["возвратное", "относительное", "неопределённое"])
+def test_pronouns_disallowed_categories(kind):
+    results = parse_russian_analysis(make_report(pronouns=[{"text": "себя", "kind": kind}]))
+    assert_errors(results, "errors_pronouns", [russian_pronoun_category_error_message.format(text="себя", kind=kind)])
+
+# --- adverbs
+@pytest.mark.parametrize("adverb_class", ["места", "времени", "образа действия", "степени", "предикативные", "вопросительные"])
+def test_adverbs_allowed_classes(adverb_class):
+    results = parse_russian_analysis(make_report(adverbs=[{"text": "здесь", "class": adverb_class}]))
+    assert_errors(results, "errors_adverbs", [])
+
+@pytest.mark.parametrize("adverb_class", ["отрицательные", "неопределённые", "причины", "цели", "совместности"])
+def test_adverbs_disallowed_classes(adverb_class):
+    results = parse_russian_analysis(make_report(adverbs=[{"text": "никогда", "class": adverb_class}]))
+    assert_errors(results, "errors_adverbs", [russian_adverb_class_error_message.format(text="никогда", adverb_class=adverb_class)])
+
+# --- adjectives
+def test_adjectives_nominative_and_no_case():
+    results = parse_russian_analysis(make_report(adjectives=[
+        {"text": "большой", "form": "long-form", "case": "Nominative"},
+        {"text": "большой", "form": "long-form"}
+    ]))
+    assert_errors(results, "errors_adjectives", [])
+
+def test_adjectives_non_nominative_case():
+    results = parse_russian_analysis(make_report(adjectives=[{"text": "большого", "form": "long-form", "case": "Genitive"}]))
+    assert_errors(results, "errors_adjectives", [russian_adjective_case_error_message.format(text="большого", case="genitive")])
+
+@pytest.mark.parametrize("text", ["рад", "рада", "Занята", "должны", "болен"])
+def test_adjectives_allowed_short_forms(text):
+    results = parse_russian_analysis(make_report(adjectives=[{"text": text, "form": "short-form"}]))
+    assert_errors(results, "errors_adjectives", [])
+
+def test_adjectives_disallowed_short_form():
+    results = parse_russian_analysis(make_report(adjectives=[{"text": "красив", "form": "short-form", "case": "Genitive"}]))
+    assert_errors(results, "errors_adjectives", [
+        russian_adjective_case_error_message.format(text="красив", case="genitive"),
+        russian_adjective_short_form_error_message.format(text="красив")
+    ])
+
+# --- verbs
+def test_verbs_allowed_conjugation_class():
+    results = parse_russian_analysis(make_report(verbs=[
+        verb("читаю", "читать"),
+        verb("читаю", "читать", ALLOWED_CLASS.upper()),
+        {key: value for key, value in verb("читаю", "читать").items() if key != "conjugation_class"}
+    ]))
+    assert_errors(results, "errors_verbs", [])
+
+def test_verbs_disallowed_conjugation_class():
+    results = parse_russian_analysis(make_report(verbs=[verb("видят", "видеть", DISALLOWED_CLASS)]))
+    assert_errors(results, "errors_verbs", [
+        russian_verb_conjugation_error_message.format(lemma="видеть", text="видят", conjugation_class=DISALLOWED_CLASS.lower())
+    ])
+
+@pytest.mark.parametrize("lemma", ["хотеть", "жить", "Хотеть"])
+def test_verbs_irregular_exceptions(lemma):
+    results = parse_russian_analysis(make_report(verbs=[verb("хочу", lemma, DISALLOWED_CLASS)]))
+    assert_errors(results, "errors_verbs", [])
+
+def test_verbs_subjunctive_mood():
+    results = parse_russian_analysis(make_report(verbs=[
+        verb("читал", "читать", mood="сослагательное"),
+        verb("читай", "читать", mood="повелительное")
+    ]))
+    assert_errors(results, "errors_verbs", [russian_verb_mood_error_message.format(text="читал", mood="сослагательное")])
+
+@pytest.mark.parametrize("form, text", [("причастие", "читающий"), ("деепричастие", "читая")])
+def test_verbs_participles_and_gerunds(form, text):
+    results = parse_russian_analysis(make_report(verbs=[
+        verb(text, "читать", finite=False, **{"non-finite forms": form}),
+        verb("читать", "читать", finite=False, **{"non-finite forms": "инфинитив"})
+    ]))
+    assert_errors(results, "errors_verbs", [russian_verb_non_finite_error_message.format(text=text, non_finite_form=form)])
+
+# --- numerals
+def test_numerals_collective():
+    results = parse_russian_analysis(make_report(numerals=[{"text": "двое", "kind": "collective"}, {"text": "два", "kind": "cardinal"}]))
+    assert_errors(results, "errors_numerals", [russian_numeral_collective_error_message.format(text="двое")])
+
+def test_numerals_ordinal_case():
+    results = parse_russian_analysis(make_report(numerals=[
+        {"text": "первого", "kind": "ordinal", "case": "Genitive"},
+        {"text": "первый", "kind": "ordinal", "case": "Nominative"},
+        {"text": "первый", "kind": "ordinal"},
+        {"text": "двух", "kind": "cardinal", "case": "Genitive"}
+    ]))
+    assert_errors(results, "errors_numerals", [russian_numeral_ordinal_case_error_message.format(text="первого", case="genitive")])
+
+# --- per-report and vectorised evaluations
+VALID_REPORTS = [
+    make_report(),
+    make_report(
+        nouns=[noun("воды", "Genitive", "objective", "объект желания"), noun("дом", "Nominative", "subjective", "носитель признака"), noun("мама", "Nominative", "subjective")],
+        pronouns=[{"text": "он", "kind": "личное"}, {"text": "себя", "kind": "возвратное"}],
+        adjectives=[{"text": "красив", "form": "short-form", "case": "Genitive"}, {"text": "рад", "form": "short-form"}],
+        verbs=[verb("видят", "видеть", DISALLOWED_CLASS), verb("хочу", "хотеть", DISALLOWED_CLASS), verb("читал", "читать", mood="сослагательное", **{"non-finite forms": "причастие"})],
+        adverbs=[{"text": "здесь", "class": "места"}, {"text": "никогда", "class": "отрицательные"}],
+        numerals=[{"text": "двое", "kind": "collective"}, {"text": "первого", "kind": "ordinal", "case": "Genitive"}]
+    ),
+    make_report(verbs=[verb("живу", "жить", DISALLOWED_CLASS)], numerals=[{"text": "третий", "kind": "ordinal", "case": "Nominative"}])
+]
+
+# malformed items, whose invalid fields are not read by the rules
+MALFORMED_REPORTS = [
+    # the specific meaning is not read, the pair is rejected first (stop)
+    make_report(nouns=[noun("воды", "Genitive", "objective", 5)]),
+    # the case is only read for ordinal numerals
+    make_report(numerals=[{"text": "два", "kind": "cardinal", "case": 5}]),
+    # the lemma is only read for verbs with a disallowed conjugation class
+    make_report(verbs=[{key: value for key, value in verb("читаю", "читать").items() if key != "lemma"}])
+]
+
+# malformed reports and items, whose invalid fields are read by the rules
+INVALID_REPORTS = [
+    make_report(pronouns=[{"text": "он"}]),
+    make_report(adjectives=[{"text": "красив", "form": None, "case": "Genitive"}]),
+    make_report(verbs=[verb("видят", "видеть", 5)]),
+    make_report(nouns=["дом"]),
+    {"nouns": []}
+]
+
+def test_evaluate_frame_matches_evaluate():
+    reports = VALID_REPORTS + MALFORMED_REPORTS
+    expected = [russian_rules.evaluate(report) for report in reports]
+    frame = russian_rules.evaluate_frame(reports)
+
+    assert list(frame.columns) == list(russian_rules._spec["template"])
+    assert frame.to_dict("records") == expected
+    assert sum(len(x["errors_log"]) for x in expected) > 0
+
+@pytest.mark.parametrize("report", INVALID_REPORTS)
+def test_evaluate_frame_raises_as_evaluate(report):
+    with pytest.raises(Exception) as expected:
+        russian_rules.evaluate(report)
+    with pytest.raises(type(expected.value)):
+        russian_rules.evaluate_frame(VALID_REPORTS + [report])
@@ -0,0 +1,43 @@
+import tiktoken
+from data_io import read_table
+from utils import encode_tagged_text, TAGGED_TEXT_ENCODINGS
+
+###
+# An utility script that compares the prompt size of the
+# available tagged text encodings (see eval.py --input-format).
+#
+# input_file -> an eval.py output file (must contain the 'pos_tags' column)
+#
+# Prints, for each encoding, the total/mean token count and the
+# size relative to the default (pretty-printed JSON) encoding.
+###
+
+# --- params
+input_file = "./input_eval.tsv"
+tokenizer_model = "gpt-4o" # the tiktoken encoding of this model is used
+tasks_per_text = 4 # each text is sent once per analysis task
+
+# --- load data
+df = read_table(input_file, json_columns=["pos_tags"])
+if "pos_tags" not in df:
+    print(f"Error: no column named 'pos_tags' exists in '{input_file}'!")
+    exit(2)
+
+tagged_texts = list(df["pos_tags"])
+tokenizer = tiktoken.encoding_for_model(tokenizer_model)
+
+# --- count tokens
+token_counts = {
+    encoding: [len(tokenizer.encode(encode_tagged_text(tagged_text, encoding))) for tagged_text in tagged_texts]
+    for encoding in TAGGED_TEXT_ENCODINGS
+}
+
+# --- report
+baseline = sum(token_counts["json"])
+print(f"INFO\t {len(tagged_texts)} texts, {tokenizer_model} tokenizer, {tasks_per_text} tasks per text")
+print("encoding\ttotal\tmean/text\tper run\trelative")
+for encoding, counts in token_counts.items():
+    total = sum(counts)
+    mean = total / len(counts) if len(counts) > 0 else 0
+    relative = total / baseline if baseline > 0 else 0
+    print(f"{encoding}\t{total}\t{mean:.1f}\t{total * tasks_per_text}\t{relative:.2%}")
@@ -1,4 +1,4 @@
-import re, json
+import re, json, threading
 from functools import partial
 from langchain_core.messages import AIMessage
 
@@ -6,6 +6,7 @@ JSON_REGEX_PATTERN =  r"```json\n([\s\S]*?)```"
 ANGLE_REGEX_PATTERN =  r"<([^>]+)>"
 TEXT_TAG_REGEX_PATTERN = r"<text[^>]*>((?:(?!</text>)[\s\S])*)</text>"
 ITALIAN_IRREGULAR_VERBS = "./inventories/italian_irregular_verbs.json"
+TAGGED_TEXT_ENCODINGS = ["json", "minified", "inline", "tsv"]
 ITALIAN_ALLOWED_IRREGULARS = [ "esserci", "essere", "esservi", "avercela", "avere", "averla", "aversela", "volercene", "volerci", "volere", "volerne", "volersi", "potere", "dovere", "andare", "dare", "darsi", "dire", "dirsi", "fare", "farsi", "sapere", "sapersi", "stare", "venire", "chiudere", "chiudersi", "mettere", "mettersi", "morire", "nascere", "prendere", "prendersi", "scrivere"]
 
 def regex_parser(message: AIMessage, regex: str) -> str | None:
@@ -40,17 +41,19 @@ def json_message_parser(message: AIMessage) -> dict:
     else:
         return {}
 
-def token_usage_message_parser(message: AIMessage) -> int | None:
+def token_usage_message_parser(message: AIMessage) -> int:
     """Given an AI Message, return the total token consumed
-    by that call."""
-    metadata = message.response_metadata
-    results = None
+    by that call. Falls back to the message's usage metadata
+    when the provider's token usage is missing (0 if neither
+    is available)."""
+    token_usage = (message.response_metadata or {}).get('token_usage') or {}
+    if token_usage.get('total_tokens') is not None:
+        return token_usage['total_tokens']
 
-    if metadata:
-        token_usage = metadata.get('token_usage')
-        results = token_usage.get('total_tokens')
+    if message.usage_metadata:
+        return message.usage_metadata.get('total_tokens', 0)
 
-    return results
+    return 0
 
 def strip_string(input: str) -> str:
     """Takes a string as input. Uses regular
@@ -72,6 +75,87 @@ def strip_string(input: str) -> str:
 
     return transformed
 
+class IrregularVerbLexicon():
+    """A list of known irregular verbs (lemmas) of a language.
+
+    The list is loaded from its JSON file on first use only,
+    lookups are done against precomputed frozensets.
+
+    Arguments:
+        path (str): a JSON file containing the list of irregular verbs
+        allowed_irregulars (list[str]): irregular verbs allowed by the language's A1 inventory
+    """
+    def __init__(self, path: str, allowed_irregulars: list[str] | None = None) -> None:
+        self._path = path
+        self._allowed_irregulars = frozenset(allowed_irregulars or [])
+        self._irregular_verbs = None
+        self._disallowed_irregulars = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._irregular_verbs is not None:
+                return
+
+            with open(self._path, "r", encoding="utf-8") as f_in:
+                irregular_verbs = frozenset(json.load(f_in))
+
+            self._disallowed_irregulars = irregular_verbs.difference(self._allowed_irregulars)
+            self._irregular_verbs = irregular_verbs
+
+    @property
+    def irregular_verbs(self) -> frozenset[str]:
+        """The known irregular verbs"""
+        if self._irregular_verbs is None:
+            self._load()
+        return self._irregular_verbs
+
+    @property
+    def disallowed_irregulars(self) -> frozenset[str]:
+        """The known irregular verbs, except the ones allowed by the A1 inventory"""
+        if self._irregular_verbs is None:
+            self._load()
+        return self._disallowed_irregulars
+
+    def is_regular(self, verb: str, check_allowed: bool = False) -> bool:
+        """Checks if a verb (lemma) is regular. If 'check_allowed'
+        is set, allowed irregular verbs are considered regular."""
+        if self._irregular_verbs is None:
+            self._load()
+
+        if check_allowed:
+            return verb not in self._disallowed_irregulars
+        return verb not in self._irregular_verbs
+
+    def is_allowed_irregular(self, verb: str) -> bool:
+        """Checks if a verb (lemma) is an irregular verb allowed by the A1 inventory"""
+        return verb in self._allowed_irregulars
+
+# known irregular verbs lists, by language
+IRREGULAR_VERB_LEXICONS = {
+    "italian": (ITALIAN_IRREGULAR_VERBS, ITALIAN_ALLOWED_IRREGULARS)
+}
+
+_irregular_verb_lexicons = {}
+
+def get_irregular_verb_lexicon(language: str) -> IrregularVerbLexicon:
+    """Returns the (shared) irregular verbs lexicon of a language
+
+    Arguments:
+        language (str): the language name, e.g. 'italian'
+
+    Returns:
+        IrregularVerbLexicon: the language's lexicon (loaded on first lookup)
+    """
+    if language not in _irregular_verb_lexicons:
+        if language not in IRREGULAR_VERB_LEXICONS:
+            raise ValueError(f"No irregular verbs list available for '{language}'!")
+
+        path, allowed_irregulars = IRREGULAR_VERB_LEXICONS[language]
+        _irregular_verb_lexicons.setdefault(language, IrregularVerbLexicon(path, allowed_irregulars))
+
+    return _irregular_verb_lexicons[language]
+
 def is_regular_it_verb(verb: str, check_allowed: bool = False) -> bool:
     """
     Uses a list of known italian irregular verbs to check if
@@ -84,14 +168,53 @@ def is_regular_it_verb(verb: str, check_allowed: bool = False) -> bool:
     Returns:
         bool: True if the verb is regular
     """
-    with open(ITALIAN_IRREGULAR_VERBS, "r", encoding="utf-8") as f_in:
-        irregular_verbs = json.load(f_in)
+    return get_irregular_verb_lexicon("italian").is_regular(verb, check_allowed)
+
+class TextOffsets():
+    """Locates fragments of a text (e.g. tokens, clauses) by character offsets.
+
+    Arguments:
+        text (str): the text
+    """
+    def __init__(self, text: str) -> None:
+        self.text = text
+        lowered = text.lower()
+        # case-insensitive searches need offsets to be preserved by lower()
+        self._lowered = lowered if len(lowered) == len(text) else None
+
+    def find(self, fragment: str, start: int = 0, end: int | None = None) -> tuple[int, int] | None:
+        """Finds the first occurrence of a fragment in text[start:end]. If there is no
+        exact match, the search is repeated ignoring case.
+
+        Returns:
+            tuple[int, int] | None: the fragment (start, end) offsets, None if not found
+        """
+        if not isinstance(fragment, str) or len(fragment) == 0:
+            return None
+
+        end = len(self.text) if end is None else end
+        index = self.text.find(fragment, start, end)
+        if index == -1 and self._lowered is not None:
+            index = self._lowered.find(fragment.lower(), start, end)
 
-    irregular_verbs = set(irregular_verbs)
-    if check_allowed:
-        irregular_verbs = irregular_verbs.difference(set(ITALIAN_ALLOWED_IRREGULARS))
+        return (index, index + len(fragment)) if index != -1 else None
 
-    return not (verb in irregular_verbs)
+    def align_tokens(self, tokens: list[dict[str, str]]) -> list[tuple[int, int] | None]:
+        """Aligns the tokens of a tagged text (in text order) to the text. Tokens
+        that cannot be found (e.g. expanded contractions) are aligned to None.
+
+        Returns:
+            list[tuple[int, int] | None]: the (start, end) offsets of each token
+        """
+        spans = []
+        cursor = 0
+        for token in tokens:
+            span = self.find(token["text"], cursor)
+            if span is not None:
+                cursor = span[1]
+            spans.append(span)
+
+        return spans
 
 def word_in_list(word: str, comparison_list: list[str]) -> bool:
     """Given a string and a string list
@@ -165,4 +288,35 @@ def compare_texts(text1: str, text2: str) -> bool:
     processed_text2 = ' '.join(text2.split())
     
     # Compare the processed texts
-    return processed_text1 == processed_text2
\ No newline at end of file
+    return processed_text1 == processed_text2
+
+def encode_tagged_text(tagged_text: list[dict[str, str]], encoding: str = "json") -> str:
+    """Serializes a POS-tagged text (a list of {text, pos} objects)
+    to be embedded in a prompt.
+
+    Available encodings:
+        json     -> pretty-printed JSON array (4 spaces indentation)
+        minified -> JSON array without whitespace
+        inline   -> space separated word/POS pairs, e.g. 'Il/DET gatto/NOUN'
+        tsv      -> a header row followed by one tab separated row per token
+
+    Arguments:
+        tagged_text (list[dict[str, str]]): the tagged text, as returned by POSTagger.tag_text
+        encoding (str): one of TAGGED_TEXT_ENCODINGS
+
+    Returns:
+        str: the serialized tagged text
+    """
+    match encoding:
+        case "json":
+            return json.dumps(tagged_text, indent=4, ensure_ascii=False)
+        case "minified":
+            return json.dumps(tagged_text, separators=(",", ":"), ensure_ascii=False)
+        case "inline":
+            return " ".join(f"{token['text']}/{token['pos']}" for token in tagged_text)
+        case "tsv":
+            keys = list(tagged_text[0].keys()) if len(tagged_text) > 0 else ["text", "pos"]
+            rows = ["\t".join(keys)] + ["\t".join(str(token.get(key, "")) for key in keys) for token in tagged_text]
+            return "\n".join(rows)
+        case _:
+            raise ValueError(f"Unsupported tagged text encoding: '{encoding}'")